@@ -1,5 +1,24 @@
+import re
+
 from django.contrib import admin
-from .models import FlightInquiry
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db.models.functions import Upper
+
+from .export import CSV, JSONL, export_response
+from .models import FlightInquiry, InquiryDailyRollup
+from .pagination import KeysetPaginator
+
+
+SUBMISSION_KEY_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def is_email(term):
+    try:
+        validate_email(term)
+    except ValidationError:
+        return False
+    return True
 
 
 @admin.register(FlightInquiry)
@@ -8,4 +27,51 @@ class FlightInquiryAdmin(admin.ModelAdmin):
     list_filter = ['status', 'created_at']
     search_fields = ['origin', 'destination', 'name', 'email']
     readonly_fields = ['created_at']
-    ordering = ['-created_at']
+    raw_id_fields = ['origin_airport', 'destination_airport']
+    ordering = ['-created_at', '-id']
+    # Only columns backed by an index can be sorted on a multi-million row table
+    sortable_by = ['status', 'created_at']
+    paginator = KeysetPaginator
+    # Skip the second, unfiltered COUNT(*) on every changelist page
+    show_full_result_count = False
+    actions = ['export_csv', 'export_csv_gzip', 'export_jsonl_gzip']
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        # Emails and submission references have exact, indexed lookups;
+        # partial emails ("@example.com", "john@") fall through to icontains
+        if SUBMISSION_KEY_RE.match(term):
+            return queryset.filter(submission_key=term), False
+        if is_email(term):
+            return queryset.alias(email_upper=Upper('email')).filter(email_upper=term.upper()), False
+        return super().get_search_results(request, queryset, search_term)
+
+    @admin.action(description='Export selected inquiries as CSV')
+    def export_csv(self, request, queryset):
+        return export_response(queryset, CSV)
+
+    @admin.action(description='Export selected inquiries as CSV (gzip)')
+    def export_csv_gzip(self, request, queryset):
+        return export_response(queryset, CSV, compress=True)
+
+    @admin.action(description='Export selected inquiries as JSONL (gzip)')
+    def export_jsonl_gzip(self, request, queryset):
+        return export_response(queryset, JSONL, compress=True)
+
+
+@admin.register(InquiryDailyRollup)
+class InquiryDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ['date', 'origin', 'destination', 'status', 'count']
+    list_filter = ['status', 'date']
+    search_fields = ['origin', 'destination']
+    date_hierarchy = 'date'
+
+    # Maintained from FlightInquiry; rebuild with rebuild_inquiry_rollups
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,126 @@
+"""
+Shared response layer for the booking JSON API.
+
+api_response() serializes with orjson when it is installed and falls back
+to a compact stdlib encoder otherwise; both handle dates, datetimes and
+Decimals. Payloads are built from .values()/.values_list() rows rather
+than model instances. The @compressed decorator negotiates Brotli or gzip
+from Accept-Encoding for bodies above COMPRESS_MIN_SIZE.
+"""
+import gzip
+import re
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional speedup
+    brotli = None
+
+
+# Smaller bodies gain little and cost a header plus CPU
+COMPRESS_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_encoder = DjangoJSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+
+def _default(value):
+    return _encoder.default(value)
+
+
+def dumps(data):
+    """Serialize ``data`` to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return _encoder.encode(data).encode()
+
+
+def api_response(data, status=200, content=None):
+    """JSON response for ``data``, or for already serialized ``content`` bytes"""
+    if content is None:
+        content = dumps(data)
+    return HttpResponse(content, status=status, content_type='application/json')
+
+
+def queryset_payload(queryset, *fields):
+    """Plain dict rows straight from the database, without model instances"""
+    return list(queryset.values(*fields))
+
+
+ACCEPT_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*')
+
+
+def accepted_encodings(header):
+    encodings = set()
+    for part in (header or '').split(','):
+        match = ACCEPT_ENCODING_RE.fullmatch(part)
+        if not match:
+            continue
+        name, quality = match.groups()
+        try:
+            if quality is not None and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        encodings.add(name.lower())
+    return encodings
+
+
+def choose_encoding(header):
+    encodings = accepted_encodings(header)
+    if brotli is not None and 'br' in encodings:
+        return 'br'
+    if 'gzip' in encodings:
+        return 'gzip'
+    return None
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(request, response):
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if (
+        response.streaming
+        or response.has_header('Content-Encoding')
+        or len(response.content) < COMPRESS_MIN_SIZE
+    ):
+        return response
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    response.content = compress(response.content, encoding)
+    response['Content-Length'] = str(len(response.content))
+    response['Content-Encoding'] = encoding
+    # The body now differs per encoding, so the validator can only be weak
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = f'W/{etag}'
+    return response
+
+
+def compressed(view):
+    """Compress the view's response when the client accepts br or gzip"""
+    if iscoroutinefunction(view):
+        async def wrapper(request, *args, **kwargs):
+            return compress_response(request, await view(request, *args, **kwargs))
+    else:
+        def wrapper(request, *args, **kwargs):
+            return compress_response(request, view(request, *args, **kwargs))
+
+    return wraps(view)(wrapper)
@@ -0,0 +1,152 @@
+"""
+Native async versions of the booking API views.
+
+flymex_site/urls.py routes to these instead of booking.views when
+BOOKING_ASYNC_VIEWS is enabled, which only makes sense when the site is
+served through flymex_site.asgi. Database and cache access go through
+Django's async APIs (afirst, cache.aget), so a request waiting on them
+does not hold a worker thread; only the insert, which needs a savepoint,
+runs in a thread through sync_to_async. The Airport generation is read
+asynchronously and handed to the in-memory indexes, which then answer
+without any I/O. Validation, idempotency and the response format are
+shared with the sync views.
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_http_methods
+
+from . import idempotency
+from .api import api_response, compressed, dumps
+from .cache import (
+    AIRPORTS_MAX_AGE, aairports_etag, aairports_last_modified, aairports_version,
+    aget_airports_response, aset_airports_response,
+)
+from .ingest import SPOOL_MODE, enqueue_inquiry, ingest_mode
+from .resolve import airport_resolver, resolve_airports
+from .search import airport_index
+from .views import _quote_response, _quote_result, _store_inquiry, _stored_result, _validate_quote
+
+
+def acondition(etag_func, last_modified_func):
+    """django.views.decorators.http.condition for async ETag and Last-Modified functions"""
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            last_modified = await last_modified_func(request, *args, **kwargs)
+            last_modified = int(last_modified.timestamp()) if last_modified else None
+            etag = await etag_func(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+
+        return inner
+
+    return decorator
+
+
+async def _airports_etag(request):
+    return await aairports_etag(request.GET.get('q', ''))
+
+
+async def _airports_last_modified(request):
+    return await aairports_last_modified()
+
+
+@compressed
+@cache_control(public=True, max_age=AIRPORTS_MAX_AGE)
+@acondition(etag_func=_airports_etag, last_modified_func=_airports_last_modified)
+async def airports_api(request):
+    """API endpoint for airport autocomplete"""
+    query = request.GET.get('q', '').strip()
+    version = await aairports_version()
+
+    content = await aget_airports_response(query, version)
+    if content is None:
+        if airport_index.ready:
+            data = airport_index.search(query, generation=version)
+        else:
+            # The first search builds the index from the database
+            data = await sync_to_async(airport_index.search)(query)
+        content = dumps({'airports': data})
+        await aset_airports_response(query, version, content)
+
+    return api_response(None, content=content)
+
+
+@compressed
+@require_http_methods(["POST"])
+async def flight_quote_api(request):
+    """API endpoint for flight quote requests with validation"""
+    try:
+        data = json.loads(request.body)
+        fields, error = _validate_quote(data)
+        if error is not None:
+            return error
+
+        # Double submits and retries get the original answer back
+        keys = idempotency.lookup_keys(request, fields)
+        replay = idempotency.find_replay(keys)
+        if replay is not None:
+            return _quote_response(*replay, replayed=True)
+
+        # ... including those stored by another process
+        fields['content_key'] = idempotency.content_key(fields)
+        recent = await idempotency.arecent_inquiry(fields['content_key'])
+        if recent is not None:
+            replay = _stored_result(recent)
+            idempotency.remember(keys, replay)
+            return _quote_response(*replay, replayed=True)
+
+        fields['submission_key'] = idempotency.submission_key(request, fields)
+        result = _quote_result(fields)
+        replayed = False
+        if airport_resolver.ready:
+            resolve_airports(fields, generation=await aairports_version())
+        else:
+            await sync_to_async(resolve_airports)(fields)
+
+        if ingest_mode() == SPOOL_MODE:
+            # The spool fsyncs on every append; keep that off the event loop
+            await sync_to_async(enqueue_inquiry, thread_sensitive=False)(
+                {**fields, 'created_at': timezone.now().isoformat()}
+            )
+            status = 202
+        else:
+            inquiry, replayed = await sync_to_async(_store_inquiry)(fields)
+            result['inquiry_id'] = inquiry.id
+            status = 200
+
+        idempotency.remember(keys, (result, status))
+        return _quote_response(result, status, replayed=replayed)
+
+    except json.JSONDecodeError:
+        return api_response({
+            'success': False,
+            'message': 'Invalid request format.',
+        }, status=400)
+    except Exception as e:
+        return api_response({
+            'success': False,
+            'message': 'An error occurred. Please try again.',
+        }, status=500)
+
+
+@ensure_csrf_cookie
+async def get_csrf_token(request):
+    """Endpoint to get CSRF token for form submissions"""
+    return api_response({'success': True})
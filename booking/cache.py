@@ -0,0 +1,75 @@
+"""
+Table-version stamp and response memoization for the airports API.
+
+The Airport generation from home.snippet_cache, bumped on every Airport
+change, drives ETag/Last-Modified on /api/airports/ and namespaces the
+memoized responses, so a bump invalidates all of them at once.
+"""
+import hashlib
+
+from django.core.cache import cache
+
+from home import snippet_cache
+
+from .models import Airport
+from .search import normalize
+
+
+AIRPORTS_RESPONSE_TIMEOUT = 60 * 60
+AIRPORTS_MAX_AGE = 5 * 60
+
+
+def airports_version():
+    """Current Airport generation"""
+    return snippet_cache.generation(Airport)
+
+
+async def aairports_version():
+    return await snippet_cache.ageneration(Airport)
+
+
+def bump_airports_version():
+    """For bulk writes that bypass signals; the indexes rebuild on next use"""
+    return snippet_cache.bump(Airport)
+
+
+def airports_last_modified():
+    return snippet_cache.last_changed(Airport)
+
+
+async def aairports_last_modified():
+    return await snippet_cache.alast_changed(Airport)
+
+
+def query_digest(query):
+    return hashlib.md5(normalize(query).encode()).hexdigest()
+
+
+def airports_etag(query, version=None):
+    if version is None:
+        version = airports_version()
+    return f'airports-{version}-{query_digest(query)}'
+
+
+async def aairports_etag(query):
+    return airports_etag(query, await aairports_version())
+
+
+def _response_key(query, version):
+    return f'booking:airports:{version}:{query_digest(query)}'
+
+
+def get_airports_response(query, version):
+    return cache.get(_response_key(query, version))
+
+
+def set_airports_response(query, version, content):
+    cache.set(_response_key(query, version), content, AIRPORTS_RESPONSE_TIMEOUT)
+
+
+async def aget_airports_response(query, version):
+    return await cache.aget(_response_key(query, version))
+
+
+async def aset_airports_response(query, version, content):
+    await cache.aset(_response_key(query, version), content, AIRPORTS_RESPONSE_TIMEOUT)
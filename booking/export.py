@@ -0,0 +1,124 @@
+"""
+Streaming CSV/JSONL export of flight inquiries.
+
+Rows are read with .values_list().iterator(chunk_size=...) and encoded
+one chunk at a time, optionally through a gzip compressor, so memory use
+stays flat however many inquiries are exported. The same generators back
+the admin actions (as a StreamingHttpResponse) and the
+export_inquiries management command (written to a file or stdout).
+"""
+import csv
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+
+CSV = 'csv'
+JSONL = 'jsonl'
+FORMATS = [CSV, JSONL]
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = [
+    'id', 'created_at', 'status', 'origin', 'destination', 'origin_airport_id', 'destination_airport_id',
+    'departure_date', 'return_date', 'passengers', 'name', 'email', 'phone', 'message',
+    'aircraft_preference', 'notes', 'submission_key',
+]
+
+CONTENT_TYPES = {
+    CSV: 'text/csv',
+    JSONL: 'application/x-ndjson',
+}
+
+
+def filter_inquiries(queryset, since=None, until=None, statuses=None):
+    """
+    Restrict inquiries to a created_at date range (inclusive) and statuses.
+
+    The range is turned into datetime bounds so the created_at index is used.
+    """
+    if since:
+        queryset = queryset.filter(created_at__gte=timezone.make_aware(datetime.combine(since, time.min)))
+    if until:
+        end = datetime.combine(until + timedelta(days=1), time.min)
+        queryset = queryset.filter(created_at__lt=timezone.make_aware(end))
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return queryset
+
+
+def _rows(queryset, chunk_size):
+    return queryset.order_by('id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+# Spreadsheets run cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _neutralize(value):
+    """Quote a text cell a spreadsheet would evaluate, e.g. '=HYPERLINK(...)'"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Line:
+    """File-like object that hands back whatever csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(_Line())
+    yield writer.writerow(EXPORT_FIELDS).encode()
+    lines = []
+    for row in _rows(queryset, chunk_size):
+        lines.append(writer.writerow([_neutralize(value) for value in row]))
+        if len(lines) >= chunk_size:
+            yield ''.join(lines).encode()
+            lines = []
+    if lines:
+        yield ''.join(lines).encode()
+
+
+def iter_jsonl(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    lines = []
+    for row in _rows(queryset, chunk_size):
+        lines.append(encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n')
+        if len(lines) >= chunk_size:
+            yield ''.join(lines).encode()
+            lines = []
+    if lines:
+        yield ''.join(lines).encode()
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of byte chunks into one gzip member on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(queryset, fmt=CSV, compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    chunks = iter_csv(queryset, chunk_size) if fmt == CSV else iter_jsonl(queryset, chunk_size)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def export_filename(fmt, compress=False):
+    name = f'flight-inquiries-{timezone.localdate():%Y%m%d}.{fmt}'
+    return f'{name}.gz' if compress else name
+
+
+def export_response(queryset, fmt=CSV, compress=False):
+    content_type = 'application/gzip' if compress else f'{CONTENT_TYPES[fmt]}; charset=utf-8'
+    response = StreamingHttpResponse(iter_export(queryset, fmt, compress), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(fmt, compress)}"'
+    return response
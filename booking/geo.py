@@ -0,0 +1,166 @@
+"""
+Great-circle helpers and an in-memory spatial index over airports.
+
+Airports with coordinates are bucketed into a fixed latitude/longitude
+grid. A radius query visits the cells around the search point ring by
+ring, doubling the distance covered until enough airports are found, so
+nearest-airport lookups stay sub-millisecond over the full world list
+even for large radii.
+"""
+import heapq
+import math
+
+import numpy as np
+
+from .search import AirportIndex
+
+
+EARTH_RADIUS_NM = 3440.065
+# No two points are further apart than half the circumference
+MAX_DISTANCE_NM = math.pi * EARTH_RADIUS_NM
+
+# One cell per degree keeps cells small (~60 nm) without too many buckets
+CELL_DEGREES = 1.0
+LAT_CELLS = int(round(180 / CELL_DEGREES))
+LON_CELLS = int(round(360 / CELL_DEGREES))
+# Distance covered by the first ring of a nearby() search
+FIRST_RING_NM = 60.0
+
+
+def great_circle_nm(lat1, lon1, lat2, lon2):
+    """Haversine distance between two points in nautical miles"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def unit_vectors(lat, lon):
+    """Convert coordinates in degrees to an (n, 3) array of unit vectors"""
+    phi = np.radians(np.asarray(lat, dtype=np.float64))
+    lam = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_phi = np.cos(phi)
+    return np.column_stack((cos_phi * np.cos(lam), cos_phi * np.sin(lam), np.sin(phi)))
+
+
+def dot_to_nm(dot):
+    """Great-circle distance in nm from the dot product of two unit vectors"""
+    chord = np.sqrt(np.clip(2.0 - 2.0 * dot, 0.0, 4.0))
+    return 2 * EARTH_RADIUS_NM * np.arcsin(chord / 2)
+
+
+def nm_to_dot(distance_nm):
+    """Smallest dot product for points at most ``distance_nm`` apart"""
+    return np.cos(min(distance_nm / EARTH_RADIUS_NM, np.pi))
+
+
+def great_circle_matrix_nm(lat1, lon1, lat2, lon2):
+    """
+    Pairwise great-circle distances in nautical miles.
+
+    Returns an array of shape ``(len(lat1), len(lat2))``. The pairwise work
+    is a single matrix product of unit vectors, so it runs through BLAS
+    rather than per-element trigonometry.
+    """
+    return dot_to_nm(unit_vectors(lat1, lon1) @ unit_vectors(lat2, lon2).T)
+
+
+def _row(lat):
+    return min(LAT_CELLS - 1, max(0, int(math.floor((lat + 90) / CELL_DEGREES))))
+
+
+def _column(lon):
+    # Not wrapped, so callers can build contiguous ranges across the antimeridian
+    return int(math.floor((lon + 180) / CELL_DEGREES))
+
+
+def cell_for(lat, lon):
+    return _row(lat), _column(lon) % LON_CELLS
+
+
+class AirportSpatialIndex(AirportIndex):
+    """Grid-bucket index answering nearest-airport queries"""
+
+    def _reset(self):
+        self.cells = {}
+        self.entries = {}
+
+    def _add(self, airport):
+        if airport.latitude is None or airport.longitude is None:
+            return
+        pk = airport.pk
+        cell = cell_for(airport.latitude, airport.longitude)
+        entry = {
+            'code': airport.code,
+            'name': airport.name,
+            'city': airport.city,
+            'country': airport.country,
+            'display': airport.display_name,
+            'latitude': airport.latitude,
+            'longitude': airport.longitude,
+        }
+        self.entries[pk] = (cell, entry)
+        self.cells.setdefault(cell, {})[pk] = entry
+
+    def _remove(self, airport_id):
+        item = self.entries.pop(airport_id, None)
+        if item is None:
+            return
+        cell, entry = item
+        bucket = self.cells.get(cell)
+        if bucket is not None:
+            bucket.pop(airport_id, None)
+            if not bucket:
+                del self.cells[cell]
+
+    def _candidate_cells(self, lat, lon, radius_nm):
+        # One degree of latitude is 60 nm everywhere
+        dlat = radius_nm / 60.0
+        lat_min = max(-90.0, lat - dlat)
+        lat_max = min(90.0, lat + dlat)
+        widest = max(abs(lat_min), abs(lat_max))
+        if widest >= 89.9:
+            dlon = 180.0
+        else:
+            dlon = min(180.0, dlat / math.cos(math.radians(widest)))
+
+        if dlon >= 180.0:
+            columns = range(LON_CELLS)
+        else:
+            columns = {col % LON_CELLS for col in range(_column(lon - dlon), _column(lon + dlon) + 1)}
+        for row in range(_row(lat_min), _row(lat_max) + 1):
+            for col in columns:
+                yield row, col
+
+    def nearby(self, lat, lon, radius_nm, limit=10):
+        """Return up to ``limit`` airports within ``radius_nm``, closest first"""
+        if not all(math.isfinite(value) for value in (lat, lon, radius_nm)):
+            raise ValueError('Coordinates and radius must be finite numbers')
+        # Past this every ring covers the whole globe, so the loop below ends
+        radius_nm = min(radius_nm, MAX_DISTANCE_NM)
+        self.ensure_loaded()
+        seen = []
+        visited = set()
+        ring_nm = min(radius_nm, FIRST_RING_NM)
+        with self._lock:
+            while True:
+                for cell in self._candidate_cells(lat, lon, ring_nm):
+                    if cell in visited:
+                        continue
+                    visited.add(cell)
+                    for entry in self.cells.get(cell, {}).values():
+                        distance = great_circle_nm(lat, lon, entry['latitude'], entry['longitude'])
+                        seen.append((distance, entry['code'], entry))
+                # Every airport within ring_nm has been seen, so once there
+                # are enough of them none further out can be closer
+                matches = [match for match in seen if match[0] <= ring_nm]
+                if len(matches) >= limit or ring_nm >= radius_nm:
+                    break
+                ring_nm = min(radius_nm, ring_nm * 2)
+        closest = heapq.nsmallest(limit, matches, key=lambda m: (m[0], m[1]))
+        return [{**entry, 'distance_nm': round(distance, 1)} for distance, _, entry in closest]
+
+
+airport_spatial_index = AirportSpatialIndex()
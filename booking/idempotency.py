@@ -0,0 +1,141 @@
+"""
+Duplicate suppression for flight quote submissions.
+
+A submission is identified by its Idempotency-Key header when the client
+sends one, and otherwise by a hash of email, route and departure date.
+Recent responses are kept in a bounded, TTL-evicting in-memory store so a
+replay is answered without touching the write path. Across processes,
+stored inquiries are matched on FlightInquiry.content_key over the last
+DEDUP_WINDOW, and the unique FlightInquiry.submission_key column catches
+concurrent double submits.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import FlightInquiry
+from .search import normalize
+
+
+DEDUP_WINDOW = 10 * 60
+STORE_MAX_SIZE = 10000
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (now + self.ttl, value)
+            self._data.move_to_end(key)
+            # Entries are in insertion/access order, so expired ones and
+            # the least recently used ones both sit at the front
+            while self._data:
+                oldest_key, (expires, _) = next(iter(self._data.items()))
+                if expires >= now and len(self._data) <= self.maxsize:
+                    break
+                del self._data[oldest_key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+submission_store = TTLCache(STORE_MAX_SIZE, DEDUP_WINDOW)
+
+
+def _digest(*parts):
+    return hashlib.sha256('\x1f'.join(str(p) for p in parts).encode()).hexdigest()
+
+
+def header_key(idempotency_key):
+    return _digest('idempotency-key', idempotency_key.strip())
+
+
+def content_key(fields):
+    return _digest(
+        'content',
+        fields['email'].strip().lower(),
+        normalize(fields['origin']),
+        normalize(fields['destination']),
+        fields['departure_date'],
+    )
+
+
+def submission_key(request, fields):
+    """
+    Key stored in FlightInquiry.submission_key.
+
+    Without an Idempotency-Key header the content hash is combined with the
+    current DEDUP_WINDOW bucket, so that concurrent double submits collide
+    while the same trip can be requested again later. Resubmissions that
+    straddle two buckets are caught by recent_inquiry().
+    """
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key:
+        return header_key(idempotency_key)
+    return _digest(content_key(fields), int(time.time() // DEDUP_WINDOW))
+
+
+def lookup_keys(request, fields):
+    keys = [content_key(fields)]
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key:
+        keys.insert(0, header_key(idempotency_key))
+    return keys
+
+
+def _recent(content):
+    since = timezone.now() - timedelta(seconds=DEDUP_WINDOW)
+    return (
+        FlightInquiry.objects.filter(content_key=content, created_at__gte=since)
+        .only('id', 'submission_key').order_by('-created_at')
+    )
+
+
+def recent_inquiry(content):
+    """The latest inquiry stored with content key ``content`` within DEDUP_WINDOW, or None"""
+    return _recent(content).first()
+
+
+async def arecent_inquiry(content):
+    return await _recent(content).afirst()
+
+
+def find_replay(keys):
+    for key in keys:
+        response = submission_store.get(key)
+        if response is not None:
+            return response
+    return None
+
+
+def remember(keys, response):
+    for key in keys:
+        submission_store.set(key, response)
@@ -0,0 +1,331 @@
+"""
+Write-behind ingestion for flight inquiries.
+
+In "spool" mode flight_quote_api validates a request, appends it to a
+local SQLite spool (WAL journal, fsync on every commit) and answers
+straight away. A background worker drains the spool into FlightInquiry
+with bulk_create in batches. Rows are only removed from the spool after
+the database commit, and every inquiry carries a unique submission_key,
+so replaying a batch after a crash never creates duplicates.
+
+Each flush claims its rows in the spool first, so the workers of several
+web processes (or a dedicated ``flush_inquiry_spool --loop``) never write
+or count the same inquiry twice. A row the database rejects is moved to
+a dead-letter table instead of blocking the rows behind it.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, transaction
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Airport, FlightInquiry
+from .pagination import record_change
+from .resolve import resolve_airports
+from .rollups import record_batch
+
+
+logger = logging.getLogger(__name__)
+
+SPOOL_MODE = 'spool'
+SYNC_MODE = 'sync'
+
+FLUSH_BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0
+
+# Claims older than this belong to a flusher that died mid-batch
+CLAIM_TIMEOUT = 5 * 60
+
+
+def ingest_mode():
+    return getattr(settings, 'BOOKING_INGEST_MODE', SYNC_MODE)
+
+
+class InquirySpool:
+    """Durable append-only queue of pending inquiries in a SQLite file"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS spool ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'payload TEXT NOT NULL, '
+                'created_at REAL NOT NULL, '
+                'claimed_by TEXT, '
+                'claimed_at REAL)'
+            )
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(spool)')}
+            if 'claimed_by' not in columns:
+                # Spool written before rows were claimed
+                conn.execute('ALTER TABLE spool ADD COLUMN claimed_by TEXT')
+                conn.execute('ALTER TABLE spool ADD COLUMN claimed_at REAL')
+            conn.execute('CREATE INDEX IF NOT EXISTS spool_claimed_by ON spool (claimed_by)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS dead_letter ('
+                'id INTEGER PRIMARY KEY, '
+                'payload TEXT NOT NULL, '
+                'created_at REAL NOT NULL, '
+                'failed_at REAL NOT NULL, '
+                'error TEXT NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def append(self, payload):
+        self.append_many([payload])
+
+    def append_many(self, payloads):
+        conn = self.connection
+        now = time.time()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                'INSERT INTO spool (payload, created_at) VALUES (?, ?)',
+                [(json.dumps(payload), now) for payload in payloads],
+            )
+
+    def take(self, limit):
+        """Claim up to ``limit`` of the oldest unclaimed rows for the caller"""
+        claim = uuid.uuid4().hex
+        now = time.time()
+        conn = self.connection
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'UPDATE spool SET claimed_by = ?, claimed_at = ? WHERE id IN ('
+                'SELECT id FROM spool WHERE claimed_by IS NULL OR claimed_at < ? ORDER BY id LIMIT ?)',
+                (claim, now, now - CLAIM_TIMEOUT, limit),
+            )
+            rows = conn.execute(
+                'SELECT id, payload FROM spool WHERE claimed_by = ? ORDER BY id', (claim,),
+            ).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def release(self, ids):
+        """Hand claimed rows back to the next flush"""
+        conn = self.connection
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                'UPDATE spool SET claimed_by = NULL, claimed_at = NULL WHERE id = ?', [(i,) for i in ids],
+            )
+
+    def ack(self, ids):
+        conn = self.connection
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany('DELETE FROM spool WHERE id = ?', [(i,) for i in ids])
+
+    def bury(self, failures):
+        """Move rows that cannot be stored, given as (id, error) pairs, to the dead-letter table"""
+        conn = self.connection
+        now = time.time()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            for row_id, error in failures:
+                conn.execute(
+                    'INSERT OR REPLACE INTO dead_letter (id, payload, created_at, failed_at, error) '
+                    'SELECT id, payload, created_at, ?, ? FROM spool WHERE id = ?',
+                    (now, error, row_id),
+                )
+                conn.execute('DELETE FROM spool WHERE id = ?', (row_id,))
+
+    def dead_letters(self):
+        rows = self.connection.execute(
+            'SELECT id, payload, error FROM dead_letter ORDER BY id',
+        ).fetchall()
+        return [(row_id, json.loads(payload), error) for row_id, payload, error in rows]
+
+    def requeue_dead_letters(self):
+        """Put every dead letter back in the spool, e.g. after fixing the cause; returns rows moved"""
+        conn = self.connection
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            moved = conn.execute(
+                'INSERT INTO spool (payload, created_at) SELECT payload, created_at FROM dead_letter ORDER BY id',
+            ).rowcount
+            conn.execute('DELETE FROM dead_letter')
+        return moved
+
+    def count(self):
+        return self.connection.execute('SELECT COUNT(*) FROM spool').fetchone()[0]
+
+    def dead_count(self):
+        return self.connection.execute('SELECT COUNT(*) FROM dead_letter').fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def build_inquiry(payload):
+    payload = dict(payload)
+    if 'origin_airport_id' not in payload:
+        # Spooled before airports were resolved at submission time
+        resolve_airports(payload)
+    payload['departure_date'] = parse_date(payload['departure_date'])
+    if payload.get('return_date'):
+        payload['return_date'] = parse_date(payload['return_date'])
+    if payload.get('created_at'):
+        payload['created_at'] = parse_datetime(payload['created_at'])
+    return FlightInquiry(**payload)
+
+
+def check_airports(inquiries):
+    """Clear airport foreign keys whose Airport was deleted after the inquiry was spooled"""
+    airport_ids = {
+        airport_id
+        for inquiry in inquiries
+        for airport_id in (inquiry.origin_airport_id, inquiry.destination_airport_id)
+        if airport_id is not None
+    }
+    if not airport_ids:
+        return
+    existing = set(Airport.objects.filter(pk__in=airport_ids).values_list('pk', flat=True))
+    for inquiry in inquiries:
+        # As on_delete=SET_NULL would have done had it been stored already
+        if inquiry.origin_airport_id not in existing:
+            inquiry.origin_airport_id = None
+        if inquiry.destination_airport_id not in existing:
+            inquiry.destination_airport_id = None
+
+
+def store_inquiries(inquiries):
+    with transaction.atomic():
+        # bulk_create sends no signals, so count the genuinely new rows here
+        existing = set(FlightInquiry.objects.filter(
+            submission_key__in=[i.submission_key for i in inquiries if i.submission_key],
+        ).values_list('submission_key', flat=True))
+        FlightInquiry.objects.bulk_create(inquiries, ignore_conflicts=True)
+        new = {}
+        for inquiry in inquiries:
+            if inquiry.submission_key not in existing:
+                new.setdefault(inquiry.submission_key or id(inquiry), inquiry)
+        record_batch(new.values())
+    record_change(FlightInquiry)
+
+
+def _error(exc):
+    return f'{type(exc).__name__}: {exc}'
+
+
+def flush_spool(spool, batch_size=FLUSH_BATCH_SIZE):
+    """Move one batch from the spool into FlightInquiry; returns rows taken"""
+    items = spool.take(batch_size)
+    if not items:
+        return 0
+    try:
+        stored, failed = [], []
+        for row_id, payload in items:
+            try:
+                inquiry = build_inquiry(payload)
+                # Field constraints the database may not enforce (lengths, choices)
+                inquiry.clean_fields(exclude=['origin_airport', 'destination_airport'])
+            except (KeyError, TypeError, ValueError, ValidationError) as e:
+                failed.append((row_id, _error(e)))
+            else:
+                stored.append((row_id, inquiry))
+        check_airports([inquiry for _, inquiry in stored])
+
+        try:
+            store_inquiries([inquiry for _, inquiry in stored])
+        except (IntegrityError, DataError):
+            # One bad row fails the whole batch; store them one at a time
+            # and set aside the ones the database rejects
+            for row_id, inquiry in list(stored):
+                try:
+                    store_inquiries([inquiry])
+                except (IntegrityError, DataError) as e:
+                    stored.remove((row_id, inquiry))
+                    failed.append((row_id, _error(e)))
+    except BaseException:
+        # e.g. the database is down: leave the whole batch for the next pass
+        spool.release([row_id for row_id, _ in items])
+        raise
+
+    if failed:
+        logger.error('Moved %d spooled inquiries to the dead-letter table: %s', len(failed), failed[0][1])
+        spool.bury(failed)
+    spool.ack([row_id for row_id, _ in stored])
+    return len(items)
+
+
+def drain_spool(spool, batch_size=FLUSH_BATCH_SIZE):
+    total = 0
+    while True:
+        moved = flush_spool(spool, batch_size)
+        if not moved:
+            return total
+        total += moved
+
+
+class SpoolWorker(threading.Thread):
+    """Daemon thread that drains the spool shortly after each append"""
+
+    def __init__(self, spool, interval=FLUSH_INTERVAL, batch_size=FLUSH_BATCH_SIZE):
+        super().__init__(name='inquiry-spool-worker', daemon=True)
+        self.spool = spool
+        self.interval = interval
+        self.batch_size = batch_size
+        self.wakeup = threading.Event()
+
+    def notify(self):
+        self.wakeup.set()
+
+    def run(self):
+        from django.db import close_old_connections
+
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                drain_spool(self.spool, self.batch_size)
+            except Exception:
+                # Rows stay in the spool and are retried on the next pass
+                logger.exception('Flushing the inquiry spool failed')
+            finally:
+                close_old_connections()
+
+
+_spool = None
+_worker = None
+_lock = threading.Lock()
+
+
+def get_spool():
+    global _spool
+    if _spool is None:
+        with _lock:
+            if _spool is None:
+                _spool = InquirySpool(settings.BOOKING_INGEST_SPOOL)
+    return _spool
+
+
+def enqueue_inquiry(payload):
+    """Durably spool one inquiry and wake the background worker"""
+    global _worker
+    spool = get_spool()
+    spool.append(payload)
+    if _worker is None or not _worker.is_alive():
+        with _lock:
+            if _worker is None or not _worker.is_alive():
+                _worker = SpoolWorker(spool)
+                _worker.start()
+    _worker.notify()
@@ -0,0 +1,210 @@
+"""
+Management command comparing the sync (WSGI) and async (ASGI) booking API.
+Run: python manage.py benchmark_api [--endpoint airports] [--requests 5000] [--concurrency 100]
+
+Starts one gunicorn gthread worker serving flymex_site.wsgi with the sync
+views and one uvicorn worker serving flymex_site.asgi with
+BOOKING_ASYNC_VIEWS on, then drives each over keep-alive HTTP connections
+with the same number of concurrent clients and reports throughput and
+latency. Quote requests use a benchmark email domain and are deleted
+afterwards. Requires uvicorn (pip install "uvicorn[standard]").
+"""
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+from importlib.util import find_spec
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.models import FlightInquiry
+
+
+BENCHMARK_EMAIL_DOMAIN = 'benchmark.invalid'
+QUERIES = ['', 'me', 'mex', 'can', 'tol', 'new york', 'los', 'lon', 'par', 'mad', 'a', 'sa']
+STARTUP_TIMEOUT = 30
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Connection:
+    """Minimal keep-alive HTTP/1.1 client over asyncio streams"""
+
+    def __init__(self, port):
+        self.port = port
+        self.cookies = {}
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=b'', headers=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+        lines = [f'{method} {path} HTTP/1.1', f'Host: 127.0.0.1:{self.port}', f'Content-Length: {len(body)}']
+        if self.cookies:
+            lines.append('Cookie: ' + '; '.join(f'{k}={v}' for k, v in self.cookies.items()))
+        lines += [f'{k}: {v}' for k, v in (headers or {}).items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+
+        status_line = await self.reader.readline()
+        status = int(status_line.split()[1])
+        length = 0
+        close = False
+        while True:
+            line = (await self.reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            name = name.lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'connection' and value.strip().lower() == 'close':
+                close = True
+            elif name == 'set-cookie':
+                cookie = SimpleCookie(value.strip())
+                self.cookies.update({k: morsel.value for k, morsel in cookie.items()})
+        await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class Command(BaseCommand):
+    help = 'Measure concurrent request capacity of the sync (WSGI) and async (ASGI) booking API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=['airports', 'quote', 'csrf'], default='airports')
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--concurrency', type=int, default=100, help='Concurrent client connections')
+        parser.add_argument('--threads', type=int, default=8, help='gunicorn gthread threads for the WSGI run')
+
+    def handle(self, *args, **options):
+        if find_spec('uvicorn') is None:
+            raise CommandError('uvicorn is required: pip install "uvicorn[standard]"')
+
+        servers = [
+            ('WSGI (gunicorn gthread, sync views)', lambda port: [
+                sys.executable, '-m', 'gunicorn', 'flymex_site.wsgi:application',
+                '--bind', f'127.0.0.1:{port}', '--workers', '1',
+                '--worker-class', 'gthread', '--threads', str(options['threads']),
+                '--log-level', 'warning',
+            ], {'BOOKING_ASYNC_VIEWS': 'False'}),
+            ('ASGI (uvicorn, async views)', lambda port: [
+                sys.executable, '-m', 'uvicorn', 'flymex_site.asgi:application',
+                '--host', '127.0.0.1', '--port', str(port), '--workers', '1',
+                '--log-level', 'warning', '--no-access-log',
+            ], {'BOOKING_ASYNC_VIEWS': 'True'}),
+        ]
+
+        self.stdout.write(
+            f'{options["requests"]} {options["endpoint"]} requests, '
+            f'{options["concurrency"]} concurrent connections'
+        )
+        try:
+            for label, command, env in servers:
+                port = free_port()
+                process = self.start_server(command(port), env, port)
+                try:
+                    result = asyncio.run(self.run_load(port, options))
+                finally:
+                    process.terminate()
+                    process.wait()
+                self.report(label, result)
+        finally:
+            FlightInquiry.objects.filter(email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}').delete()
+
+    def start_server(self, command, env, port):
+        env = {
+            **os.environ,
+            **env,
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'flymex_site.settings'),
+            'PYTHONPATH': os.pathsep.join(filter(None, [str(settings.BASE_DIR), os.environ.get('PYTHONPATH')])),
+        }
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'{command[2]} exited with status {process.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return process
+            except OSError:
+                time.sleep(0.1)
+        process.terminate()
+        raise CommandError(f'{command[2]} did not start within {STARTUP_TIMEOUT}s')
+
+    def build_request(self, endpoint, i):
+        if endpoint == 'airports':
+            return 'GET', '/api/airports/?' + urlencode({'q': QUERIES[i % len(QUERIES)]}), b''
+        if endpoint == 'csrf':
+            return 'GET', '/api/csrf-token/', b''
+        return 'POST', '/api/flight-quote/', json.dumps({
+            'origin': 'Toluca (TLC)',
+            'destination': 'Cancun (CUN)',
+            'departure_date': (date.today() + timedelta(days=30 + i % 300)).isoformat(),
+            'passengers': 2,
+            'name': 'Benchmark',
+            'email': f'user{i}@{BENCHMARK_EMAIL_DOMAIN}',
+        }).encode()
+
+    async def run_load(self, port, options):
+        # Warm up: build the airport index and pick up a CSRF cookie
+        warmup = Connection(port)
+        await warmup.request('GET', '/api/airports/?q=mex')
+        warmup.close()
+
+        requests = iter(range(options['requests']))
+        latencies = []
+        errors = 0
+
+        async def client():
+            nonlocal errors
+            connection = Connection(port)
+            if options['endpoint'] == 'quote':
+                await connection.request('GET', '/api/csrf-token/')
+            for i in requests:
+                method, path, body = self.build_request(options['endpoint'], i)
+                headers = {}
+                if method == 'POST':
+                    headers = {
+                        'Content-Type': 'application/json',
+                        'X-CSRFToken': connection.cookies.get('csrftoken', ''),
+                    }
+                started = time.perf_counter()
+                try:
+                    status = await connection.request(method, path, body, headers)
+                except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                    connection.close()
+                    status = 599
+                latencies.append(time.perf_counter() - started)
+                if status >= 400:
+                    errors += 1
+            connection.close()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options['concurrency'])))
+        return time.perf_counter() - started, sorted(latencies), errors
+
+    def report(self, label, result):
+        elapsed, latencies, errors = result
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+        self.stdout.write(
+            f'{label:38} {len(latencies) / elapsed:8,.0f} req/s  '
+            f'p50 {statistics.median(latencies) * 1000:7.1f} ms  '
+            f'p99 {p99 * 1000:7.1f} ms  errors {errors}'
+        )
@@ -0,0 +1,83 @@
+"""
+Management command to micro-benchmark the booking API response layer.
+Run: python manage.py benchmark_json [--repeat 200]
+
+For representative payloads it reports the CPU time per response of the
+stdlib encoder and orjson, the cost of building rows from model instances
+versus .values(), and the size and CPU cost of gzip and Brotli.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.forms.models import model_to_dict
+
+from booking import api
+from booking.models import FlightInquiry
+from booking.quotes import fleet_pricing
+from booking.search import airport_index
+
+
+INQUIRY_ROWS = 500
+INQUIRY_FIELDS = ['id', 'origin', 'destination', 'departure_date', 'passengers', 'status', 'created_at']
+
+
+def per_call_us(func, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - started) / repeat * 1e6
+
+
+class Command(BaseCommand):
+    help = 'Compare JSON serializers and response compression on typical booking API payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        self.stdout.write(
+            f'orjson: {"yes" if api.orjson else "no (stdlib fallback)"}, '
+            f'brotli: {"yes" if api.brotli else "no (gzip only)"}'
+        )
+
+        payloads = {
+            'airports ?q=san': {'airports': airport_index.search('san')},
+            'airports popular': {'airports': airport_index.search('')},
+            'price quote, 50 routes': {'quotes': fleet_pricing.quote([250 + 40 * i for i in range(50)])},
+            f'{INQUIRY_ROWS} inquiries': {'inquiries': api.queryset_payload(
+                FlightInquiry.objects.order_by('-created_at')[:INQUIRY_ROWS], *INQUIRY_FIELDS,
+            )},
+        }
+
+        header = f'{"payload":24} {"stdlib us":>10} {"orjson us":>10} {"bytes":>9} {"gzip":>16} {"br":>16}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for label, data in payloads.items():
+            stdlib_us = per_call_us(lambda: api._encoder.encode(data).encode(), repeat)
+            orjson_col = '-'
+            if api.orjson:
+                orjson_col = f'{per_call_us(lambda: api.orjson.dumps(data, default=api._default), repeat):.1f}'
+            content = api.dumps(data)
+            gzip_col = self.compression(content, 'gzip', repeat)
+            br_col = self.compression(content, 'br', repeat) if api.brotli else '-'
+            self.stdout.write(
+                f'{label:24} {stdlib_us:10.1f} {orjson_col:>10} '
+                f'{len(content):9,} {gzip_col:>16} {br_col:>16}'
+            )
+
+        queryset = FlightInquiry.objects.order_by('-created_at')[:INQUIRY_ROWS]
+        instances_us = per_call_us(
+            lambda: [model_to_dict(i, fields=INQUIRY_FIELDS) for i in queryset.all()], max(repeat // 10, 1),
+        )
+        values_us = per_call_us(lambda: api.queryset_payload(queryset.all(), *INQUIRY_FIELDS), max(repeat // 10, 1))
+        self.stdout.write('')
+        self.stdout.write(
+            f'{INQUIRY_ROWS} inquiries to dicts: model instances {instances_us / 1000:.1f} ms, '
+            f'.values() {values_us / 1000:.1f} ms (CPU, including the query)'
+        )
+
+    def compression(self, content, encoding, repeat):
+        compressed = api.compress(content, encoding)
+        cpu_us = per_call_us(lambda: api.compress(content, encoding), repeat)
+        return f'{len(compressed):,} / {cpu_us:.0f}us'
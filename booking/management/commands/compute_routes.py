@@ -0,0 +1,143 @@
+"""
+Management command to compute FlightRoute distances and block times.
+Run: python manage.py compute_routes [--popular] [--origins TLC,MEX] [--max-distance 3000]
+
+Airports are converted to unit vectors once; each chunk of origins is then
+a single matrix product against every destination, filtered by distance
+before any trigonometry, and upserted into FlightRoute in batches. Only
+one batch of FlightRoute objects exists at a time.
+
+Every pair of the full airport list is billions of routes, so one of
+--origins, --destinations, --popular or --max-distance is required;
+pass --all to compute them anyway.
+"""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from booking.geo import dot_to_nm, nm_to_dot, unit_vectors
+from booking.models import Airport, FlightRoute, format_flight_time
+from booking.quotes import LEG_OVERHEAD_MINUTES
+from home import snippet_cache
+
+
+UPDATE_FIELDS = ['distance_nm', 'estimated_flight_time', 'flight_time_minutes']
+
+
+class Command(BaseCommand):
+    help = 'Compute great-circle distances and block times for FlightRoute pairs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--origins', help='Comma-separated origin codes (default: all available airports)')
+        parser.add_argument('--destinations', help='Comma-separated destination codes (default: all available airports)')
+        parser.add_argument('--popular', action='store_true', help='Only use airports marked as popular')
+        parser.add_argument('--max-distance', type=float, help='Skip pairs further apart than this (nm)')
+        parser.add_argument('--speed', type=float, default=450, help='Average block speed in knots (default: 450)')
+        parser.add_argument(
+            '--overhead', type=float, default=LEG_OVERHEAD_MINUTES,
+            help=f'Minutes added per flight for taxi, climb and descent (default: {LEG_OVERHEAD_MINUTES})',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=100,
+            help='Origins per distance matrix chunk; bounds memory to chunk x destinations',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Allow computing every pair of available airports when no other bound is given',
+        )
+
+    def airports(self, codes, popular):
+        airports = Airport.objects.filter(
+            is_available=True, latitude__isnull=False, longitude__isnull=False,
+        )
+        if popular:
+            airports = airports.filter(is_popular=True)
+        if codes:
+            codes = [c.strip().upper() for c in codes.split(',') if c.strip()]
+            airports = airports.filter(code__in=codes)
+            missing = set(codes) - set(airports.values_list('code', flat=True))
+            if missing:
+                raise CommandError(f'Unknown or unusable airports: {", ".join(sorted(missing))}')
+        rows = list(airports.order_by('id').values_list('id', 'latitude', 'longitude'))
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+        ids, lats, lons = zip(*rows)
+        return np.array(ids, dtype=np.int64), np.array(lats), np.array(lons)
+
+    def handle(self, *args, **options):
+        if options['speed'] <= 0:
+            raise CommandError('--speed must be positive')
+        bounded = (
+            options['origins'] or options['destinations'] or options['popular']
+            or options['max_distance'] is not None
+        )
+        if not bounded and not options['all']:
+            raise CommandError(
+                'Computing every airport pair can create billions of routes. '
+                'Pass --origins, --destinations, --popular or --max-distance, or --all to proceed.'
+            )
+
+        origin_ids, origin_lats, origin_lons = self.airports(options['origins'], options['popular'])
+        dest_ids, dest_lats, dest_lons = self.airports(options['destinations'], options['popular'])
+        chunk_size = max(1, options['chunk_size'])
+        batch_size = max(1, options['batch_size'])
+        origin_vectors = unit_vectors(origin_lats, origin_lons)
+        dest_vectors = unit_vectors(dest_lats, dest_lons)
+
+        started = time.perf_counter()
+        written = 0
+
+        for start in range(0, len(origin_ids), chunk_size):
+            stop = start + chunk_size
+            dots = origin_vectors[start:stop] @ dest_vectors.T
+            chunk_origins = origin_ids[start:stop]
+
+            mask = chunk_origins[:, None] != dest_ids[None, :]
+            if options['max_distance'] is not None:
+                mask &= dots >= nm_to_dot(options['max_distance'])
+            rows, cols = np.nonzero(mask)
+
+            for batch in range(0, len(rows), batch_size):
+                batch_rows = rows[batch:batch + batch_size]
+                batch_cols = cols[batch:batch + batch_size]
+                selected = dot_to_nm(dots[batch_rows, batch_cols])
+                minutes = selected / options['speed'] * 60 + options['overhead']
+                written += self.save([
+                    FlightRoute(
+                        origin_id=int(origin_id),
+                        destination_id=int(destination_id),
+                        distance_nm=int(round(distance)),
+                        flight_time_minutes=int(round(duration)),
+                        estimated_flight_time=format_flight_time(duration),
+                    )
+                    for origin_id, destination_id, distance, duration in zip(
+                        chunk_origins[batch_rows], dest_ids[batch_cols], selected, minutes,
+                    )
+                ])
+
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'  {min(stop, len(origin_ids))}/{len(origin_ids)} origins, '
+                f'{written} routes ({written / elapsed if elapsed else 0:,.0f} routes/sec)'
+            )
+
+        # bulk_create bypasses post_save, so start a new FlightRoute generation
+        snippet_cache.bump(FlightRoute)
+        
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Saved {written} routes in {elapsed:.1f}s'
+        ))
+
+    def save(self, routes):
+        with transaction.atomic():
+            FlightRoute.objects.bulk_create(
+                routes,
+                update_conflicts=True,
+                unique_fields=['origin', 'destination'],
+                update_fields=UPDATE_FIELDS,
+            )
+        return len(routes)
@@ -0,0 +1,62 @@
+"""
+Management command to export flight inquiries as CSV or JSONL.
+Run: python manage.py export_inquiries --since 2026-01-01 --status new,quoted --gzip -o inquiries.csv.gz
+
+Rows are streamed in chunks, so memory stays flat for any table size.
+Writes to stdout when no --output is given.
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from booking.export import CSV, EXPORT_CHUNK_SIZE, FORMATS, filter_inquiries, iter_export
+from booking.models import FlightInquiry
+
+
+class Command(BaseCommand):
+    help = 'Stream FlightInquiry rows as CSV or JSONL, optionally gzip-compressed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default=CSV)
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--since', help='First created_at date to include (YYYY-MM-DD)')
+        parser.add_argument('--until', help='Last created_at date to include (YYYY-MM-DD)')
+        parser.add_argument('--status', help='Comma-separated statuses, e.g. new,quoted')
+        parser.add_argument('-o', '--output', help='File to write; defaults to stdout')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def parse_day(self, value, option):
+        if not value:
+            return None
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'--{option} must be a date in YYYY-MM-DD format')
+        return day
+
+    def handle(self, *args, **options):
+        statuses = [s.strip() for s in (options['status'] or '').split(',') if s.strip()]
+        valid = {value for value, _ in FlightInquiry._meta.get_field('status').choices}
+        unknown = set(statuses) - valid
+        if unknown:
+            raise CommandError(f'Unknown status: {", ".join(sorted(unknown))}')
+
+        queryset = filter_inquiries(
+            FlightInquiry.objects.all(),
+            since=self.parse_day(options['since'], 'since'),
+            until=self.parse_day(options['until'], 'until'),
+            statuses=statuses,
+        )
+        chunks = iter_export(queryset, options['format'], options['gzip'], options['chunk_size'])
+
+        if options['output']:
+            written = 0
+            with open(options['output'], 'wb') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+                    written += len(chunk)
+            self.stderr.write(self.style.SUCCESS(f'Wrote {written:,} bytes to {options["output"]}'))
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,105 @@
+"""
+Management command to drain the flight inquiry spool into the database.
+Run: python manage.py flush_inquiry_spool [--loop] [--requeue-dead] [--benchmark 10000]
+
+Use --loop to run as a dedicated flusher process next to the web workers,
+--requeue-dead to retry inquiries the database rejected once their cause
+is fixed, or --benchmark to measure spool append and flush throughput.
+"""
+import os
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from booking.ingest import FLUSH_BATCH_SIZE, FLUSH_INTERVAL, InquirySpool, drain_spool, get_spool
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Flush spooled flight inquiries into FlightInquiry in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=FLUSH_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep running and flush continuously')
+        parser.add_argument('--interval', type=float, default=FLUSH_INTERVAL, help='Seconds between passes with --loop')
+        parser.add_argument(
+            '--requeue-dead', action='store_true',
+            help='Move dead-lettered inquiries back into the spool before flushing',
+        )
+        parser.add_argument(
+            '--benchmark', type=int, metavar='N',
+            help='Spool N synthetic inquiries to a temporary spool, flush them and roll back',
+        )
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            return self.benchmark(options['benchmark'], options['batch_size'])
+
+        spool = get_spool()
+        if options['requeue_dead']:
+            self.stdout.write(f'Requeued {spool.requeue_dead_letters()} dead-lettered inquiries')
+        while True:
+            started = time.perf_counter()
+            moved = drain_spool(spool, options['batch_size'])
+            if moved:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'Flushed {moved} inquiries ({moved / elapsed:,.0f} rows/sec)')
+            if not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Spool drained, {spool.count()} pending'))
+                dead = spool.dead_count()
+                if dead:
+                    self.stdout.write(self.style.WARNING(
+                        f'{dead} inquiries could not be stored; see the dead_letter table in {spool.path}'
+                    ))
+                return
+            time.sleep(options['interval'])
+
+    def benchmark(self, count, batch_size):
+        departure = (date.today() + timedelta(days=30)).isoformat()
+        payloads = [
+            {
+                'origin': 'Toluca (TLC)',
+                'destination': 'Cancun (CUN)',
+                'departure_date': departure,
+                'return_date': None,
+                'passengers': 2,
+                'name': 'Benchmark',
+                'email': f'benchmark{i}@example.com',
+                'phone': '',
+                'message': '',
+                'submission_key': uuid.uuid4().hex,
+                'created_at': timezone.now().isoformat(),
+            }
+            for i in range(count)
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            spool = InquirySpool(os.path.join(tmp, 'spool.sqlite3'))
+
+            # One durable commit per request, as flight_quote_api does
+            started = time.perf_counter()
+            for payload in payloads:
+                spool.append(payload)
+            append_elapsed = time.perf_counter() - started
+
+            started = time.perf_counter()
+            try:
+                with transaction.atomic():
+                    moved = drain_spool(spool, batch_size)
+                    flush_elapsed = time.perf_counter() - started
+                    raise Rollback()
+            except Rollback:
+                pass
+            spool.close()
+
+        self.stdout.write(f'Append: {count} inquiries in {append_elapsed:.2f}s ({count / append_elapsed:,.0f}/sec)')
+        self.stdout.write(f'Flush:  {moved} inquiries in {flush_elapsed:.2f}s ({moved / flush_elapsed:,.0f}/sec)')
+        self.stdout.write(self.style.SUCCESS('Benchmark rows were rolled back'))
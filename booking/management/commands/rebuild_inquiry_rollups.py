@@ -0,0 +1,32 @@
+"""
+Management command to rebuild the daily inquiry rollup from FlightInquiry.
+Run: python manage.py rebuild_inquiry_rollups [--since 2026-01-01]
+
+Use after bulk edits that bypass model signals (queryset.update, raw SQL)
+or to backfill the rollup for existing inquiries.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from booking.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute InquiryDailyRollup from FlightInquiry'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only rebuild days from this date on (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+
+        started = time.perf_counter()
+        created = rebuild_rollups(since)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} rollup rows in {elapsed:.1f}s'))
@@ -0,0 +1,65 @@
+"""
+Management command to backfill FlightInquiry origin/destination airports.
+Run: python manage.py resolve_inquiry_airports [--batch-size 5000] [--all]
+
+Walks inquiries in primary key order, resolves the free-text origin and
+destination through the in-memory airport map and writes the foreign keys
+with one UPDATE per distinct (origin, destination) pair in each batch.
+"""
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from booking.models import FlightInquiry
+from booking.resolve import airport_resolver
+
+
+class Command(BaseCommand):
+    help = 'Resolve free-text inquiry origin/destination to Airport foreign keys'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--all', action='store_true', help='Re-resolve inquiries that already have airports')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = FlightInquiry.objects.order_by('id')
+        if not options['all']:
+            queryset = queryset.filter(Q(origin_airport__isnull=True) | Q(destination_airport__isnull=True))
+
+        airport_resolver.ensure_loaded()
+        started = time.perf_counter()
+        last_id = 0
+        scanned = resolved = 0
+        while True:
+            rows = list(
+                queryset.filter(id__gt=last_id)
+                .values_list('id', 'origin', 'destination', 'origin_airport_id', 'destination_airport_id')[:batch_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            scanned += len(rows)
+
+            # Group by the resolved pair so each batch needs only a few UPDATEs
+            groups = defaultdict(list)
+            for pk, origin, destination, origin_id, destination_id in rows:
+                new_origin = airport_resolver.lookup(origin) or (None if options['all'] else origin_id)
+                new_destination = airport_resolver.lookup(destination) or (None if options['all'] else destination_id)
+                if (new_origin, new_destination) != (origin_id, destination_id):
+                    groups[new_origin, new_destination].append(pk)
+
+            with transaction.atomic():
+                for (origin_id, destination_id), ids in groups.items():
+                    FlightInquiry.objects.filter(id__in=ids).update(
+                        origin_airport_id=origin_id, destination_airport_id=destination_id,
+                    )
+                    resolved += len(ids)
+
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{scanned:,} scanned, {resolved:,} updated ({scanned / elapsed:,.0f} rows/sec)')
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {resolved:,} of {scanned:,} inquiries updated'))
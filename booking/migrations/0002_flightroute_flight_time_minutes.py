@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightroute',
+            name='flight_time_minutes',
+            field=models.PositiveIntegerField(blank=True, help_text='Estimated block time in minutes', null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-17 20:46
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0002_flightroute_flight_time_minutes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightinquiry',
+            name='submission_key',
+            field=models.CharField(blank=True, editable=False, help_text='Unique key of the original submission, used to ignore replays', max_length=64, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='flightinquiry',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-17 20:59
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+# Trigram indexes matching the UPPER(col::text) LIKE '%term%' that the admin's
+# icontains search compiles to on PostgreSQL
+TRIGRAM_COLUMNS = ['origin', 'destination', 'name', 'email']
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in TRIGRAM_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS booking_inquiry_{column}_trgm '
+            f'ON booking_flightinquiry USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in TRIGRAM_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS booking_inquiry_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_flightinquiry_submission_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flightinquiry',
+            index=models.Index(fields=['-created_at', '-id'], name='booking_inquiry_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flightinquiry',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='booking_inquiry_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flightinquiry',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='booking_inquiry_email_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
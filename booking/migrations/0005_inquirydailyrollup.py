@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-17 21:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_flightinquiry_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InquiryDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('origin', models.CharField(max_length=200)),
+                ('destination', models.CharField(max_length=200)),
+                ('status', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Inquiry Daily Rollup',
+                'verbose_name_plural': 'Inquiry Daily Rollups',
+                'ordering': ['-date', 'origin', 'destination', 'status'],
+                'indexes': [models.Index(fields=['status', 'date'], name='booking_rollup_status_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'origin', 'destination', 'status'), name='booking_rollup_unique_key')],
+            },
+        ),
+    ]
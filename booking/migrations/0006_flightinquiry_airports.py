@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-17 21:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_inquirydailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightinquiry',
+            name='destination_airport',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='arriving_inquiries', to='booking.airport'),
+        ),
+        migrations.AddField(
+            model_name='flightinquiry',
+            name='origin_airport',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='departing_inquiries', to='booking.airport'),
+        ),
+        migrations.AddIndex(
+            model_name='flightinquiry',
+            index=models.Index(fields=['origin_airport', 'destination_airport'], name='booking_inquiry_route_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0 on 2026-10-17 22:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_flightinquiry_airports'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightinquiry',
+            name='content_key',
+            field=models.CharField(blank=True, editable=False, help_text='Hash of email, route and departure date, used to ignore resubmissions', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='flightinquiry',
+            index=models.Index(fields=['content_key', '-created_at'], name='booking_inquiry_content_idx'),
+        ),
+    ]
@@ -1,8 +1,18 @@
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 from wagtail.admin.panels import FieldPanel, MultiFieldPanel
 from wagtail.snippets.models import register_snippet
 
 
+def format_flight_time(minutes):
+    """Format a duration in minutes, e.g. 150 -> 2h 30m"""
+    hours, minutes = divmod(int(round(minutes)), 60)
+    if not hours:
+        return f"{minutes}m"
+    return f"{hours}h {minutes:02d}m"
+
+
 @register_snippet
 class Airport(models.Model):
     """Airport/Location for flight booking"""
@@ -43,7 +53,11 @@ class Airport(models.Model):
     
     @property
     def display_name(self):
-        return f"{self.city} ({self.code})"
+        return self.format_display_name(self.city, self.code)
+    
+    @staticmethod
+    def format_display_name(city, code):
+        return f"{city} ({code})"
     
     class Meta:
         ordering = ['city']
@@ -67,6 +81,10 @@ class FlightRoute(models.Model):
     
     distance_nm = models.IntegerField(help_text="Distance in nautical miles")
     estimated_flight_time = models.CharField(max_length=50, help_text="e.g. 2h 30m")
+    flight_time_minutes = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Estimated block time in minutes"
+    )
     
     base_price = models.DecimalField(
         max_digits=10, decimal_places=2,
@@ -85,6 +103,7 @@ class FlightRoute(models.Model):
         MultiFieldPanel([
             FieldPanel('distance_nm'),
             FieldPanel('estimated_flight_time'),
+            FieldPanel('flight_time_minutes'),
             FieldPanel('base_price'),
         ], heading="Details"),
         MultiFieldPanel([
@@ -106,6 +125,15 @@ class FlightInquiry(models.Model):
     """Flight quote/inquiry submissions"""
     origin = models.CharField(max_length=200)
     destination = models.CharField(max_length=200)
+    # Resolved from the free-text origin/destination at ingestion
+    origin_airport = models.ForeignKey(
+        Airport, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='departing_inquiries', db_index=False,
+    )
+    destination_airport = models.ForeignKey(
+        Airport, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='arriving_inquiries',
+    )
     departure_date = models.DateField()
     return_date = models.DateField(null=True, blank=True)
     passengers = models.IntegerField(default=1)
@@ -117,7 +145,9 @@ class FlightInquiry(models.Model):
     
     aircraft_preference = models.CharField(max_length=200, blank=True)
     
-    created_at = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add so spooled inquiries keep the time
+    # they were submitted, not the time they were flushed
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     status = models.CharField(
         max_length=50,
         choices=[
@@ -132,10 +162,56 @@ class FlightInquiry(models.Model):
     )
     notes = models.TextField(blank=True)
     
+    submission_key = models.CharField(
+        max_length=64, unique=True,
+        null=True, blank=True, editable=False,
+        help_text="Unique key of the original submission, used to ignore replays"
+    )
+    content_key = models.CharField(
+        max_length=64, blank=True, editable=False,
+        help_text="Hash of email, route and departure date, used to ignore resubmissions"
+    )
+    
     def __str__(self):
         return f"{self.origin} → {self.destination} ({self.departure_date})"
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Newest-first changelist, optionally filtered by status
+            models.Index(fields=['-created_at', '-id'], name='booking_inquiry_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='booking_inquiry_status_idx'),
+            models.Index(Upper('email'), name='booking_inquiry_email_idx'),
+            # Also serves lookups on origin_airport alone
+            models.Index(fields=['origin_airport', 'destination_airport'], name='booking_inquiry_route_idx'),
+            # Recent submissions of the same trip
+            models.Index(fields=['content_key', '-created_at'], name='booking_inquiry_content_idx'),
+        ]
         verbose_name = "Flight Inquiry"
         verbose_name_plural = "Flight Inquiries"
+
+
+class InquiryDailyRollup(models.Model):
+    """Number of flight inquiries per day, route and status, kept up to date incrementally"""
+    date = models.DateField()
+    origin = models.CharField(max_length=200)
+    destination = models.CharField(max_length=200)
+    status = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.date} {self.origin} → {self.destination} [{self.status}]: {self.count}"
+    
+    class Meta:
+        ordering = ['-date', 'origin', 'destination', 'status']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'origin', 'destination', 'status'],
+                name='booking_rollup_unique_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'date'], name='booking_rollup_status_idx'),
+        ]
+        verbose_name = "Inquiry Daily Rollup"
+        verbose_name_plural = "Inquiry Daily Rollups"
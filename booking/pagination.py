@@ -0,0 +1,113 @@
+"""
+Paginator for large, newest-first tables such as FlightInquiry.
+
+KeysetPaginator keeps Django's page-number interface, so it drops into
+the admin changelist, but seeks on the (created_at, id) key instead of
+using a deep OFFSET. The first key of every page served is cached per
+query, so the next page, or any page after a visited one, starts from
+the nearest known boundary. Boundaries are also keyed on a change
+counter for the model, advanced by every insert, edit and delete (see
+record_change), since any of them can shift the rows between pages.
+Counts are cached and, on PostgreSQL, large ones come from the planner
+estimate instead of a full COUNT(*).
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from home.snippet_cache import counters, increment
+
+
+BOUNDARY_CACHE_TIMEOUT = 10 * 60
+COUNT_CACHE_TIMEOUT = 60
+# Planner estimates are only trusted above this many rows
+ESTIMATE_THRESHOLD = 100000
+
+
+def estimated_count(queryset):
+    """Row estimate from the PostgreSQL planner, or None on other backends"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _changes_key(model):
+    return f'pagination:changes:{model._meta.label_lower}'
+
+
+def record_change(model):
+    """Forget the page boundaries of ``model``'s listings after rows were added, edited or deleted"""
+    increment(_changes_key(model))
+
+
+class KeysetPaginator(Paginator):
+    """Page-number paginator that seeks on (created_at, id) instead of OFFSET"""
+
+    date_field = 'created_at'
+
+    @cached_property
+    def query_key(self):
+        return hashlib.md5(str(self.object_list.query).encode()).hexdigest()
+
+    @cached_property
+    def count(self):
+        key = f'pagination:count:{self.query_key}'
+        count = cache.get(key)
+        if count is None:
+            count = estimated_count(self.object_list)
+            if count is None or count < ESTIMATE_THRESHOLD:
+                count = self.object_list.count()
+            cache.set(key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+    @cached_property
+    def keyset_ordered(self):
+        ordering = list(self.object_list.query.order_by)
+        # The admin appends -pk to make the ordering deterministic
+        while len(ordering) > 2 and ordering[-1] in ('-pk', '-id'):
+            ordering.pop()
+        return ordering in ([f'-{self.date_field}', '-id'], [f'-{self.date_field}', '-pk'])
+
+    def _boundaries_key(self):
+        changes = counters([_changes_key(self.object_list.model)])[0]
+        return f'pagination:boundaries:{self.query_key}:{self.per_page}:{changes}'
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.keyset_ordered or self.orphans:
+            return super().page(number)
+
+        boundaries_key = self._boundaries_key()
+        boundaries = cache.get(boundaries_key) or {}
+        start = max((n for n in boundaries if n <= number), default=1)
+        queryset = self.object_list
+        if start > 1:
+            created_at, pk = boundaries[start]
+            queryset = queryset.filter(
+                Q(**{f'{self.date_field}__lt': created_at})
+                | Q(**{self.date_field: created_at, 'pk__lte': pk})
+            )
+
+        offset = (number - start) * self.per_page
+        # One extra row tells us where the next page starts
+        rows = list(queryset[offset:offset + self.per_page + 1])
+        if rows:
+            boundaries[number] = (getattr(rows[0], self.date_field), rows[0].pk)
+        if len(rows) > self.per_page:
+            last = rows[self.per_page]
+            boundaries[number + 1] = (getattr(last, self.date_field), last.pk)
+        cache.set(boundaries_key, boundaries, BOUNDARY_CACHE_TIMEOUT)
+
+        return self._get_page(rows[:self.per_page], number, self)
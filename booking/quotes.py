@@ -0,0 +1,142 @@
+"""
+Batch quote engine for indicative charter prices.
+
+The available fleet is loaded once into NumPy arrays (speed, range,
+hourly rate, seats). A quote then prices every aircraft for every
+requested route in one vectorized pass: block time, fuel stops and
+price are computed for the whole routes x aircraft matrix at once.
+The arrays are rebuilt whenever the Aircraft or AircraftCategory
+generation changes.
+"""
+import numpy as np
+
+from fleet.models import Aircraft, AircraftCategory
+from home import snippet_cache
+
+from .geo import great_circle_nm
+from .models import Airport, FlightRoute, format_flight_time
+
+
+# Taxi, climb and descent allowance added to every leg
+LEG_OVERHEAD_MINUTES = 15
+# Ground time for each intermediate fuel stop
+FUEL_STOP_MINUTES = 45
+
+
+class FleetPricing:
+    """Available aircraft as compact numeric arrays"""
+
+    cache_key = 'booking:fleet_pricing'
+
+    def clear(self):
+        snippet_cache.forget(self.cache_key)
+
+    def load(self):
+        rows = list(
+            Aircraft.objects.filter(is_available=True)
+            .order_by('order', 'name')
+            .values_list('id', 'name', 'category__name', 'passengers', 'range_nm', 'speed_knots', 'hourly_rate')
+        )
+        return {
+            'ids': [row[0] for row in rows],
+            'names': [row[1] for row in rows],
+            'categories': [row[2] or '' for row in rows],
+            'passengers': np.array([row[3] for row in rows], dtype=np.int64),
+            'range_nm': np.array([max(row[4], 1) for row in rows], dtype=np.float64),
+            'speed_knots': np.array([max(row[5], 1) for row in rows], dtype=np.float64),
+            'hourly_rate': np.array(
+                [np.nan if row[6] is None else float(row[6]) for row in rows], dtype=np.float64,
+            ),
+        }
+
+    @property
+    def arrays(self):
+        return snippet_cache.cached(self.cache_key, (Aircraft, AircraftCategory), self.load)
+
+    def price_matrix(self, distances_nm):
+        """
+        Price every available aircraft for every distance.
+
+        Returns the fleet arrays and a dict of ``(routes, aircraft)`` arrays:
+        ``legs``, ``fuel_stops``, ``block_minutes`` and ``price`` (NaN when
+        the aircraft has no hourly rate).
+        """
+        fleet = self.arrays
+        distances = np.asarray(distances_nm, dtype=np.float64)[:, None]
+
+        legs = np.maximum(np.ceil(distances / fleet['range_nm'][None, :]), 1)
+        fuel_stops = legs - 1
+        block_minutes = (
+            distances / fleet['speed_knots'][None, :] * 60
+            + legs * LEG_OVERHEAD_MINUTES
+            + fuel_stops * FUEL_STOP_MINUTES
+        )
+        price = block_minutes / 60 * fleet['hourly_rate'][None, :]
+        return fleet, {
+            'legs': legs,
+            'fuel_stops': fuel_stops,
+            'block_minutes': block_minutes,
+            'price': price,
+        }
+
+    def quote(self, distances_nm, passengers=1):
+        """Return, per distance, the suitable aircraft sorted by price"""
+        fleet, matrix = self.price_matrix(distances_nm)
+        seats_ok = fleet['passengers'] >= passengers
+
+        results = []
+        for row, price in enumerate(matrix['price']):
+            # NaN prices (no hourly rate) sort after every priced aircraft
+            order = np.lexsort((matrix['block_minutes'][row], price))
+            options = []
+            for col in order:
+                if not seats_ok[col]:
+                    continue
+                minutes = matrix['block_minutes'][row, col]
+                options.append({
+                    'id': fleet['ids'][col],
+                    'name': fleet['names'][col],
+                    'category': fleet['categories'][col],
+                    'passengers': int(fleet['passengers'][col]),
+                    'fuel_stops': int(matrix['fuel_stops'][row, col]),
+                    'block_time_minutes': int(round(minutes)),
+                    'block_time': format_flight_time(minutes),
+                    'price': None if np.isnan(price[col]) else round(float(price[col]), 2),
+                })
+            results.append(options)
+        return results
+
+
+def route_distances(pairs):
+    """
+    Distances in nm for (origin code, destination code) pairs.
+
+    Stored FlightRoute distances win; otherwise the great-circle distance
+    between the airports is used. Unknown pairs map to None.
+    """
+    codes = {code for pair in pairs for code in pair}
+    known = {
+        (origin, destination): distance
+        for origin, destination, distance in FlightRoute.objects.filter(
+            origin__code__in=codes, destination__code__in=codes,
+        ).values_list('origin__code', 'destination__code', 'distance_nm')
+    }
+    coords = None
+    distances = []
+    for pair in pairs:
+        distance = known.get(pair)
+        if distance is None:
+            if coords is None:
+                coords = {
+                    code: (lat, lon)
+                    for code, lat, lon in Airport.objects.filter(
+                        code__in=codes, latitude__isnull=False, longitude__isnull=False,
+                    ).values_list('code', 'latitude', 'longitude')
+                }
+            if pair[0] in coords and pair[1] in coords:
+                distance = great_circle_nm(*coords[pair[0]], *coords[pair[1]])
+        distances.append(distance)
+    return distances
+
+
+fleet_pricing = FleetPricing()
@@ -0,0 +1,80 @@
+"""
+Resolve free-text airport strings to Airport ids.
+
+The booking modal submits values such as "Toluca (TLC)" (an airport's
+display name) or a bare code. AirportResolver keeps an in-memory map of
+every airport's display name and code, available or not, so ingestion
+and backfills can attach Airport foreign keys without a query per row.
+Like the search index it is built lazily and kept current from Airport
+signals.
+"""
+import re
+
+from .models import Airport
+from .search import AirportIndex, normalize
+
+
+# Accepts a bare code ("TLC") or an autocomplete display string ("Toluca (TLC)")
+AIRPORT_CODE_RE = re.compile(r'\(([A-Za-z0-9]{2,10})\)\s*$|^\s*([A-Za-z0-9]{2,10})\s*$')
+
+
+def parse_airport_code(value):
+    match = AIRPORT_CODE_RE.search(value or '')
+    if not match:
+        return None
+    return (match.group(1) or match.group(2)).upper()
+
+
+class AirportResolver(AirportIndex):
+    """Display name and code lookup over all airports"""
+
+    def _reset(self):
+        self.displays = {}
+        self.codes = {}
+        self.keys = {}
+
+    def get_queryset(self):
+        # Historical inquiries may name airports that are no longer offered
+        return Airport.objects.only('id', 'code', 'city')
+
+    def includes(self, airport):
+        return True
+
+    def _add(self, airport):
+        display = normalize(airport.display_name)
+        code = airport.code.upper()
+        self.displays[display] = airport.pk
+        self.codes[code] = airport.pk
+        self.keys[airport.pk] = (display, code)
+
+    def _remove(self, airport_id):
+        display, code = self.keys.pop(airport_id, (None, None))
+        if self.displays.get(display) == airport_id:
+            del self.displays[display]
+        if self.codes.get(code) == airport_id:
+            del self.codes[code]
+
+    def resolve(self, text):
+        """Airport id for a display name or code, or None"""
+        self.ensure_loaded()
+        return self.lookup(text)
+
+    def lookup(self, text):
+        """resolve() without the freshness check, for batches after ensure_loaded()"""
+        airport_id = self.displays.get(normalize(text))
+        if airport_id is None:
+            code = parse_airport_code(text)
+            if code:
+                airport_id = self.codes.get(code)
+        return airport_id
+
+
+airport_resolver = AirportResolver()
+
+
+def resolve_airports(fields, generation=None):
+    """Set origin_airport_id/destination_airport_id from the free-text route in ``fields``"""
+    airport_resolver.ensure_loaded(generation)
+    fields['origin_airport_id'] = airport_resolver.lookup(fields['origin'])
+    fields['destination_airport_id'] = airport_resolver.lookup(fields['destination'])
+    return fields
@@ -0,0 +1,137 @@
+"""
+Incrementally maintained daily inquiry counts for reporting.
+
+InquiryDailyRollup holds one row per (day, origin, destination, status)
+with the number of inquiries in it. Signals apply +1/-1 deltas when an
+inquiry is created, changes status or route, or is deleted. The spool
+flush applies a Counter per batch, since bulk_create sends no signals.
+Reports read the rollup instead of aggregating FlightInquiry, and
+rebuild_rollups recomputes it from scratch after bulk edits.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .export import filter_inquiries
+from .models import FlightInquiry, InquiryDailyRollup
+
+
+REBUILD_BATCH_SIZE = 5000
+
+
+def rollup_key(inquiry):
+    created_at = inquiry.created_at
+    if timezone.is_aware(created_at):
+        created_at = timezone.localtime(created_at)
+    return (created_at.date(), inquiry.origin, inquiry.destination, inquiry.status)
+
+
+def apply_deltas(deltas):
+    """Add a {(date, origin, destination, status): delta} mapping to the rollup"""
+    for (date, origin, destination, status), delta in deltas.items():
+        if not delta:
+            continue
+        key = {'date': date, 'origin': origin, 'destination': destination, 'status': status}
+        rows = InquiryDailyRollup.objects.filter(**key)
+        if rows.update(count=F('count') + delta):
+            if delta < 0:
+                rows.filter(count__lte=0).delete()
+            continue
+        if delta < 0:
+            # Nothing recorded for this key yet, e.g. before the first rebuild
+            continue
+        try:
+            with transaction.atomic():
+                InquiryDailyRollup.objects.create(count=delta, **key)
+        except IntegrityError:
+            # Created concurrently by another writer
+            rows.update(count=F('count') + delta)
+
+
+def record_created(inquiry):
+    apply_deltas({rollup_key(inquiry): 1})
+
+
+def record_changed(old_key, inquiry):
+    new_key = rollup_key(inquiry)
+    if old_key != new_key:
+        apply_deltas(Counter({old_key: -1, new_key: 1}))
+
+
+def record_deleted(inquiry):
+    apply_deltas({rollup_key(inquiry): -1})
+
+
+def record_batch(inquiries):
+    apply_deltas(Counter(rollup_key(inquiry) for inquiry in inquiries))
+
+
+def rebuild_rollups(since=None):
+    """Recompute the rollup from FlightInquiry, optionally only from ``since`` (a date) on"""
+    rollups = InquiryDailyRollup.objects.all()
+    inquiries = FlightInquiry.objects.all()
+    if since:
+        rollups = rollups.filter(date__gte=since)
+        inquiries = filter_inquiries(inquiries, since=since)
+
+    grouped = (
+        inquiries.annotate(day=TruncDate('created_at'))
+        .values('day', 'origin', 'destination', 'status')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    created = 0
+    with transaction.atomic():
+        rollups.delete()
+        batch = []
+        for row in grouped.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            batch.append(InquiryDailyRollup(
+                date=row['day'], origin=row['origin'], destination=row['destination'],
+                status=row['status'], count=row['total'],
+            ))
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                InquiryDailyRollup.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        InquiryDailyRollup.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def _rollups(since=None, until=None):
+    rollups = InquiryDailyRollup.objects.all()
+    if since:
+        rollups = rollups.filter(date__gte=since)
+    if until:
+        rollups = rollups.filter(date__lte=until)
+    return rollups
+
+
+def status_counts(since=None, until=None):
+    """{status: inquiries} over a date range, read from the rollup"""
+    return dict(
+        _rollups(since, until).values_list('status').annotate(total=Sum('count')).order_by()
+    )
+
+
+def route_counts(since=None, until=None, limit=20):
+    """Busiest (origin, destination) pairs over a date range, read from the rollup"""
+    return list(
+        _rollups(since, until)
+        .values('origin', 'destination')
+        .annotate(total=Sum('count'))
+        .order_by('-total', 'origin', 'destination')[:limit]
+    )
+
+
+def daily_counts(days=30, status=None):
+    """Inquiries per day for the last ``days`` days, read from the rollup"""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    rollups = _rollups(since)
+    if status:
+        rollups = rollups.filter(status=status)
+    return dict(rollups.values_list('date').annotate(total=Sum('count')).order_by('date'))
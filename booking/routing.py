@@ -0,0 +1,171 @@
+"""
+Multi-leg itinerary search over the FlightRoute graph.
+
+Available FlightRoutes form a directed graph between airports. The
+adjacency lists and airport coordinates are cached in memory and rebuilt
+whenever the Airport or FlightRoute generation changes. Searches run A* with a
+great-circle heuristic (plain Dijkstra when no admissible heuristic
+exists), skipping legs longer than the aircraft's range.
+"""
+import heapq
+
+from home import snippet_cache
+
+from .geo import great_circle_nm
+from .models import Airport, FlightRoute
+from .quotes import LEG_OVERHEAD_MINUTES
+
+
+FASTEST = 'fastest'
+CHEAPEST = 'cheapest'
+
+
+class RouteGraph:
+    """Cached adjacency structure over available routes"""
+
+    cache_key = 'booking:route_graph'
+
+    def clear(self):
+        snippet_cache.forget(self.cache_key)
+
+    def load(self):
+        airports = {
+            pk: {'code': code, 'city': city, 'latitude': lat, 'longitude': lon}
+            for pk, code, city, lat, lon in Airport.objects.filter(is_available=True).values_list(
+                'id', 'code', 'city', 'latitude', 'longitude',
+            )
+        }
+        adjacency = {}
+        routes = FlightRoute.objects.filter(is_available=True).values_list(
+            'origin_id', 'destination_id', 'distance_nm', 'base_price',
+        )
+        for origin_id, destination_id, distance, base_price in routes.iterator(chunk_size=5000):
+            if origin_id not in airports or destination_id not in airports:
+                continue
+            adjacency.setdefault(origin_id, []).append(
+                (destination_id, distance, None if base_price is None else float(base_price))
+            )
+        codes = {airport['code']: pk for pk, airport in airports.items()}
+        return {'airports': airports, 'adjacency': adjacency, 'codes': codes}
+
+    @property
+    def graph(self):
+        return snippet_cache.cached(self.cache_key, (Airport, FlightRoute), self.load)
+
+    @staticmethod
+    def _straight_line_nm(airports, a, b):
+        a, b = airports[a], airports[b]
+        if None in (a['latitude'], a['longitude'], b['latitude'], b['longitude']):
+            return None
+        return great_circle_nm(a['latitude'], a['longitude'], b['latitude'], b['longitude'])
+
+    def find_path(self, origin_code, destination_code, range_nm, speed_knots, hourly_rate=None,
+                  optimize=FASTEST, max_legs=6):
+        """
+        Return the best itinerary as a dict, or None when no path exists.
+
+        Legs longer than ``range_nm`` are never used. ``fastest`` minimizes
+        block time; ``cheapest`` uses each route's base price when set and
+        otherwise block time at ``hourly_rate``.
+        """
+        graph = self.graph
+        origin = graph['codes'].get(origin_code)
+        destination = graph['codes'].get(destination_code)
+        if origin is None or destination is None:
+            return None
+
+        def leg_minutes(distance):
+            return distance / speed_knots * 60 + LEG_OVERHEAD_MINUTES
+
+        def leg_cost(distance, base_price):
+            if optimize == CHEAPEST:
+                if base_price is not None:
+                    return base_price
+                if hourly_rate is not None:
+                    return leg_minutes(distance) / 60 * hourly_rate
+            return leg_minutes(distance)
+
+        # Straight-line block time never overestimates the remaining time,
+        # so A* is exact for "fastest". Prices have no such bound (a stored
+        # base price can undercut the hourly estimate), so "cheapest" runs
+        # as plain Dijkstra. The graph is read once above, so the heuristic
+        # costs no cache lookups per node.
+        airports = graph['airports']
+
+        def heuristic(node):
+            if optimize != FASTEST or node == destination:
+                return 0
+            remaining = self._straight_line_nm(airports, node, destination)
+            return 0 if remaining is None else remaining / speed_knots * 60
+
+        # Labels are keyed on (node, legs): a cheaper path that reached a node
+        # in more legs must not hide a dearer one that still has legs to spare.
+        # A label is only kept when no label at that node with as few legs
+        # costs as little.
+        def dominated(node, legs, cost):
+            return any(best.get((node, fewer), float('inf')) <= cost for fewer in range(legs + 1))
+
+        start = (origin, 0)
+        best = {start: 0}
+        previous = {}
+        queue = [(heuristic(origin), 0, origin, 0)]
+        reached = None
+        while queue:
+            _, cost, node, legs = heapq.heappop(queue)
+            if node == destination:
+                reached = (node, legs)
+                break
+            if cost > best.get((node, legs), float('inf')) or legs >= max_legs:
+                continue
+            for neighbour, distance, base_price in graph['adjacency'].get(node, ()):
+                if distance > range_nm:
+                    continue
+                new_cost = cost + leg_cost(distance, base_price)
+                if dominated(neighbour, legs + 1, new_cost):
+                    continue
+                best[(neighbour, legs + 1)] = new_cost
+                previous[(neighbour, legs + 1)] = ((node, legs), distance, base_price)
+                heapq.heappush(queue, (new_cost + heuristic(neighbour), new_cost, neighbour, legs + 1))
+
+        if reached is None:
+            return None
+
+        legs = []
+        label = reached
+        while label != start:
+            parent, distance, base_price = previous[label]
+            legs.append((parent[0], label[0], distance, base_price))
+            label = parent
+        legs.reverse()
+
+        total_minutes = 0
+        total_price = 0
+        priced = True
+        itinerary = []
+        for parent, node, distance, base_price in legs:
+            minutes = leg_minutes(distance)
+            price = base_price
+            if price is None and hourly_rate is not None:
+                price = minutes / 60 * hourly_rate
+            if price is None:
+                priced = False
+            else:
+                total_price += price
+            total_minutes += minutes
+            itinerary.append({
+                'origin': airports[parent]['code'],
+                'destination': airports[node]['code'],
+                'distance_nm': distance,
+                'block_time_minutes': int(round(minutes)),
+                'price': None if price is None else round(price, 2),
+            })
+
+        return {
+            'legs': itinerary,
+            'distance_nm': sum(leg['distance_nm'] for leg in itinerary),
+            'block_time_minutes': int(round(total_minutes)),
+            'price': round(total_price, 2) if priced else None,
+        }
+
+
+route_graph = RouteGraph()
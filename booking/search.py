@@ -0,0 +1,380 @@
+"""
+In-process search index for airport autocomplete.
+
+The index keeps every available Airport in memory and answers queries
+without touching the database:
+
+- a prefix trie over airport codes and city words
+- trigram postings over name, city and country for substring matches
+
+Results are ranked exact code hits first, then prefix hits, then
+substring hits. The index is built lazily on first use and kept up to
+date incrementally from Airport post_save/post_delete signals, once
+their transaction commits. When the Airport generation shows a change
+made elsewhere, it is rebuilt by a background thread and swapped in,
+while searches keep using the old index.
+"""
+import bisect
+import copy
+import heapq
+import logging
+import threading
+
+from django.db import connections
+
+from home import snippet_cache
+
+from .models import Airport
+
+
+logger = logging.getLogger(__name__)
+
+MAX_RESULTS = 20
+
+# Trigrams shared by more airports than this are not intersected; the
+# airports are walked in rank order instead until enough of them match
+SUBSTRING_SCAN_LIMIT = 2000
+
+RANK_EXACT = 0
+RANK_PREFIX = 1
+RANK_SUBSTRING = 2
+
+
+def normalize(text):
+    """Lowercase and collapse whitespace"""
+    return ' '.join((text or '').lower().split())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class PrefixTrie:
+    """Character trie mapping string prefixes to airport ids"""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, key, airport_id):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+            node.setdefault(None, set()).add(airport_id)
+
+    def remove(self, key, airport_id):
+        node = self.root
+        path = []
+        for char in key:
+            child = node.get(char)
+            if child is None:
+                return
+            path.append((node, char))
+            node = child
+            node.get(None, set()).discard(airport_id)
+        # Prune branches that no longer lead to any airport
+        for parent, char in reversed(path):
+            child = parent[char]
+            if child.get(None) or len(child) > 1:
+                break
+            del parent[char]
+
+    def lookup(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+        return node.get(None, set())
+
+
+class AirportIndex:
+    """
+    Base class for in-memory indexes over available airports.
+
+    Subclasses implement ``_reset``, ``_add`` and ``_remove``; loading,
+    locking and incremental updates are shared. The index remembers the
+    Airport generation it reflects and rebuilds when another process has
+    moved the generation on.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._loaded = False
+        self._generation = None
+        self._reset()
+
+    def _reset(self):
+        raise NotImplementedError
+
+    def _add(self, airport):
+        raise NotImplementedError
+
+    def _remove(self, airport_id):
+        raise NotImplementedError
+
+    def _loaded_all(self):
+        """Hook run on the new data once every airport is added, before it is swapped in"""
+
+    def get_queryset(self):
+        return Airport.objects.filter(is_available=True)
+
+    def includes(self, airport):
+        return airport.is_available
+
+    def _rebuild(self):
+        # Read first: a change during the load moves it on and forces another rebuild
+        generation = snippet_cache.generation(Airport)
+        # Loaded into a copy without holding the lock, so searches carry on
+        # against the current data until the new data is swapped in
+        fresh = copy.copy(self)
+        fresh._reset()
+        for airport in self.get_queryset().iterator(chunk_size=5000):
+            fresh._add(airport)
+        fresh._loaded_all()
+        with self._lock:
+            # Every attribute _reset() creates, in one step
+            self.__dict__.update(vars(fresh))
+            self._generation = generation
+            self._loaded = True
+
+    def rebuild(self):
+        with self._build_lock:
+            self._rebuild()
+
+    def _rebuild_in_background(self):
+        if not self._build_lock.acquire(blocking=False):
+            # Already being rebuilt
+            return
+
+        def run():
+            try:
+                self._rebuild()
+            except Exception:
+                logger.exception('Rebuilding %s failed', type(self).__name__)
+            finally:
+                self._build_lock.release()
+                connections.close_all()
+
+        threading.Thread(target=run, name=f'{type(self).__name__}-rebuild', daemon=True).start()
+
+    def ensure_loaded(self, generation=None):
+        """
+        Build the index if needed, or start rebuilding it if out of date.
+
+        Pass the Airport ``generation`` when it has already been read (e.g.
+        asynchronously) to skip the cache lookup; with the index ready this
+        then never blocks.
+        """
+        if generation is None:
+            generation = snippet_cache.generation(Airport)
+        if self._loaded and self._is_current(generation):
+            return
+        if self._loaded:
+            # Out of date: answer from the current data until the rebuild lands
+            self._rebuild_in_background()
+            return
+        with self._build_lock:
+            if not self._loaded:
+                self._rebuild()
+
+    @property
+    def loaded(self):
+        """Whether the index is built and reflects the current generation"""
+        return self._loaded and self._is_current(snippet_cache.generation(Airport))
+
+    @property
+    def ready(self):
+        """Whether the index can answer without loading from the database"""
+        return self._loaded
+
+    def clear(self):
+        """Drop the index so that it is rebuilt on next use"""
+        with self._lock:
+            self._reset()
+            self._loaded = False
+            self._generation = None
+
+    def _is_current(self, generation):
+        # Airport changes made by this process are applied on commit, or
+        # were rolled back, so its own bumps leave the data current
+        return self._generation == generation or snippet_cache.local_changes_only(
+            Airport, self._generation, generation,
+        )
+
+    def _advance(self, generation):
+        """Whether a committed change that produced ``generation`` should be applied in place"""
+        if not self._loaded:
+            return False
+        if self._is_current(generation):
+            self._generation = generation
+        # Otherwise airports also changed elsewhere. The change is still
+        # applied, and the old generation makes the next use rebuild.
+        return True
+
+    def update(self, airport, generation):
+        """Add, replace or drop a single airport once its save is committed"""
+        with self._lock:
+            if self._advance(generation):
+                self._remove(airport.pk)
+                if self.includes(airport):
+                    self._add(airport)
+
+    def remove(self, airport_id, generation):
+        with self._lock:
+            if self._advance(generation):
+                self._remove(airport_id)
+
+
+class AirportSearchIndex(AirportIndex):
+    """Ranked prefix/trigram index over available airports"""
+
+    def _reset(self):
+        self.entries = {}
+        self.codes = {}
+        self.prefixes = PrefixTrie()
+        self.postings = {}
+        # Substring rank keys of every airport, sorted; built on first use
+        self._ranked = None
+
+    @staticmethod
+    def _rank_key(pk, entry):
+        return (not entry['is_popular'], entry['city'], pk)
+
+    @staticmethod
+    def _prefix_keys(entry):
+        keys = {entry['_code']}
+        keys.update(entry['_city'].split())
+        keys.add(entry['_city'])
+        return keys
+
+    def _add(self, airport):
+        pk = airport.pk
+        entry = {
+            'code': airport.code,
+            'name': airport.name,
+            'city': airport.city,
+            'country': airport.country,
+            'display': airport.display_name,
+            'is_popular': airport.is_popular,
+            '_code': normalize(airport.code),
+            '_city': normalize(airport.city),
+            '_text': normalize(f'{airport.code} {airport.name} {airport.city} {airport.country}'),
+        }
+        self.entries[pk] = entry
+        self.codes.setdefault(entry['_code'], set()).add(pk)
+        for key in self._prefix_keys(entry):
+            self.prefixes.add(key, pk)
+        postings = self.postings
+        for gram in trigrams(entry['_text']):
+            ids = postings.get(gram)
+            if ids is None:
+                postings[gram] = {pk}
+            else:
+                ids.add(pk)
+        if self._ranked is not None:
+            bisect.insort(self._ranked, self._rank_key(pk, entry))
+
+    def _remove(self, airport_id):
+        entry = self.entries.pop(airport_id, None)
+        if entry is None:
+            return
+        if self._ranked is not None:
+            key = self._rank_key(airport_id, entry)
+            position = bisect.bisect_left(self._ranked, key)
+            if position < len(self._ranked) and self._ranked[position] == key:
+                del self._ranked[position]
+        self.codes.get(entry['_code'], set()).discard(airport_id)
+        if not self.codes.get(entry['_code']):
+            self.codes.pop(entry['_code'], None)
+        for key in self._prefix_keys(entry):
+            self.prefixes.remove(key, airport_id)
+        for gram in trigrams(entry['_text']):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(airport_id)
+                if not ids:
+                    del self.postings[gram]
+
+    # Querying -----------------------------------------------------------
+
+    def _loaded_all(self):
+        self._ranked_keys()
+
+    def _ranked_keys(self):
+        """Rank keys of every airport, popular first, then by city"""
+        if self._ranked is None:
+            self._ranked = sorted(self._rank_key(pk, entry) for pk, entry in self.entries.items())
+        return self._ranked
+
+    def _substring_matches(self, query, needed, exclude):
+        """Airports whose text contains ``query``, leaving out ``exclude``"""
+        grams = sorted(trigrams(query), key=lambda g: len(self.postings.get(g, ())))
+        if not grams:
+            return []
+        smallest = self.postings.get(grams[0], ())
+        if len(smallest) > SUBSTRING_SCAN_LIMIT:
+            # Broad queries ("air", "international") match a large share of
+            # all airports; the best ranked ``needed`` of them are enough
+            matches = []
+            for key in self._ranked_keys():
+                pk = key[-1]
+                if pk not in exclude and query in self.entries[pk]['_text']:
+                    matches.append(pk)
+                    if len(matches) == needed:
+                        break
+            return matches
+        candidates = set(smallest)
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates &= self.postings.get(gram, set())
+        return [pk for pk in candidates if pk not in exclude and query in self.entries[pk]['_text']]
+
+    def search(self, query, limit=MAX_RESULTS, generation=None):
+        """Return ranked airport dicts matching ``query``"""
+        self.ensure_loaded(generation)
+        query = normalize(query)
+
+        with self._lock:
+            if not query:
+                popular = [e for e in self.entries.values() if e['is_popular']]
+                popular.sort(key=lambda e: e['city'])
+                return [self._public(e) for e in popular[:limit]]
+
+            ranks = {}
+            for pk in self.codes.get(query, ()):
+                ranks[pk] = RANK_EXACT
+            for pk in self.prefixes.lookup(query):
+                ranks.setdefault(pk, RANK_PREFIX)
+            # Substring matches need at least one trigram; shorter queries
+            # are served by the code/city prefixes alone. They rank below
+            # every prefix hit, so they are only looked for to fill the limit.
+            needed = limit - len(ranks)
+            if len(query) >= 3 and needed > 0:
+                for pk in self._substring_matches(query, needed, ranks):
+                    ranks[pk] = RANK_SUBSTRING
+
+            ranked = heapq.nsmallest(
+                limit,
+                ranks,
+                key=lambda pk: (ranks[pk],) + self._rank_key(pk, self.entries[pk]),
+            )
+            return [self._public(self.entries[pk]) for pk in ranked]
+
+    def by_codes(self, codes):
+        """Public airport dicts for the given codes, keyed by code"""
+        self.ensure_loaded()
+        found = {}
+        with self._lock:
+            for code in codes:
+                for pk in self.codes.get(normalize(code), ()):
+                    found[code] = self._public(self.entries[pk])
+        return found
+
+    @staticmethod
+    def _public(entry):
+        return {key: value for key, value in entry.items() if not key.startswith('_') and key != 'is_popular'}
+
+
+airport_index = AirportSearchIndex()
@@ -0,0 +1,66 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from home import snippet_cache
+
+from .geo import airport_spatial_index
+from . import pagination, rollups
+from .models import Airport, FlightInquiry
+from .resolve import airport_resolver
+from .search import airport_index
+
+
+AIRPORT_INDEXES = (airport_index, airport_spatial_index, airport_resolver)
+
+
+# Aircraft, AircraftCategory and FlightRoute changes bump their generations
+# through home.signals; fleet_pricing and route_graph rebuild from those.
+
+@receiver(post_save, sender=Airport)
+def airport_saved(sender, instance, **kwargs):
+    def apply(generation):
+        for index in AIRPORT_INDEXES:
+            index.update(instance, generation)
+
+    snippet_cache.changed(Airport, apply)
+
+
+@receiver(post_delete, sender=Airport)
+def airport_deleted(sender, instance, **kwargs):
+    airport_id = instance.pk
+
+    def apply(generation):
+        for index in AIRPORT_INDEXES:
+            index.remove(airport_id, generation)
+
+    snippet_cache.changed(Airport, apply)
+
+
+@receiver(pre_save, sender=FlightInquiry)
+def inquiry_saving(sender, instance, **kwargs):
+    # Remember which rollup row the inquiry counted towards before this save
+    instance._rollup_key = None
+    if instance.pk and not instance._state.adding:
+        previous = FlightInquiry.objects.filter(pk=instance.pk).only(
+            'created_at', 'origin', 'destination', 'status',
+        ).first()
+        if previous is not None:
+            instance._rollup_key = rollups.rollup_key(previous)
+
+
+@receiver(post_save, sender=FlightInquiry)
+def inquiry_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    pagination.record_change(FlightInquiry)
+    old_key = getattr(instance, '_rollup_key', None)
+    if created or old_key is None:
+        rollups.record_created(instance)
+    else:
+        rollups.record_changed(old_key, instance)
+
+
+@receiver(post_delete, sender=FlightInquiry)
+def inquiry_deleted(sender, instance, **kwargs):
+    pagination.record_change(FlightInquiry)
+    rollups.record_deleted(instance)
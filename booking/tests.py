@@ -1,3 +1,1048 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.test import AsyncRequestFactory, Client, TestCase
+from django.utils import timezone
+
+from fleet.models import Aircraft
+from home import snippet_cache
+
+from . import api, async_views, export, idempotency, rollups
+from .geo import airport_spatial_index, great_circle_nm
+from .ingest import InquirySpool, drain_spool, flush_spool
+from .models import Airport, FlightInquiry, FlightRoute, InquiryDailyRollup
+from .pagination import KeysetPaginator
+from .quotes import fleet_pricing
+from .resolve import airport_resolver, parse_airport_code
+from .routing import CHEAPEST, FASTEST, route_graph
+from .search import airport_index
+from .signals import AIRPORT_INDEXES
+
+
+def airport(code, city, **kwargs):
+    return Airport.objects.create(
+        code=code, name=kwargs.pop('name', f'{city} Airport'), city=city, country=kwargs.pop('country', 'Mexico'),
+        **kwargs,
+    )
+
+
+def inquiry_payload(**fields):
+    return {
+        'origin': 'Toluca (TLC)',
+        'destination': 'Cancun (CUN)',
+        'departure_date': (date.today() + timedelta(days=30)).isoformat(),
+        'return_date': None,
+        'passengers': 2,
+        'name': 'Ana',
+        'email': 'ana@example.com',
+        'phone': '',
+        'message': '',
+        **fields,
+    }
+
+
+class BookingTestCase(TestCase):
+
+    def setUp(self):
+        # The indexes are per process; drop what earlier tests left behind
+        for index in AIRPORT_INDEXES:
+            index.clear()
+
+
+class AirportSearchTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.sparta = airport('SPT', 'Sparta')
+        self.parma = airport('PMF', 'Parma')
+        self.paris = airport('PAR', 'Paris')
+
+    def codes(self, query, **kwargs):
+        return [result['code'] for result in airport_index.search(query, **kwargs)]
+
+    def test_exact_code_then_prefix_then_substring(self):
+        self.assertEqual(self.codes('par'), ['PAR', 'PMF', 'SPT'])
+
+    def test_substring_tier_only_fills_the_limit(self):
+        self.assertEqual(self.codes('par', limit=2), ['PAR', 'PMF'])
+        # Broad trigrams are walked in rank order instead of intersected
+        with mock.patch('booking.search.SUBSTRING_SCAN_LIMIT', 0):
+            self.assertEqual(self.codes('arta'), ['SPT'])
+            self.assertEqual(self.codes('airport', limit=2), ['PAR', 'PMF'])
+
+    def test_saves_and_deletes_are_applied_in_place(self):
+        self.codes('par')
+
+        with mock.patch.object(airport_index, '_rebuild_in_background') as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                airport('PRG', 'Prague', name='Parkside Airport', is_popular=True)
+                self.paris.is_available = False
+                self.paris.save()
+                self.parma.delete()
+            codes = self.codes('par')
+
+        rebuild.assert_not_called()
+        self.assertTrue(airport_index.loaded)
+        self.assertEqual(codes, ['PRG', 'SPT'])
+
+    def test_rolled_back_changes_are_not_applied(self):
+        self.codes('par')
+
+        with mock.patch.object(airport_index, '_rebuild_in_background') as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(IntegrityError):
+                    with transaction.atomic():
+                        airport('PRG', 'Prague', name='Parkside Airport')
+                        raise IntegrityError
+            codes = self.codes('par')
+
+        rebuild.assert_not_called()
+        self.assertTrue(airport_index.loaded)
+        self.assertEqual(codes, ['PAR', 'PMF', 'SPT'])
+
+    def test_stale_index_is_served_while_it_rebuilds(self):
+        self.codes('par')
+        # A change made by another process
+        snippet_cache.bump(Airport)
+        Airport.objects.filter(pk=self.sparta.pk).update(is_available=False)
+
+        with mock.patch.object(airport_index, '_rebuild_in_background') as rebuild:
+            self.assertEqual(self.codes('par'), ['PAR', 'PMF', 'SPT'])
+        rebuild.assert_called_once()
+
+        airport_index.rebuild()
+        self.assertTrue(airport_index.loaded)
+        self.assertEqual(self.codes('par'), ['PAR', 'PMF'])
+
+
+class NearbyAirportsTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # A line of airports heading east from Mexico City, about 56 nm apart
+        self.airports = [
+            airport(f'N{i:02}', f'Town {i}', latitude=19.4, longitude=-99.1 + i) for i in range(40)
+        ]
+        airport('SYD', 'Sydney', latitude=-33.9, longitude=151.2)
+
+    def codes(self, *args, **kwargs):
+        return [result['code'] for result in airport_spatial_index.nearby(*args, **kwargs)]
+
+    def test_closest_airports_come_first(self):
+        self.assertEqual(self.codes(19.4, -96.6, 3000, limit=5), ['N02', 'N03', 'N01', 'N04', 'N00'])
+
+    def test_results_match_a_full_scan(self):
+        for lat, lon, radius_nm, limit in [(19.4, -99.1, 3000, 10), (25, -80, 900, 3), (19.4, -60, 3000, 50)]:
+            expected = sorted(
+                (great_circle_nm(lat, lon, a.latitude, a.longitude), a.code) for a in Airport.objects.all()
+            )
+            expected = [code for distance, code in expected if distance <= radius_nm][:limit]
+            self.assertEqual(self.codes(lat, lon, radius_nm, limit=limit), expected)
+
+    def test_radius_is_respected(self):
+        self.assertEqual(self.codes(19.4, -99.1, 60), ['N00', 'N01'])
+        self.assertEqual(self.codes(0, 60, 3000), [])
+
+    def test_api_returns_distances(self):
+        response = self.client.get('/api/airports/nearby/', {'lat': 19.4, 'lon': -99.1, 'limit': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(a['code'], a['distance_nm']) for a in response.json()['airports']], [('N00', 0.0), ('N01', 56.6)],
+        )
+        self.assertEqual(self.client.get('/api/airports/nearby/', {'lat': 100, 'lon': 0}).status_code, 400)
+
+    def test_non_finite_input_is_rejected(self):
+        for params in [{'radius_nm': 'nan'}, {'radius_nm': 'inf'}, {'lat': 'nan'}, {'lon': '-inf'}]:
+            response = self.client.get('/api/airports/nearby/', {'lat': 19.4, 'lon': -99.1, **params})
+            self.assertEqual(response.status_code, 400)
+        with self.assertRaises(ValueError):
+            airport_spatial_index.nearby(19.4, -99.1, float('nan'))
+
+    def test_radius_is_capped_at_the_far_side_of_the_globe(self):
+        codes = self.codes(-19.4, 80.9, 1e9, limit=50)
+
+        self.assertEqual(len(codes), 41)
+        self.assertEqual(codes[0], 'SYD')
+
+
+class AirportsApiTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.paris = airport('PAR', 'Paris')
+
+    def get(self, headers=None, **params):
+        return self.client.get('/api/airports/', params, headers=headers or {})
+
+    def test_responses_are_cacheable(self):
+        response = self.get(q='par')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=300', response['Cache-Control'])
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertEqual([a['code'] for a in response.json()['airports']], ['PAR'])
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.get(q='par')['ETag']
+
+        self.assertEqual(self.get(q='PAR ', headers={'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.get(q='pa', headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_unchanged_since_is_not_modified(self):
+        last_modified = self.get(q='par')['Last-Modified']
+
+        self.assertEqual(self.get(q='par', headers={'If-Modified-Since': last_modified}).status_code, 304)
+
+    def test_responses_are_memoized_until_airports_change(self):
+        first = self.get(q='par')
+        with mock.patch.object(airport_index, 'search') as search:
+            self.get(q='par')
+        search.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            airport('PMF', 'Parma')
+        second = self.get(q='par', headers={'If-None-Match': first['ETag']})
+
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual([a['code'] for a in second.json()['airports']], ['PAR', 'PMF'])
+
+
+class AirportsBatchApiTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        airport('TLC', 'Toluca')
+        airport('MEX', 'Mexico City')
+        airport('OLD', 'Oldtown', is_available=False)
+
+    def lookup(self, codes):
+        response = self.client.get('/api/airports/batch/', {'codes': codes})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_codes_are_normalized_and_deduplicated(self):
+        data = self.lookup(' tlc,MEX,xxx,TLC ')
+
+        self.assertEqual(list(data['airports']), ['TLC', 'MEX'])
+        self.assertEqual(data['airports']['TLC']['display'], 'Toluca (TLC)')
+        self.assertEqual(data['missing'], ['XXX'])
+
+    def test_available_airports_need_no_queries(self):
+        self.lookup('TLC')
+
+        with self.assertNumQueries(0):
+            self.lookup('MEX,TLC')
+
+    def test_unavailable_airports_are_looked_up(self):
+        self.assertEqual(self.lookup('OLD')['airports']['OLD']['display'], 'Oldtown (OLD)')
+
+    def test_post_needs_no_csrf_token(self):
+        response = Client(enforce_csrf_checks=True).post(
+            '/api/airports/batch/', json.dumps({'codes': ['tlc', 'mex']}), content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()['airports']), ['TLC', 'MEX'])
+
+    def test_bad_requests_are_rejected(self):
+        for codes in ['', 'TL-C', ','.join(f'A{i:03}' for i in range(501))]:
+            self.assertEqual(self.client.get('/api/airports/batch/', {'codes': codes}).status_code, 400)
+        response = self.client.post('/api/airports/batch/', '{"codes": "TLC"}', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ApiLayerTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_dates_and_decimals_serialize_with_either_encoder(self):
+        data = {
+            'day': date(2026, 1, 2), 'at': datetime(2026, 1, 2, 3, 4, 5), 'price': Decimal('12.50'), 'city': 'Cancún',
+        }
+        expected = {'day': '2026-01-02', 'at': '2026-01-02T03:04:05', 'price': '12.50', 'city': 'Cancún'}
+
+        self.assertEqual(json.loads(api.dumps(data)), expected)
+        with mock.patch.object(api, 'orjson', None):
+            self.assertEqual(json.loads(api.dumps(data)), expected)
+
+    def test_encoding_negotiation(self):
+        self.assertEqual(api.choose_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(api.choose_encoding('br;q=0, gzip;q=0.5'), 'gzip')
+        self.assertIsNone(api.choose_encoding('identity'))
+        self.assertIsNone(api.choose_encoding(''))
+
+    def test_large_responses_are_compressed(self):
+        for i in range(40):
+            airport(f'P{i:02}', f'Paris {i}')
+
+        response = self.client.get('/api/airports/', {'q': 'paris'}, headers={'Accept-Encoding': 'br'})
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(len(json.loads(api.brotli.decompress(response.content))['airports']), 20)
+        # The weak validator still answers conditional requests
+        repeat = self.client.get('/api/airports/', {'q': 'paris'}, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(repeat.status_code, 304)
+
+    def test_small_responses_are_left_alone(self):
+        response = self.client.get('/api/airports/', {'q': 'zzz'}, headers={'Accept-Encoding': 'gzip'})
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.json(), {'airports': []})
+
+    async def test_async_views_are_compressed(self):
+        for i in range(40):
+            await Airport.objects.acreate(code=f'P{i:02}', name=f'Paris {i} Airport', city=f'Paris {i}')
+        request = AsyncRequestFactory().get('/api/airports/', {'q': 'paris'}, headers={'Accept-Encoding': 'gzip'})
+
+        response = await async_views.airports_api(request)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['airports']), 20)
+
+
+class AsyncAirportsApiTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        airport('PAR', 'Paris')
+        airport_index.search('')
+
+    async def test_no_blocking_cache_calls_once_the_index_is_ready(self):
+        request = AsyncRequestFactory().get('/api/airports/', {'q': 'par'})
+
+        with mock.patch.object(snippet_cache, 'generations', side_effect=AssertionError('blocking cache call')):
+            response = await async_views.airports_api(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([a['code'] for a in json.loads(response.content)['airports']], ['PAR'])
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    async def test_matching_etag_is_not_modified(self):
+        first = await async_views.airports_api(AsyncRequestFactory().get('/api/airports/', {'q': 'par'}))
+        request = AsyncRequestFactory().get('/api/airports/', {'q': 'par'}, headers={'If-None-Match': first['ETag']})
+
+        response = await async_views.airports_api(request)
+
+        self.assertEqual(response.status_code, 304)
+
+
+class ImportAirportsTests(BookingTestCase):
+
+    FIELDS = [
+        'ident', 'type', 'name', 'latitude_deg', 'longitude_deg', 'continent', 'iso_country',
+        'municipality', 'icao_code', 'iata_code', 'gps_code',
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def write(self, name, fields, rows):
+        path = f'{self.tmp}/{name}'
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8', newline='') as handle:
+            writer = csv.DictWriter(handle, fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def row(self, ident, type='large_airport', **fields):
+        return {
+            'ident': ident, 'type': type, 'name': f'{ident} International', 'latitude_deg': '19.4',
+            'longitude_deg': '-99.1', 'continent': 'NA', 'iso_country': 'MX', 'municipality': f'{ident} City',
+            **fields,
+        }
+
+    def import_airports(self, *rows, batch_size=2):
+        path = self.write('airports.csv.gz', self.FIELDS, rows)
+        countries = self.write('countries.csv', ['code', 'name'], [{'code': 'MX', 'name': 'Mexico'}])
+        call_command(
+            'import_airports', path, '--countries', countries, '--batch-size', str(batch_size),
+            stdout=open(os.devnull, 'w'),
+        )
+
+    def test_rows_are_mapped_to_airports(self):
+        self.import_airports(
+            self.row('MMMX', iata_code='MEX', icao_code='MMMX'),
+            self.row('MMTO', icao_code='MMTO'),
+            self.row('MM01', type='heliport'),
+            self.row('MMUN', iata_code='CUN', latitude_deg='bad'),
+        )
+
+        self.assertEqual(sorted(Airport.objects.values_list('code', flat=True)), ['CUN', 'MEX', 'MMTO'])
+        mexico = Airport.objects.get(code='MEX')
+        self.assertEqual((mexico.city, mexico.country, mexico.region), ('MMMX City', 'Mexico', 'North America'))
+        self.assertIsNone(Airport.objects.get(code='CUN').latitude)
+
+    def test_existing_airports_are_updated_in_place(self):
+        existing = airport('MEX', 'Old name', is_popular=True)
+
+        self.import_airports(self.row('MMMX', iata_code='MEX'), self.row('MMTO', iata_code='TLC'))
+
+        existing.refresh_from_db()
+        self.assertEqual(existing.city, 'MMMX City')
+        self.assertTrue(existing.is_popular)
+        self.assertEqual(Airport.objects.count(), 2)
+
+    def test_import_invalidates_the_airport_indexes(self):
+        self.assertEqual(airport_index.search('MEX'), [])
+
+        self.import_airports(self.row('MMMX', iata_code='MEX'))
+
+        # bulk_create sends no signals; the bumped generation marks the index stale
+        self.assertFalse(airport_index.loaded)
+        airport_index.rebuild()
+        self.assertEqual([a['code'] for a in airport_index.search('MEX')], ['MEX'])
+
+
+class SpoolTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.mkdtemp()
+        self.spool = InquirySpool(f'{self.tmp}/spool.sqlite3')
+        self.toluca = airport('TLC', 'Toluca')
+        self.cancun = airport('CUN', 'Cancun')
+
+    def tearDown(self):
+        self.spool.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_flush_stores_and_acknowledges(self):
+        self.spool.append_many([inquiry_payload(submission_key=f'key-{i}') for i in range(3)])
+
+        self.assertEqual(drain_spool(self.spool), 3)
+
+        self.assertEqual(self.spool.count(), 0)
+        inquiry = FlightInquiry.objects.get(submission_key='key-0')
+        self.assertEqual((inquiry.origin_airport, inquiry.destination_airport), (self.toluca, self.cancun))
+        self.assertEqual(InquiryDailyRollup.objects.get().count, 3)
+
+    def test_replay_after_crash_creates_no_duplicates(self):
+        self.spool.append_many([inquiry_payload(submission_key=f'key-{i}') for i in range(3)])
+
+        # The inquiries are committed, but the process dies before the ack
+        with mock.patch.object(self.spool, 'ack', side_effect=SystemExit):
+            with self.assertRaises(SystemExit):
+                flush_spool(self.spool)
+        self.assertEqual(self.spool.count(), 3)
+        # Another flusher picks the rows up once the dead one's claim expires
+        with mock.patch('booking.ingest.CLAIM_TIMEOUT', -1):
+            drain_spool(self.spool)
+
+        self.assertEqual(FlightInquiry.objects.count(), 3)
+        self.assertEqual(InquiryDailyRollup.objects.get().count, 3)
+        self.assertEqual(self.spool.count(), 0)
+
+    def test_rejected_rows_are_dead_lettered(self):
+        self.spool.append_many([
+            inquiry_payload(submission_key='good-1'),
+            inquiry_payload(submission_key='too-long', phone='5' * 300),
+            inquiry_payload(submission_key='good-2'),
+        ])
+
+        with self.assertLogs('booking.ingest', 'ERROR'):
+            drain_spool(self.spool)
+
+        self.assertEqual(
+            sorted(FlightInquiry.objects.values_list('submission_key', flat=True)), ['good-1', 'good-2'],
+        )
+        [(_, payload, error)] = self.spool.dead_letters()
+        self.assertEqual(payload['submission_key'], 'too-long')
+        self.assertIn('phone', error)
+        self.assertEqual(self.spool.count(), 0)
+
+    def test_batch_failure_is_retried_row_by_row(self):
+        self.spool.append_many([inquiry_payload(submission_key=f'key-{i}') for i in range(3)])
+
+        def reject_key_1(inquiries):
+            inquiries = list(inquiries)
+            if any(inquiry.submission_key == 'key-1' for inquiry in inquiries):
+                raise IntegrityError('rejected')
+            rollups.record_batch(inquiries)
+
+        with mock.patch('booking.ingest.record_batch', side_effect=reject_key_1):
+            with self.assertLogs('booking.ingest', 'ERROR'):
+                drain_spool(self.spool)
+
+        self.assertEqual(
+            sorted(FlightInquiry.objects.values_list('submission_key', flat=True)), ['key-0', 'key-2'],
+        )
+        self.assertEqual([payload['submission_key'] for _, payload, _ in self.spool.dead_letters()], ['key-1'])
+        self.assertEqual(InquiryDailyRollup.objects.get().count, 2)
+
+        self.assertEqual(self.spool.requeue_dead_letters(), 1)
+        drain_spool(self.spool)
+        self.assertEqual(FlightInquiry.objects.count(), 3)
+
+    def test_airports_deleted_after_spooling_are_cleared(self):
+        self.spool.append(inquiry_payload(
+            submission_key='key', origin_airport_id=self.toluca.pk, destination_airport_id=self.cancun.pk,
+        ))
+        self.toluca.delete()
+
+        drain_spool(self.spool)
+
+        inquiry = FlightInquiry.objects.get()
+        self.assertIsNone(inquiry.origin_airport_id)
+        self.assertEqual(inquiry.destination_airport_id, self.cancun.pk)
+
+    def test_concurrent_flushes_claim_different_rows(self):
+        self.spool.append_many([inquiry_payload(submission_key=f'key-{i}') for i in range(4)])
+        other = InquirySpool(self.spool.path)
+
+        first = self.spool.take(3)
+        second = other.take(3)
+        other.close()
+
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({row_id for row_id, _ in first} & {row_id for row_id, _ in second})
+
+    def test_failed_flush_releases_its_claim(self):
+        self.spool.append(inquiry_payload(submission_key='key'))
+
+        with mock.patch('booking.ingest.store_inquiries', side_effect=RuntimeError('database down')):
+            with self.assertRaises(RuntimeError):
+                flush_spool(self.spool)
+        drain_spool(self.spool)
+
+        self.assertTrue(FlightInquiry.objects.filter(submission_key='key').exists())
+
+
+class FlightQuoteTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        idempotency.submission_store.clear()
+
+    def post(self, headers=None, **fields):
+        return self.client.post(
+            '/api/flight-quote/', json.dumps(inquiry_payload(**fields)), content_type='application/json',
+            headers=headers or {},
+        )
+
+    def test_fields_longer_than_the_model_allows_are_rejected(self):
+        response = self.post(origin='x' * 300)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('200 characters', response.json()['message'])
+        self.assertFalse(FlightInquiry.objects.exists())
+
+    def test_non_text_fields_are_rejected(self):
+        self.assertEqual(self.post(name=['Ana']).status_code, 400)
+
+    def test_idempotency_key_replays_the_original_answer(self):
+        first = self.post(headers={'Idempotency-Key': 'abc'})
+        second = self.post(headers={'Idempotency-Key': 'abc'}, message='Retried')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', first)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(FlightInquiry.objects.count(), 1)
+
+    def test_same_trip_is_deduplicated_across_processes(self):
+        first = self.post()
+        # As seen by another process, which has none of this one's memory
+        idempotency.submission_store.clear()
+        second = self.post(email='ANA@example.com')
+
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json()['inquiry_id'], first.json()['inquiry_id'])
+        self.assertEqual(FlightInquiry.objects.count(), 1)
+
+    def test_dedup_window_slides(self):
+        self.post()
+        idempotency.submission_store.clear()
+        inquiry = FlightInquiry.objects.get()
+
+        inquiry.created_at = timezone.now() - timedelta(seconds=idempotency.DEDUP_WINDOW - 60)
+        inquiry.save()
+        self.assertEqual(self.post()['Idempotent-Replayed'], 'true')
+
+        idempotency.submission_store.clear()
+        inquiry.created_at = timezone.now() - timedelta(seconds=idempotency.DEDUP_WINDOW + 60)
+        # Which was also an earlier bucket of submission keys
+        inquiry.submission_key = 'earlier'
+        inquiry.save()
+        self.assertNotIn('Idempotent-Replayed', self.post())
+        self.assertEqual(FlightInquiry.objects.count(), 2)
+
+    def test_concurrent_duplicate_falls_back_to_the_stored_inquiry(self):
+        # Stored by another worker between the dedup checks and the insert
+        stored = FlightInquiry.objects.create(
+            origin='Elsewhere', destination='Cancun (CUN)', departure_date=date.today(),
+            submission_key=idempotency.header_key('abc'),
+        )
+
+        # Runs inside the test's transaction, as under ATOMIC_REQUESTS
+        response = self.post(headers={'Idempotency-Key': 'abc'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(response.json()['inquiry_id'], stored.pk)
+
+
+class ComputeRoutesTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        airport('TLC', 'Toluca', latitude=19.34, longitude=-99.57, is_popular=True)
+        airport('MEX', 'Mexico City', latitude=19.44, longitude=-99.07, is_popular=True)
+        airport('CUN', 'Cancun', latitude=21.04, longitude=-86.87, is_popular=True)
+        airport('LAX', 'Los Angeles', latitude=33.94, longitude=-118.41, country='USA')
+
+    def compute(self, *args):
+        call_command('compute_routes', *args, stdout=open(os.devnull, 'w'))
+        return {
+            (route.origin.code, route.destination.code): route
+            for route in FlightRoute.objects.select_related('origin', 'destination')
+        }
+
+    def test_an_unbounded_run_must_be_asked_for(self):
+        with self.assertRaisesMessage(CommandError, '--all'):
+            self.compute()
+
+        self.assertEqual(len(self.compute('--all')), 12)
+
+    def test_routes_are_saved_in_batches(self):
+        with mock.patch('booking.management.commands.compute_routes.Command.save', autospec=True,
+                        side_effect=lambda command, routes: len(routes)) as save:
+            call_command('compute_routes', '--popular', '--batch-size', '4', stdout=open(os.devnull, 'w'))
+
+        self.assertEqual([len(call.args[1]) for call in save.call_args_list], [4, 2])
+
+    def test_distances_and_times(self):
+        routes = self.compute('--origins', 'TLC', '--max-distance', '1000', '--speed', '400', '--overhead', '0')
+
+        self.assertEqual(sorted(routes), [('TLC', 'CUN'), ('TLC', 'MEX')])
+        cancun = routes['TLC', 'CUN']
+        self.assertEqual(cancun.distance_nm, round(great_circle_nm(19.34, -99.57, 21.04, -86.87)))
+        self.assertEqual(cancun.flight_time_minutes, round(cancun.distance_nm / 400 * 60))
+
+    def test_existing_routes_are_updated(self):
+        self.compute('--popular', '--speed', '400')
+        self.compute('--popular', '--speed', '200')
+
+        self.assertEqual(FlightRoute.objects.count(), 6)
+        route = FlightRoute.objects.get(origin__code='TLC', destination__code='CUN')
+        self.assertGreater(route.flight_time_minutes, route.distance_nm / 200 * 60)
+
+
+class ResolveAirportsTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.toluca = airport('TLC', 'Toluca')
+        self.cancun = airport('CUN', 'Cancun', is_available=False)
+
+    def inquiry(self, origin, destination='Cancun (CUN)'):
+        return FlightInquiry.objects.create(origin=origin, destination=destination, departure_date=date.today())
+
+    def test_codes_are_parsed_from_display_names(self):
+        self.assertEqual(parse_airport_code('Toluca (tlc) '), 'TLC')
+        self.assertEqual(parse_airport_code(' mex '), 'MEX')
+        self.assertIsNone(parse_airport_code('Somewhere near Toluca'))
+
+    def test_display_names_and_codes_resolve(self):
+        self.assertEqual(airport_resolver.resolve('toluca  (TLC)'), self.toluca.pk)
+        self.assertEqual(airport_resolver.resolve('tlc'), self.toluca.pk)
+        # Unavailable airports still resolve for historical inquiries
+        self.assertEqual(airport_resolver.resolve('Cancun (CUN)'), self.cancun.pk)
+        self.assertIsNone(airport_resolver.resolve('Nowhere (XXX)'))
+
+    def test_airport_edits_are_applied(self):
+        airport_resolver.resolve('TLC')
+
+        self.toluca.code = 'TOL'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.toluca.save()
+
+        self.assertEqual(airport_resolver.resolve('Toluca (TOL)'), self.toluca.pk)
+        self.assertIsNone(airport_resolver.resolve('Toluca (TLC)'))
+
+    def test_submitted_inquiries_get_airports(self):
+        idempotency.submission_store.clear()
+        response = self.client.post(
+            '/api/flight-quote/', json.dumps(inquiry_payload()), content_type='application/json',
+        )
+
+        inquiry = FlightInquiry.objects.get(pk=response.json()['inquiry_id'])
+        self.assertEqual((inquiry.origin_airport, inquiry.destination_airport), (self.toluca, self.cancun))
+
+    def test_backfill_command(self):
+        missing = self.inquiry('Toluca (TLC)')
+        unknown = self.inquiry('Nowhere')
+        stale = self.inquiry('Toluca (TLC)', destination='Nowhere')
+        FlightInquiry.objects.filter(pk=stale.pk).update(destination_airport=self.toluca)
+
+        call_command('resolve_inquiry_airports', '--batch-size', '2', stdout=open(os.devnull, 'w'))
+
+        missing.refresh_from_db()
+        self.assertEqual((missing.origin_airport_id, missing.destination_airport_id), (self.toluca.pk, self.cancun.pk))
+        unknown.refresh_from_db()
+        self.assertEqual((unknown.origin_airport_id, unknown.destination_airport_id), (None, self.cancun.pk))
+        stale.refresh_from_db()
+        self.assertEqual(stale.destination_airport_id, self.toluca.pk)
+
+        call_command('resolve_inquiry_airports', '--all', stdout=open(os.devnull, 'w'))
+
+        stale.refresh_from_db()
+        self.assertIsNone(stale.destination_airport_id)
+
+
+class ExportTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.mkdtemp()
+        for i, status in enumerate(['new', 'quoted', 'new', 'booked', 'new']):
+            FlightInquiry.objects.create(
+                origin='Toluca (TLC)', destination='Cancún (CUN)', departure_date=date.today(), status=status,
+                name=f'Guest {i}', message='Two bags,\n"one" pet', created_at=timezone.now() - timedelta(days=i),
+            )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_csv_round_trips_in_chunks(self):
+        chunks = list(export.iter_csv(FlightInquiry.objects.all(), chunk_size=2))
+
+        # The header, then three chunks of at most two rows
+        self.assertEqual(len(chunks), 4)
+        rows = list(csv.DictReader(io.StringIO(b''.join(chunks).decode())))
+        self.assertEqual([row['name'] for row in rows], [f'Guest {i}' for i in range(5)])
+        self.assertEqual(rows[0]['message'], 'Two bags,\n"one" pet')
+        self.assertEqual(rows[0]['destination'], 'Cancún (CUN)')
+
+    def test_csv_neutralizes_formulas(self):
+        FlightInquiry.objects.filter(name='Guest 0').update(
+            name='=HYPERLINK("https://example.com")', phone='+52 55 1234 5678', message='\tnote',
+        )
+
+        rows = list(csv.DictReader(io.StringIO(b''.join(export.iter_csv(FlightInquiry.objects.all())).decode())))
+
+        self.assertEqual(rows[0]['name'], '\'=HYPERLINK("https://example.com")')
+        self.assertEqual(rows[0]['phone'], "'+52 55 1234 5678")
+        self.assertEqual(rows[0]['message'], "'\tnote")
+        self.assertEqual(rows[1]['name'], 'Guest 1')
+
+    def test_jsonl_round_trips(self):
+        data = b''.join(export.iter_export(FlightInquiry.objects.all(), export.JSONL, chunk_size=2))
+
+        rows = [json.loads(line) for line in data.decode().splitlines()]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(set(rows[0]), set(export.EXPORT_FIELDS))
+        self.assertEqual(rows[1]['status'], 'quoted')
+
+    def test_gzip_matches_the_plain_export(self):
+        queryset = FlightInquiry.objects.all()
+        compressed = b''.join(export.iter_export(queryset, export.CSV, compress=True))
+
+        self.assertEqual(gzip.decompress(compressed), b''.join(export.iter_export(queryset, export.CSV)))
+
+    def test_command_filters_by_date_and_status(self):
+        path = f'{self.tmp}/inquiries.jsonl.gz'
+        since = timezone.localdate() - timedelta(days=3)
+
+        call_command(
+            'export_inquiries', '--format', 'jsonl', '--gzip', '--since', since.isoformat(),
+            '--status', 'new,booked', '-o', path, stderr=open(os.devnull, 'w'),
+        )
+
+        with gzip.open(path, 'rt', encoding='utf-8') as handle:
+            names = [json.loads(line)['name'] for line in handle]
+        self.assertEqual(names, ['Guest 0', 'Guest 2', 'Guest 3'])
+        with self.assertRaisesMessage(CommandError, 'Unknown status: lost'):
+            call_command('export_inquiries', '--status', 'lost', '-o', path)
+
+    def test_admin_action_streams_the_selection(self):
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        selected = FlightInquiry.objects.filter(status='new')
+
+        response = self.client.post('/django-admin/booking/flightinquiry/', {
+            'action': 'export_csv', '_selected_action': [inquiry.pk for inquiry in selected],
+        })
+
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="flight-inquiries-', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['name'] for row in rows], ['Guest 0', 'Guest 2', 'Guest 4'])
+
+
+class RollupTests(BookingTestCase):
+
+    def inquiry(self, days_ago=0, **fields):
+        return FlightInquiry.objects.create(**{
+            'origin': 'Toluca (TLC)', 'destination': 'Cancun (CUN)', 'departure_date': date.today(),
+            'created_at': timezone.now() - timedelta(days=days_ago), **fields,
+        })
+
+    def rollup(self):
+        return {
+            (row.date, row.origin, row.destination, row.status): row.count
+            for row in InquiryDailyRollup.objects.all()
+        }
+
+    def grouped(self):
+        return {
+            (row['day'], row['origin'], row['destination'], row['status']): row['total']
+            for row in FlightInquiry.objects.annotate(day=TruncDate('created_at'))
+            .values('day', 'origin', 'destination', 'status').annotate(total=Count('id')).order_by()
+        }
+
+    def test_creates_are_counted(self):
+        self.inquiry()
+        self.inquiry()
+        self.inquiry(destination='Los Cabos (SJD)')
+
+        self.assertEqual(self.rollup(), self.grouped())
+        self.assertEqual(rollups.status_counts(), {'new': 3})
+
+    def test_status_changes_move_the_count(self):
+        inquiry = self.inquiry()
+        self.inquiry()
+
+        inquiry.status = 'quoted'
+        inquiry.save()
+
+        self.assertEqual(self.rollup(), self.grouped())
+        self.assertEqual(rollups.status_counts(), {'new': 1, 'quoted': 1})
+
+    def test_deletes_are_subtracted(self):
+        inquiry = self.inquiry()
+        self.inquiry(status='booked')
+
+        inquiry.delete()
+
+        self.assertEqual(self.rollup(), self.grouped())
+        self.assertEqual(InquiryDailyRollup.objects.count(), 1)
+
+    def test_rebuild_matches_the_inquiries(self):
+        for days_ago in range(5):
+            self.inquiry(days_ago, status='quoted' if days_ago % 2 else 'new')
+        # Bulk edits bypass the signals
+        FlightInquiry.objects.filter(status='quoted').update(status='booked')
+        self.assertNotEqual(self.rollup(), self.grouped())
+
+        rollups.rebuild_rollups()
+
+        self.assertEqual(self.rollup(), self.grouped())
+        self.assertEqual(sum(rollups.daily_counts(days=5).values()), 5)
+
+    def test_partial_rebuild_keeps_earlier_days(self):
+        self.inquiry(days_ago=10)
+        recent = self.inquiry()
+        InquiryDailyRollup.objects.all().delete()
+        self.inquiry(days_ago=10)
+
+        rollups.rebuild_rollups(since=timezone.localdate(recent.created_at))
+
+        # The older day keeps its (incomplete) count; only today is recomputed
+        self.assertEqual(sorted(self.rollup().values()), [1, 1])
+        self.assertEqual(rollups.status_counts(since=recent.created_at.date()), {'new': 1})
+
+
+class InquiryListTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        now = timezone.now()
+        for i in range(10):
+            inquiry = FlightInquiry.objects.create(
+                origin='Toluca (TLC)', destination='Cancun (CUN)', departure_date=date.today(),
+                name=f'Guest {i}', email=f'guest{i}@example.com', submission_key=f'{i:064x}',
+            )
+            # Pairs share a timestamp, so pages also split on the id
+            FlightInquiry.objects.filter(pk=inquiry.pk).update(created_at=now - timedelta(minutes=i // 2))
+
+    def pages(self, paginator_class):
+        paginator = paginator_class(FlightInquiry.objects.order_by('-created_at', '-id'), 3)
+        return [[inquiry.pk for inquiry in paginator.page(n)] for n in paginator.page_range]
+
+    def test_keyset_pages_match_offset_pages(self):
+        expected = self.pages(Paginator)
+
+        self.assertEqual(self.pages(KeysetPaginator), expected)
+        # Again, now seeking from the cached boundaries
+        self.assertEqual(self.pages(KeysetPaginator), expected)
+
+    def test_inserts_do_not_skip_rows(self):
+        self.pages(KeysetPaginator)
+
+        FlightInquiry.objects.create(origin='Toluca (TLC)', destination='Cancun (CUN)', departure_date=date.today())
+        queryset = FlightInquiry.objects.order_by('-created_at', '-id')
+
+        # Jumping straight to a page visited before the insert
+        self.assertEqual(list(KeysetPaginator(queryset, 3).page(3)), list(Paginator(queryset, 3).page(3)))
+
+    def search(self, term):
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.get('/django-admin/booking/flightinquiry/', {'q': term})
+        self.assertEqual(response.status_code, 200)
+        return [inquiry.name for inquiry in response.context['cl'].result_list]
+
+    def test_admin_search_by_email_ignores_case(self):
+        self.assertEqual(self.search('GUEST3@example.com'), ['Guest 3'])
+
+    def test_admin_search_by_email_prefix(self):
+        self.assertEqual(self.search('guest3@'), ['Guest 3'])
+
+    def test_admin_search_by_email_domain(self):
+        self.assertEqual(len(self.search('@example.com')), 10)
+
+    def test_admin_search_by_submission_key(self):
+        self.assertEqual(self.search(f'{7:064x}'), ['Guest 7'])
+
+    def test_admin_search_by_text(self):
+        self.assertEqual(self.search('Guest 4'), ['Guest 4'])
+
+
+class PriceQuoteTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        airport('AAA', 'Alpha', latitude=0, longitude=0)
+        airport('BBB', 'Bravo', latitude=0, longitude=5)
+        FlightRoute.objects.create(
+            origin=Airport.objects.get(code='AAA'), destination=Airport.objects.get(code='BBB'),
+            distance_nm=400, estimated_flight_time='1h',
+        )
+        self.light = Aircraft.objects.create(
+            name='Light', passengers=6, range_nm=1000, speed_knots=400, hourly_rate=3000,
+        )
+        Aircraft.objects.create(name='Heavy', passengers=14, range_nm=6000, speed_knots=480, hourly_rate=9000)
+        Aircraft.objects.create(name='Unpriced', passengers=8, range_nm=3000, speed_knots=450)
+        Aircraft.objects.create(name='Retired', is_available=False, hourly_rate=1)
+
+    def names(self, options):
+        return [option['name'] for option in options]
+
+    def test_fuel_stops_add_legs_and_ground_time(self):
+        [options] = fleet_pricing.quote([2500])
+        light = options[self.names(options).index('Light')]
+
+        # Three legs of at most 1000 nm: 375 min in the air, 3 x 15 overhead, 2 x 45 on the ground
+        self.assertEqual((light['fuel_stops'], light['block_time_minutes']), (2, 510))
+        self.assertEqual(light['price'], 25500)
+
+    def test_options_are_sorted_by_price_and_filtered_by_seats(self):
+        short, long = fleet_pricing.quote([400, 2500])
+
+        self.assertEqual(self.names(short), ['Light', 'Heavy', 'Unpriced'])
+        self.assertIsNone(short[2]['price'])
+        self.assertEqual(self.names(fleet_pricing.quote([400], passengers=10)[0]), ['Heavy'])
+
+    def test_fleet_edits_reach_the_next_quote(self):
+        fleet_pricing.quote([400])
+
+        self.light.hourly_rate = 100000
+        self.light.save()
+
+        self.assertEqual(self.names(fleet_pricing.quote([400])[0]), ['Heavy', 'Light', 'Unpriced'])
+
+    def test_api_prices_several_routes(self):
+        response = self.client.get('/api/price-quote/', {'routes': 'AAA-BBB,BBB-AAA', 'passengers': 2})
+
+        self.assertEqual(response.status_code, 200)
+        quotes = response.json()['quotes']
+        # The stored route distance wins; the reverse leg is measured
+        self.assertEqual([quote['distance_nm'] for quote in quotes], [400, 300])
+        self.assertEqual(self.names(quotes[0]['aircraft']), ['Light', 'Heavy', 'Unpriced'])
+
+    def test_api_rejects_bad_routes(self):
+        self.assertEqual(self.client.get('/api/price-quote/', {'routes': 'AAA'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/price-quote/', {'routes': 'AAA-ZZZ'}).status_code, 404)
+
+
+class RouteSearchTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.a = airport('AAA', 'Alpha', latitude=0, longitude=0)
+        self.b = airport('BBB', 'Bravo', latitude=0, longitude=5)
+        self.c = airport('CCC', 'Charlie', latitude=0, longitude=10)
+        for origin, destination, distance, price in [
+            (self.a, self.b, 300, 1000), (self.b, self.c, 300, 1000), (self.a, self.c, 600, 5000),
+        ]:
+            FlightRoute.objects.create(
+                origin=origin, destination=destination, distance_nm=distance,
+                estimated_flight_time='1h', base_price=price,
+            )
+
+    def codes(self, itinerary):
+        return [leg['origin'] for leg in itinerary['legs']] + [itinerary['legs'][-1]['destination']]
+
+    def test_fastest_flies_direct_when_in_range(self):
+        itinerary = route_graph.find_path('AAA', 'CCC', range_nm=700, speed_knots=400)
+
+        self.assertEqual(self.codes(itinerary), ['AAA', 'CCC'])
+        self.assertEqual(itinerary['price'], 5000)
+
+    def test_legs_longer_than_the_range_are_skipped(self):
+        itinerary = route_graph.find_path('AAA', 'CCC', range_nm=400, speed_knots=400)
+
+        self.assertEqual(self.codes(itinerary), ['AAA', 'BBB', 'CCC'])
+        self.assertEqual(itinerary['distance_nm'], 600)
+        self.assertIsNone(route_graph.find_path('AAA', 'CCC', range_nm=200, speed_knots=400))
+
+    def test_cheapest_uses_route_prices(self):
+        itinerary = route_graph.find_path('AAA', 'CCC', range_nm=700, speed_knots=400, optimize=CHEAPEST)
+
+        self.assertEqual(self.codes(itinerary), ['AAA', 'BBB', 'CCC'])
+        self.assertEqual(itinerary['price'], 2000)
+
+    def test_cheaper_paths_with_too_many_legs_do_not_hide_shorter_ones(self):
+        destination = airport('DDD', 'Delta', latitude=0, longitude=20)
+        chain = [self.a] + [airport(f'CH{i}', f'Chain {i}', latitude=1, longitude=i) for i in range(5)]
+        for origin, next_stop in zip(chain, chain[1:] + [self.c]):
+            FlightRoute.objects.create(
+                origin=origin, destination=next_stop, distance_nm=100,
+                estimated_flight_time='1h', base_price=10,
+            )
+        FlightRoute.objects.create(
+            origin=self.c, destination=destination, distance_nm=600,
+            estimated_flight_time='1h', base_price=1000,
+        )
+
+        itinerary = route_graph.find_path('AAA', 'DDD', range_nm=700, speed_knots=400, optimize=CHEAPEST)
+
+        self.assertEqual(self.codes(itinerary), ['AAA', 'BBB', 'CCC', 'DDD'])
+        self.assertEqual(itinerary['price'], 3000)
+
+    def test_search_reads_the_graph_once(self):
+        route_graph.find_path('AAA', 'CCC', range_nm=400, speed_knots=400)
+
+        with mock.patch.object(snippet_cache, 'generations', wraps=snippet_cache.generations) as generations:
+            route_graph.find_path('AAA', 'CCC', range_nm=400, speed_knots=400, optimize=FASTEST)
+
+        self.assertEqual(generations.call_count, 1)
@@ -1,103 +1,426 @@
 import json
+import math
 import re
-from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
-from django.views.decorators.csrf import ensure_csrf_cookie
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods
+from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from fleet.models import Aircraft
 from .models import Airport, FlightRoute, FlightInquiry
+from .cache import (
+    AIRPORTS_MAX_AGE, airports_etag, airports_last_modified, airports_version,
+    get_airports_response, set_airports_response,
+)
+from . import idempotency
+from .api import api_response, compressed, dumps
+from .geo import airport_spatial_index
+from .ingest import SPOOL_MODE, enqueue_inquiry, ingest_mode
+from .quotes import fleet_pricing, route_distances
+from .resolve import parse_airport_code, resolve_airports
+from .routing import CHEAPEST, FASTEST, route_graph
+from .search import airport_index
 
 
+NEARBY_DEFAULT_RADIUS_NM = 250
+NEARBY_MAX_RADIUS_NM = 3000
+NEARBY_DEFAULT_LIMIT = 10
+NEARBY_MAX_LIMIT = 50
+
+PRICE_QUOTE_MAX_ROUTES = 200
+
+AIRPORTS_BATCH_MAX_CODES = 500
+AIRPORT_CODE_FORMAT_RE = re.compile(r'^[A-Z0-9]{2,10}$')
+
+
+def _airports_etag(request):
+    return airports_etag(request.GET.get('q', ''))
+
+
+def _airports_last_modified(request):
+    return airports_last_modified()
+
+
+@compressed
+@cache_control(public=True, max_age=AIRPORTS_MAX_AGE)
+@condition(etag_func=_airports_etag, last_modified_func=_airports_last_modified)
 def airports_api(request):
     """API endpoint for airport autocomplete"""
     query = request.GET.get('q', '').strip()
+    version = airports_version()
+    
+    content = get_airports_response(query, version)
+    if content is None:
+        data = airport_index.search(query)
+        content = dumps({'airports': data})
+        set_airports_response(query, version, content)
+    
+    return api_response(None, content=content)
+
+
+def _nearby_etag(request):
+    return airports_etag(request.GET.urlencode())
+
+
+@compressed
+@cache_control(public=True, max_age=AIRPORTS_MAX_AGE)
+@condition(etag_func=_nearby_etag, last_modified_func=_airports_last_modified)
+def airports_nearby_api(request):
+    """API endpoint for the closest available airports to a coordinate"""
+    try:
+        lat = float(request.GET['lat'])
+        lon = float(request.GET['lon'])
+        radius_nm = float(request.GET.get('radius_nm', NEARBY_DEFAULT_RADIUS_NM))
+        limit = int(request.GET.get('limit', NEARBY_DEFAULT_LIMIT))
+    except (KeyError, ValueError):
+        return api_response({
+            'success': False,
+            'message': 'lat and lon are required numeric parameters.',
+        }, status=400)
+    
+    if not all(math.isfinite(value) for value in (lat, lon, radius_nm)):
+        return api_response({
+            'success': False,
+            'message': 'lat, lon and radius_nm must be finite numbers.',
+        }, status=400)
+    
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return api_response({
+            'success': False,
+            'message': 'Coordinates are out of range.',
+        }, status=400)
+    
+    radius_nm = min(max(radius_nm, 0), NEARBY_MAX_RADIUS_NM)
+    limit = min(max(limit, 1), NEARBY_MAX_LIMIT)
     
-    airports = Airport.objects.filter(is_available=True)
+    data = airport_spatial_index.nearby(lat, lon, radius_nm, limit)
     
-    if query:
-        airports = airports.filter(
-            Q(code__icontains=query) |
-            Q(name__icontains=query) |
-            Q(city__icontains=query) |
-            Q(country__icontains=query)
-        )
+    return api_response({'airports': data})
+
+
+def _batch_codes(request):
+    """Requested codes, upper-cased and de-duplicated in order; None when malformed"""
+    if request.method == 'POST':
+        try:
+            codes = json.loads(request.body).get('codes')
+        except (json.JSONDecodeError, AttributeError):
+            return None
+        if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+            return None
+    else:
+        codes = request.GET.get('codes', '').split(',')
+    codes = list(dict.fromkeys(code.strip().upper() for code in codes if code.strip()))
+    if not all(AIRPORT_CODE_FORMAT_RE.match(code) for code in codes):
+        return None
+    return codes
+
+
+def _batch_etag(request):
+    if request.method != 'GET':
+        return None
+    return airports_etag(','.join(_batch_codes(request) or []))
+
+
+# Read-only lookup, so partner integrations may POST without a CSRF token
+@csrf_exempt
+@compressed
+@require_http_methods(["GET", "POST"])
+@cache_control(public=True, max_age=AIRPORTS_MAX_AGE)
+@condition(etag_func=_batch_etag, last_modified_func=_airports_last_modified)
+def airports_batch_api(request):
+    """API endpoint resolving many airport codes at once"""
+    codes = _batch_codes(request)
+    if not codes:
+        return api_response({
+            'success': False,
+            'message': 'Please provide a list of airport codes.',
+        }, status=400)
+    if len(codes) > AIRPORTS_BATCH_MAX_CODES:
+        return api_response({
+            'success': False,
+            'message': f'At most {AIRPORTS_BATCH_MAX_CODES} airport codes can be resolved at once.',
+        }, status=400)
+    
+    # Available airports come from the in-memory index; anything else
+    # (e.g. airports no longer offered) needs one code__in query
+    airports = airport_index.by_codes(codes)
+    missing = [code for code in codes if code not in airports]
+    if missing:
+        rows = Airport.objects.filter(code__in=missing).values('code', 'name', 'city', 'country')
+        for row in rows:
+            row['display'] = Airport.format_display_name(row['city'], row['code'])
+            airports[row['code'].upper()] = row
+    
+    return api_response({
+        'airports': {code: airports[code] for code in codes if code in airports},
+        'missing': [code for code in codes if code not in airports],
+    })
+
+
+@compressed
+def price_quote_api(request):
+    """API endpoint for indicative prices of every suitable aircraft on one or more routes"""
+    if request.GET.get('routes'):
+        raw_routes = [r.split('-', 1) for r in request.GET['routes'].split(',') if r.strip()]
     else:
-        airports = airports.filter(is_popular=True)
+        raw_routes = [(request.GET.get('origin', ''), request.GET.get('destination', ''))]
+    
+    if len(raw_routes) > PRICE_QUOTE_MAX_ROUTES:
+        return api_response({
+            'success': False,
+            'message': f'At most {PRICE_QUOTE_MAX_ROUTES} routes can be priced at once.',
+        }, status=400)
+    
+    pairs = []
+    for route in raw_routes:
+        codes = [parse_airport_code(value) for value in route] if len(route) == 2 else [None]
+        if None in codes:
+            return api_response({
+                'success': False,
+                'message': 'Each route needs an origin and a destination airport code.',
+            }, status=400)
+        pairs.append(tuple(codes))
+    
+    try:
+        passengers = int(request.GET.get('passengers', 1))
+    except ValueError:
+        passengers = 1
     
-    airports = airports[:20]
+    distances = route_distances(pairs)
+    unknown = [f'{o}-{d}' for (o, d), distance in zip(pairs, distances) if distance is None]
+    if unknown:
+        return api_response({
+            'success': False,
+            'message': f'Unknown route: {", ".join(unknown)}',
+        }, status=404)
+    
+    options = fleet_pricing.quote(distances, passengers=passengers)
+    
+    return api_response({
+        'success': True,
+        'quotes': [
+            {
+                'origin': origin,
+                'destination': destination,
+                'distance_nm': int(round(distance)),
+                'aircraft': aircraft,
+            }
+            for (origin, destination), distance, aircraft in zip(pairs, distances, options)
+        ],
+    })
+
+
+@compressed
+def route_search_api(request):
+    """API endpoint for the fastest or cheapest multi-leg itinerary for an aircraft"""
+    origin = parse_airport_code(request.GET.get('origin'))
+    destination = parse_airport_code(request.GET.get('destination'))
+    optimize = request.GET.get('optimize', FASTEST)
+    if not origin or not destination or origin == destination:
+        return api_response({
+            'success': False,
+            'message': 'Please provide different origin and destination airport codes.',
+        }, status=400)
+    if optimize not in (FASTEST, CHEAPEST):
+        return api_response({
+            'success': False,
+            'message': f'optimize must be "{FASTEST}" or "{CHEAPEST}".',
+        }, status=400)
+    
+    aircraft = Aircraft.objects.filter(is_available=True)
+    try:
+        if request.GET.get('aircraft'):
+            aircraft = aircraft.filter(pk=int(request.GET['aircraft']))
+        elif request.GET.get('category'):
+            # The longest-range aircraft in the category opens up the most routes
+            aircraft = aircraft.filter(category_id=int(request.GET['category'])).order_by('-range_nm', 'hourly_rate')
+        else:
+            raise ValueError()
+    except ValueError:
+        return api_response({
+            'success': False,
+            'message': 'Please provide an aircraft or category id.',
+        }, status=400)
+    aircraft = aircraft.values('id', 'name', 'range_nm', 'speed_knots', 'hourly_rate').first()
+    if aircraft is None:
+        return api_response({
+            'success': False,
+            'message': 'No available aircraft matches this request.',
+        }, status=404)
+    
+    itinerary = route_graph.find_path(
+        origin, destination,
+        range_nm=aircraft['range_nm'],
+        speed_knots=max(aircraft['speed_knots'], 1),
+        hourly_rate=None if aircraft['hourly_rate'] is None else float(aircraft['hourly_rate']),
+        optimize=optimize,
+    )
+    if itinerary is None:
+        return api_response({
+            'success': False,
+            'message': f'No route from {origin} to {destination} within range of the {aircraft['name']}.',
+        }, status=404)
+    
+    return api_response({
+        'success': True,
+        'aircraft': {key: aircraft[key] for key in ('id', 'name', 'range_nm')},
+        'optimize': optimize,
+        **itinerary,
+    })
+
+
+def _quote_response(result, status, replayed=False):
+    response = api_response(result, status=status)
+    if replayed:
+        response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _validate_quote(data):
+    """Validate a flight quote payload; returns (fields, None) or (None, error response)"""
+    # Validate required fields
+    required_fields = ['origin', 'destination', 'departure_date', 'name', 'email']
+    missing = [f for f in required_fields if not data.get(f)]
+    if missing:
+        return None, api_response({
+            'success': False,
+            'message': f'Missing required fields: {", ".join(missing)}',
+        }, status=400)
+    
+    # Validate text fields against the model, since spooled inquiries are
+    # only written later and the database would reject them then
+    for field_name in ('origin', 'destination', 'name', 'email', 'phone', 'message'):
+        field = FlightInquiry._meta.get_field(field_name)
+        value = data.get(field_name) or ''
+        if not isinstance(value, str):
+            message = f'Please enter a valid {field.verbose_name}.'
+        elif field.max_length and len(value) > field.max_length:
+            message = f'{field.verbose_name.capitalize()} must be at most {field.max_length} characters.'
+        else:
+            continue
+        return None, api_response({'success': False, 'message': message}, status=400)
     
-    data = [
-        {
-            'code': a.code,
-            'name': a.name,
-            'city': a.city,
-            'country': a.country,
-            'display': a.display_name,
-        }
-        for a in airports
-    ]
+    # Validate email format
+    email = data.get('email', '')
+    if not re.match(r'^[^\s@]+@[^\s@]+\.[^\s@]+$', email):
+        return None, api_response({
+            'success': False,
+            'message': 'Please enter a valid email address.',
+        }, status=400)
+    
+    # Validate passengers
+    try:
+        passengers = int(data.get('passengers', 1))
+        if passengers < 1 or passengers > 50:
+            raise ValueError()
+    except (ValueError, TypeError):
+        return None, api_response({
+            'success': False,
+            'message': 'Passengers must be a number between 1 and 50.',
+        }, status=400)
     
-    return JsonResponse({'airports': data})
+    # Validate dates (spooled inquiries are only written later, so bad
+    # dates must be caught here rather than by the database)
+    try:
+        departure_date = parse_date(str(data['departure_date']))
+        return_date = parse_date(str(data['return_date'])) if data.get('return_date') else None
+        if departure_date is None or (data.get('return_date') and return_date is None):
+            raise ValueError()
+    except (ValueError, TypeError):
+        return None, api_response({
+            'success': False,
+            'message': 'Please enter valid travel dates.',
+        }, status=400)
+    
+    fields = {
+        'origin': data.get('origin', ''),
+        'destination': data.get('destination', ''),
+        'departure_date': departure_date.isoformat(),
+        'return_date': return_date.isoformat() if return_date else None,
+        'passengers': passengers,
+        'name': data.get('name', ''),
+        'email': email,
+        'phone': data.get('phone', ''),
+        'message': data.get('message', ''),
+    }
+    return fields, None
+
+
+def _quote_result(fields):
+    return {
+        'success': True,
+        'message': 'Your flight inquiry has been received. Our team will contact you shortly.',
+        'reference': fields['submission_key'],
+    }
 
 
+def _stored_result(inquiry):
+    """The answer given when ``inquiry`` was submitted"""
+    result = _quote_result({'submission_key': inquiry.submission_key})
+    result['inquiry_id'] = inquiry.id
+    return result, 200
+
+
+def _store_inquiry(fields):
+    """Create the inquiry, or find the one already stored for it; returns (inquiry, replayed)"""
+    try:
+        # In a savepoint, so the lookup below still works when the request
+        # runs inside a transaction (e.g. ATOMIC_REQUESTS)
+        with transaction.atomic():
+            return FlightInquiry.objects.create(**fields), False
+    except IntegrityError:
+        # Another worker already stored this submission
+        return FlightInquiry.objects.get(submission_key=fields['submission_key']), True
+
+
+@compressed
 @require_http_methods(["POST"])
 def flight_quote_api(request):
     """API endpoint for flight quote requests with validation"""
     try:
         data = json.loads(request.body)
+        fields, error = _validate_quote(data)
+        if error is not None:
+            return error
         
-        # Validate required fields
-        required_fields = ['origin', 'destination', 'departure_date', 'name', 'email']
-        missing = [f for f in required_fields if not data.get(f)]
-        if missing:
-            return JsonResponse({
-                'success': False,
-                'message': f'Missing required fields: {", ".join(missing)}',
-            }, status=400)
+        # Double submits and retries get the original answer back
+        keys = idempotency.lookup_keys(request, fields)
+        replay = idempotency.find_replay(keys)
+        if replay is not None:
+            return _quote_response(*replay, replayed=True)
         
-        # Validate email format
-        email = data.get('email', '')
-        if not re.match(r'^[^\s@]+@[^\s@]+\.[^\s@]+$', email):
-            return JsonResponse({
-                'success': False,
-                'message': 'Please enter a valid email address.',
-            }, status=400)
+        # ... including those stored by another process
+        fields['content_key'] = idempotency.content_key(fields)
+        recent = idempotency.recent_inquiry(fields['content_key'])
+        if recent is not None:
+            replay = _stored_result(recent)
+            idempotency.remember(keys, replay)
+            return _quote_response(*replay, replayed=True)
         
-        # Validate passengers
-        try:
-            passengers = int(data.get('passengers', 1))
-            if passengers < 1 or passengers > 50:
-                raise ValueError()
-        except (ValueError, TypeError):
-            return JsonResponse({
-                'success': False,
-                'message': 'Passengers must be a number between 1 and 50.',
-            }, status=400)
+        fields['submission_key'] = idempotency.submission_key(request, fields)
+        result = _quote_result(fields)
+        replayed = False
+        resolve_airports(fields)
         
-        inquiry = FlightInquiry.objects.create(
-            origin=data.get('origin', ''),
-            destination=data.get('destination', ''),
-            departure_date=data.get('departure_date'),
-            return_date=data.get('return_date') or None,
-            passengers=passengers,
-            name=data.get('name', ''),
-            email=email,
-            phone=data.get('phone', ''),
-            message=data.get('message', ''),
-        )
+        if ingest_mode() == SPOOL_MODE:
+            enqueue_inquiry({**fields, 'created_at': timezone.now().isoformat()})
+            status = 202
+        else:
+            inquiry, replayed = _store_inquiry(fields)
+            result['inquiry_id'] = inquiry.id
+            status = 200
         
-        return JsonResponse({
-            'success': True,
-            'message': 'Your flight inquiry has been received. Our team will contact you shortly.',
-            'inquiry_id': inquiry.id,
-        })
+        idempotency.remember(keys, (result, status))
+        return _quote_response(result, status, replayed=replayed)
         
     except json.JSONDecodeError:
-        return JsonResponse({
+        return api_response({
             'success': False,
             'message': 'Invalid request format.',
         }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return api_response({
             'success': False,
             'message': 'An error occurred. Please try again.',
         }, status=500)
@@ -106,4 +429,4 @@ def flight_quote_api(request):
 @ensure_csrf_cookie
 def get_csrf_token(request):
     """Endpoint to get CSRF token for form submissions"""
-    return JsonResponse({'success': True})
+    return api_response({'success': True})
@@ -1,13 +1,18 @@
 from django.db import models
+from django.db.models import Prefetch
 from wagtail.models import Page
 from wagtail.fields import RichTextField, StreamField
 from wagtail.admin.panels import FieldPanel, MultiFieldPanel, InlinePanel
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter
 from wagtail.images.blocks import ImageChooserBlock
 from wagtail.snippets.models import register_snippet
 from wagtail import blocks
 from modelcluster.fields import ParentalKey
 from modelcluster.models import ClusterableModel
 
+from home.snippet_cache import cached
+
 
 @register_snippet
 class AircraftCategory(models.Model):
@@ -124,6 +129,39 @@ class Aircraft(ClusterableModel):
         verbose_name_plural = "Aircraft"
 
 
+# Renditions used for aircraft cards; must match the {% picture %} tag in fleet/fleet_page.html
+FLEET_CARD_IMAGE_SPECS = Filter.expand_spec('format-{avif,webp,jpeg} fill-{600x400,300x200,900x600}')
+
+# Generations the cached fleet listing is built from
+FLEET_LISTING_MODELS = (
+    'fleet.Aircraft', 'fleet.AircraftCategory',
+    'wagtailimages.Image', 'home.ImagePlaceholder',
+)
+
+
+def load_fleet_listing():
+    """Categories with their available aircraft, images, placeholders and card renditions"""
+    # One query per level (categories, aircraft + images + placeholders, renditions)
+    # however many categories and aircraft there are
+    renditions = get_image_model().get_rendition_model().objects.filter(
+        filter_spec__in=FLEET_CARD_IMAGE_SPECS,
+    )
+    aircraft = (
+        Aircraft.objects.filter(is_available=True)
+        .select_related('main_image', 'main_image__placeholder')
+        .prefetch_related(Prefetch('main_image__renditions', queryset=renditions))
+    )
+    categories = AircraftCategory.objects.prefetch_related(
+        Prefetch('aircraft', queryset=aircraft, to_attr='available_aircraft'),
+    )
+    aircraft = list(aircraft)
+    return {
+        'categories': list(categories),
+        'aircraft': aircraft,
+        'featured_aircraft': [plane for plane in aircraft if plane.is_featured],
+    }
+
+
 class FleetPage(Page):
     """Fleet listing page"""
     intro = RichTextField(blank=True)
@@ -134,11 +172,12 @@ class FleetPage(Page):
     
     parent_page_types = ['home.HomePage']
     
+    # Snippets whose changes purge this page from home.page_cache
+    page_cache_models = ('fleet.Aircraft', 'fleet.AircraftCategory')
+    
     def get_context(self, request):
         context = super().get_context(request)
-        context['categories'] = AircraftCategory.objects.all()
-        context['aircraft'] = Aircraft.objects.filter(is_available=True)
-        context['featured_aircraft'] = Aircraft.objects.filter(is_featured=True, is_available=True)
+        context.update(cached('fleet:listing', FLEET_LISTING_MODELS, load_fleet_listing))
         return context
     
     class Meta:
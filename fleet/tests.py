@@ -1,3 +1,117 @@
-from django.test import TestCase
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from wagtail.images import get_image_model
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Page, Site
+
+from home import snippet_cache
+from home.models import HomePage
+
+from .models import Aircraft, AircraftCategory, FleetPage
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+# Queries for a fleet page render, whatever the size of the fleet: cold
+# rebuilds the cached listing, warm only resolves the page and site
+FLEET_PAGE_QUERY_BUDGET = 13
+FLEET_PAGE_WARM_QUERY_BUDGET = 6
+
+# Renders are measured without the full-page cache in front of them
+WITHOUT_PAGE_CACHE = [m for m in settings.MIDDLEWARE if m != 'home.page_cache.PageCacheMiddleware']
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MIDDLEWARE=WITHOUT_PAGE_CACHE)
+class FleetPageQueryCountTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        root = Page.get_first_root_node()
+        home = root.add_child(instance=HomePage(title='Home', slug='fleet-test-home'))
+        Site.objects.update_or_create(
+            is_default_site=True,
+            defaults={'hostname': 'localhost', 'root_page': home},
+        )
+        self.fleet = home.add_child(instance=FleetPage(title='Fleet', slug='fleet'))
+
+    def add_aircraft(self, categories, per_category):
+        for i in range(categories):
+            category = AircraftCategory.objects.create(name=f'Category {i}', order=i)
+            for j in range(per_category):
+                image = get_image_model().objects.create(
+                    title=f'Jet {i}-{j}', file=get_test_image_file(),
+                )
+                Aircraft.objects.create(
+                    name=f'Jet {i}-{j}', category=category, main_image=image,
+                    is_featured=j == 0,
+                )
+            # Unavailable aircraft must not be rendered or cost queries
+            Aircraft.objects.create(name=f'Retired {i}', category=category, is_available=False)
+
+    def capture_render(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.fleet.url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries], response
+
+    def render_queries(self):
+        """Queries of a cold render, which rebuilds the cached listing, and of a warm one"""
+        # The first render creates the renditions, which are not rebuilt
+        self.client.get(self.fleet.url)
+        snippet_cache.snippet_cache.clear()
+        cold, _ = self.capture_render()
+        warm, response = self.capture_render()
+        return cold, warm, response
+
+    def test_queries_do_not_grow_with_fleet(self):
+        self.add_aircraft(categories=1, per_category=1)
+        small_cold, small_warm, _ = self.render_queries()
+
+        self.add_aircraft(categories=4, per_category=5)
+        large_cold, large_warm, response = self.render_queries()
+
+        self.assertEqual(len(large_cold), len(small_cold))
+        self.assertLessEqual(len(large_cold), FLEET_PAGE_QUERY_BUDGET)
+        self.assertEqual(len(large_warm), len(small_warm))
+        self.assertLessEqual(len(large_warm), FLEET_PAGE_WARM_QUERY_BUDGET)
+        self.assertContains(response, 'Jet 3-4')
+        self.assertNotContains(response, 'Retired')
+
+    def test_steady_state_makes_no_fleet_queries(self):
+        self.add_aircraft(categories=2, per_category=2)
+        _, warm, _ = self.render_queries()
+
+        self.assertEqual([sql for sql in warm if '"fleet_aircraft' in sql], [])
+
+    @override_settings(MIDDLEWARE=settings.MIDDLEWARE)
+    def test_aircraft_changes_purge_the_cached_page(self):
+        self.add_aircraft(categories=1, per_category=1)
+        self.client.get(self.fleet.url)
+        self.assertEqual(self.client.get(self.fleet.url)['X-Page-Cache'], 'hit')
+
+        Aircraft.objects.create(name='New Jet', category=AircraftCategory.objects.get())
+        response = self.client.get(self.fleet.url)
+
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'New Jet')
+
+    def test_edits_are_visible_on_next_render(self):
+        self.add_aircraft(categories=1, per_category=2)
+        self.render_queries()
+
+        plane = Aircraft.objects.get(name='Jet 0-1')
+        plane.name = 'Renamed Jet'
+        plane.save()
+        response = self.client.get(self.fleet.url)
+
+        self.assertContains(response, 'Renamed Jet')
+        self.assertNotContains(response, 'Jet 0-1')
@@ -52,6 +52,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'wagtail.contrib.redirects.middleware.RedirectMiddleware',
+    'home.page_cache.PageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'flymex_site.urls'
@@ -66,6 +67,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'home.context_processors.site_settings',
             ],
         },
     },
@@ -94,6 +96,25 @@ else:
         }
     }
 
+# Snippet generation counters (home.snippet_cache) live in the default cache.
+# Set REDIS_URL whenever more than one process serves the site, so an admin
+# edit invalidates every worker; the local-memory cache only covers one.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -126,4 +147,22 @@ WAGTAILSEARCH_BACKENDS = {
     }
 }
 
+# Quality for the {% picture %} AVIF/WebP sources; Wagtail's default of 80
+# makes them barely smaller than the JPEG fallback
+WAGTAILIMAGES_AVIF_QUALITY = 50
+WAGTAILIMAGES_WEBP_QUALITY = 75
+
+# Flight inquiry ingestion: "sync" writes FlightInquiry inside the request,
+# "spool" appends to a durable local queue flushed by a background worker
+BOOKING_INGEST_MODE = os.environ.get('BOOKING_INGEST_MODE', 'sync')
+BOOKING_INGEST_SPOOL = os.environ.get('BOOKING_INGEST_SPOOL', str(BASE_DIR / 'inquiry_spool.sqlite3'))
+
+# Route the airports, flight quote and CSRF endpoints to the native async
+# views in booking.async_views; only enable when serving flymex_site.asgi
+BOOKING_ASYNC_VIEWS = os.environ.get('BOOKING_ASYNC_VIEWS', 'False').lower() == 'true'
+
+# Serve unchanged StreamField blocks from the default cache as rendered HTML
+# (home.block_cache); off by default
+HOME_BLOCK_CACHE = os.environ.get('HOME_BLOCK_CACHE', 'False').lower() == 'true'
+
 CSRF_TRUSTED_ORIGINS = ['https://*.replit.dev', 'https://*.repl.co', 'https://*.replit.app']
@@ -9,8 +9,12 @@ from wagtail import urls as wagtail_urls
 from wagtail.documents import urls as wagtaildocs_urls
 from wagtail.models import Site, Page
 
+from booking import async_views as booking_async_views
 from booking import views as booking_views
 
+# Under ASGI the hot booking endpoints can run as native async views
+booking_api_views = booking_async_views if settings.BOOKING_ASYNC_VIEWS else booking_views
+
 
 def health_check(request):
     """Health check endpoint that validates the site is properly configured."""
@@ -51,9 +55,13 @@ urlpatterns = [
     path('admin/', include(wagtailadmin_urls)),
     path('documents/', include(wagtaildocs_urls)),
     
-    path('api/airports/', booking_views.airports_api, name='airports_api'),
-    path('api/flight-quote/', booking_views.flight_quote_api, name='flight_quote_api'),
-    path('api/csrf-token/', booking_views.get_csrf_token, name='csrf_token'),
+    path('api/airports/', booking_api_views.airports_api, name='airports_api'),
+    path('api/airports/batch/', booking_views.airports_batch_api, name='airports_batch_api'),
+    path('api/airports/nearby/', booking_views.airports_nearby_api, name='airports_nearby_api'),
+    path('api/price-quote/', booking_views.price_quote_api, name='price_quote_api'),
+    path('api/routes/search/', booking_views.route_search_api, name='route_search_api'),
+    path('api/flight-quote/', booking_api_views.flight_quote_api, name='flight_quote_api'),
+    path('api/csrf-token/', booking_api_views.get_csrf_token, name='csrf_token'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,97 @@
+"""
+Fragment cache for StreamField blocks.
+
+With HOME_BLOCK_CACHE enabled, each top-level block of a page body is
+stored as rendered HTML in the default cache, keyed on the block's id
+and a hash of its content rather than on the page revision. Publishing
+a page therefore only re-renders the blocks that changed; the rest are
+served without running their templates or looking up their image
+renditions. Keys also carry a digest of the block templates (and so
+the filter specs they ask for) and the image and placeholder
+generations, so a deploy that changes a template or a re-uploaded image
+never serves stale HTML. Blocks whose rich text links to pages also
+carry the page generation, so moving or renaming a linked page
+re-renders them.
+
+Block templates must depend only on the block's value: the parent
+context is passed in as with {% include_block %}, but it is not part of
+the key.
+"""
+import hashlib
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+from .placeholders import prefetch_placeholders
+from .renditions import block_templates
+from .snippet_cache import generations
+
+
+FRAGMENT_TIMEOUT = 24 * 60 * 60
+
+# A rich text page link, <a linktype="page" id="...">, as it appears in
+# the JSON of a block's value
+PAGE_LINK = 'linktype=\\"page\\"'
+
+
+@lru_cache(maxsize=None)
+def templates_digest():
+    """Digest of every block template's source, computed once per process"""
+    digest = hashlib.sha1()
+    for name in sorted(block_templates()):
+        try:
+            source = get_template(name).template.source
+        except TemplateDoesNotExist:
+            # Blocks rendered inline by their parent's template
+            continue
+        digest.update(name.encode())
+        digest.update(source.encode())
+    return digest.hexdigest()[:12]
+
+
+def fragment_key(child, image_generation, page_generation):
+    content = json.dumps(
+        child.block.get_prep_value(child.value), sort_keys=True, cls=DjangoJSONEncoder,
+    )
+    digest = hashlib.sha1(f'{child.id}:{child.block_type}:{content}'.encode()).hexdigest()
+    generation = image_generation
+    if PAGE_LINK in content:
+        # Rendered links carry the linked pages' current URLs
+        generation = f'{image_generation}.{page_generation}'
+    return f'blocks:fragment:{templates_digest()}:{generation}:{digest}'
+
+
+def render_child(child, context):
+    return conditional_escape(child.render_as_block(context=context))
+
+
+def render_stream(stream, context):
+    """HTML of every block in ``stream``, from the cache where possible"""
+    request = context.get('request')
+    context = context.flatten()
+    if not settings.HOME_BLOCK_CACHE or getattr(request, 'is_preview', False):
+        prefetch_placeholders([child.value for child in stream])
+        return mark_safe(''.join(render_child(child, context) for child in stream))
+
+    image, placeholder, page_generation = generations(
+        'wagtailimages.Image', 'home.ImagePlaceholder', 'wagtailcore.Page',
+    )
+    image_generation = f'{image}.{placeholder}'
+    keys = [fragment_key(child, image_generation, page_generation) for child in stream]
+    fragments = cache.get_many(keys)
+    missing = [(key, child) for key, child in zip(keys, stream) if key not in fragments]
+    # The placeholders of every image left to render, in one query
+    prefetch_placeholders([child.value for _, child in missing])
+    rendered = {}
+    for key, child in missing:
+        fragments[key] = rendered[key] = render_child(child, context)
+    if rendered:
+        cache.set_many(rendered, FRAGMENT_TIMEOUT)
+    return mark_safe(''.join(fragments[key] for key in keys))
@@ -0,0 +1,46 @@
+from django.db.models import Prefetch
+from django.utils.functional import SimpleLazyObject
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter
+
+from .models import SiteSettings
+from .snippet_cache import cached
+
+
+# Renditions of the site logo; must match the {% picture %} tag in partials/header.html
+LOGO_IMAGE_SPECS = Filter.expand_spec('format-{avif,webp,png} height-{40,80}')
+
+# Generations the cached site settings are built from
+SITE_SETTINGS_MODELS = ('home.SiteSettings', 'wagtailimages.Image')
+
+
+def load_site_settings():
+    """The SiteSettings row (or unsaved defaults) with its logo renditions in memory"""
+    renditions = get_image_model().get_rendition_model().objects.filter(
+        filter_spec__in=LOGO_IMAGE_SPECS,
+    )
+    settings = (
+        SiteSettings.objects.select_related('logo')
+        .prefetch_related(Prefetch('logo__renditions', queryset=renditions))
+        .first()
+    )
+    if settings is None:
+        return SiteSettings()
+    if settings.logo is not None:
+        # Creates any missing renditions now and keeps them with the logo,
+        # so rendering the header needs no rendition lookups
+        try:
+            settings.logo.get_renditions(*LOGO_IMAGE_SPECS)
+        except OSError:
+            # Missing source file; the {% picture %} tag renders its fallback
+            pass
+    return settings
+
+
+def get_site_settings():
+    return cached('home:site_settings', SITE_SETTINGS_MODELS, load_site_settings)
+
+
+def site_settings(request):
+    """``site_settings`` for the header and footer, at no query cost once cached"""
+    return {'site_settings': SimpleLazyObject(get_site_settings)}
@@ -0,0 +1,48 @@
+"""
+Management command to compute low-quality image placeholders.
+Run: python manage.py compute_placeholders [--retry-failed] [--dry-run]
+
+New uploads get their placeholder when saved; run this once for images
+uploaded before placeholders existed, or after restoring missing files
+with --retry-failed. Templates never compute placeholders themselves.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from wagtail.images import get_image_model
+
+from home.placeholders import update_placeholder
+
+
+class Command(BaseCommand):
+    help = 'Compute missing or outdated image placeholders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Also recompute images whose file could not be read last time',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report what is missing')
+
+    def handle(self, *args, **options):
+        images = get_image_model().objects.select_related('placeholder')
+        wanted = [
+            image for image in images.iterator(chunk_size=500)
+            if not hasattr(image, 'placeholder')
+            or image.placeholder.file_hash != image.file_hash
+            or (options['retry_failed'] and not image.placeholder.color)
+        ]
+        self.stdout.write(f'{len(wanted)} images need a placeholder')
+        if options['dry_run'] or not wanted:
+            return
+
+        started = time.perf_counter()
+        failed = 0
+        for image in wanted:
+            if not update_placeholder(image).color:
+                failed += 1
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Computed {len(wanted) - failed} placeholders in {elapsed:.1f}s'
+            + (f', {failed} images could not be read' if failed else '')
+        ))
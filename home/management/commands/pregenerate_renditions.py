@@ -0,0 +1,111 @@
+"""
+Management command to create image renditions ahead of the first visitor.
+Run: python manage.py pregenerate_renditions [--workers 4] [--dry-run]
+
+Filter specs are discovered from the project and block templates (see
+home.renditions). Images referenced by live page StreamFields, aircraft
+and the site settings are checked against their existing renditions and
+the missing ones are rendered in a process pool, one image per task.
+"""
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter
+
+from home.renditions import collect_image_specs
+
+
+PROGRESS_EVERY = 25
+
+
+def _init_worker():
+    # Spawned (non-forked) workers start without a configured Django
+    if not apps.ready:
+        django.setup()
+
+
+def _render(image_id, specs):
+    """Create the renditions for one image; returns (image_id, created, error)"""
+    try:
+        image = get_image_model().objects.get(pk=image_id)
+        image.get_renditions(*specs)
+    except Exception as e:
+        return image_id, 0, f'{type(e).__name__}: {e}'
+    return image_id, len(specs), None
+
+
+class Command(BaseCommand):
+    help = 'Pre-generate missing image renditions used by the site templates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--dry-run', action='store_true', help='Only report what is missing')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        wanted = collect_image_specs()
+        images = get_image_model().objects.filter(pk__in=wanted).prefetch_related('renditions')
+
+        tasks = []
+        missing_by_spec = Counter()
+        for image in images:
+            specs = sorted(wanted[image.pk])
+            existing = {f.spec for f in image.find_existing_renditions(*(Filter(spec) for spec in specs))}
+            missing = [spec for spec in specs if spec not in existing]
+            if missing:
+                tasks.append((image.pk, missing))
+                missing_by_spec.update(missing)
+
+        total = sum(len(specs) for _, specs in tasks)
+        self.stdout.write(
+            f'{len(wanted)} images referenced, {total} missing renditions '
+            f'across {len(tasks)} images ({time.perf_counter() - started:.1f}s to scan)'
+        )
+        for spec, count in sorted(missing_by_spec.items()):
+            self.stdout.write(f'  {spec:32} {count}')
+        if options['dry_run'] or not tasks:
+            return
+
+        workers = max(1, min(options['workers'], len(tasks)))
+        started = time.perf_counter()
+        done = created = 0
+        errors = []
+        if workers == 1:
+            results = (_render(*task) for task in tasks)
+        else:
+            # Forked workers must not share the parent's database connections
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+            results = (future.result() for future in as_completed(
+                [executor.submit(_render, *task) for task in tasks]
+            ))
+        try:
+            for image_id, count, error in results:
+                done += 1
+                created += count
+                if error:
+                    errors.append((image_id, error))
+                if done % PROGRESS_EVERY == 0 or done == len(tasks):
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f'  {done}/{len(tasks)} images, {created}/{total} renditions, '
+                        f'{created / elapsed if elapsed else 0:.1f} renditions/s'
+                    )
+        finally:
+            if workers > 1:
+                executor.shutdown()
+
+        for image_id, error in errors:
+            self.stderr.write(f'  image {image_id}: {error}')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} renditions in {elapsed:.1f}s with {workers} worker(s)'
+            + (f', {len(errors)} images failed' if errors else '')
+        ))
@@ -227,18 +227,18 @@ class Command(BaseCommand):
         
         # Create popular airports
         airports_data = [
-            {'code': 'TLC', 'name': 'Toluca International Airport', 'city': 'Toluca', 'country': 'Mexico', 'region': 'Mexico', 'is_popular': True},
-            {'code': 'MEX', 'name': 'Benito Juarez International', 'city': 'Mexico City', 'country': 'Mexico', 'region': 'Mexico', 'is_popular': True},
-            {'code': 'CUN', 'name': 'Cancun International Airport', 'city': 'Cancun', 'country': 'Mexico', 'region': 'Mexico', 'is_popular': True},
-            {'code': 'GDL', 'name': 'Miguel Hidalgo y Costilla', 'city': 'Guadalajara', 'country': 'Mexico', 'region': 'Mexico', 'is_popular': True},
-            {'code': 'MTY', 'name': 'Mariano Escobedo International', 'city': 'Monterrey', 'country': 'Mexico', 'region': 'Mexico', 'is_popular': True},
-            {'code': 'SJD', 'name': 'Los Cabos International', 'city': 'San Jose del Cabo', 'country': 'Mexico', 'region': 'Mexico', 'is_popular': True},
-            {'code': 'PVR', 'name': 'Gustavo Diaz Ordaz', 'city': 'Puerto Vallarta', 'country': 'Mexico', 'region': 'Mexico', 'is_popular': True},
-            {'code': 'MIA', 'name': 'Miami International Airport', 'city': 'Miami', 'country': 'USA', 'region': 'North America', 'is_popular': True},
-            {'code': 'LAX', 'name': 'Los Angeles International', 'city': 'Los Angeles', 'country': 'USA', 'region': 'North America', 'is_popular': True},
-            {'code': 'JFK', 'name': 'John F Kennedy International', 'city': 'New York', 'country': 'USA', 'region': 'North America', 'is_popular': True},
-            {'code': 'LAS', 'name': 'Harry Reid International', 'city': 'Las Vegas', 'country': 'USA', 'region': 'North America', 'is_popular': True},
-            {'code': 'HOU', 'name': 'William P Hobby Airport', 'city': 'Houston', 'country': 'USA', 'region': 'North America', 'is_popular': True},
+            {'code': 'TLC', 'name': 'Toluca International Airport', 'city': 'Toluca', 'country': 'Mexico', 'region': 'Mexico', 'latitude': 19.3371, 'longitude': -99.566, 'is_popular': True},
+            {'code': 'MEX', 'name': 'Benito Juarez International', 'city': 'Mexico City', 'country': 'Mexico', 'region': 'Mexico', 'latitude': 19.4363, 'longitude': -99.0721, 'is_popular': True},
+            {'code': 'CUN', 'name': 'Cancun International Airport', 'city': 'Cancun', 'country': 'Mexico', 'region': 'Mexico', 'latitude': 21.0365, 'longitude': -86.8771, 'is_popular': True},
+            {'code': 'GDL', 'name': 'Miguel Hidalgo y Costilla', 'city': 'Guadalajara', 'country': 'Mexico', 'region': 'Mexico', 'latitude': 20.5218, 'longitude': -103.3112, 'is_popular': True},
+            {'code': 'MTY', 'name': 'Mariano Escobedo International', 'city': 'Monterrey', 'country': 'Mexico', 'region': 'Mexico', 'latitude': 25.7785, 'longitude': -100.1069, 'is_popular': True},
+            {'code': 'SJD', 'name': 'Los Cabos International', 'city': 'San Jose del Cabo', 'country': 'Mexico', 'region': 'Mexico', 'latitude': 23.1518, 'longitude': -109.7211, 'is_popular': True},
+            {'code': 'PVR', 'name': 'Gustavo Diaz Ordaz', 'city': 'Puerto Vallarta', 'country': 'Mexico', 'region': 'Mexico', 'latitude': 20.6801, 'longitude': -105.2542, 'is_popular': True},
+            {'code': 'MIA', 'name': 'Miami International Airport', 'city': 'Miami', 'country': 'USA', 'region': 'North America', 'latitude': 25.7959, 'longitude': -80.287, 'is_popular': True},
+            {'code': 'LAX', 'name': 'Los Angeles International', 'city': 'Los Angeles', 'country': 'USA', 'region': 'North America', 'latitude': 33.9416, 'longitude': -118.4085, 'is_popular': True},
+            {'code': 'JFK', 'name': 'John F Kennedy International', 'city': 'New York', 'country': 'USA', 'region': 'North America', 'latitude': 40.6413, 'longitude': -73.7781, 'is_popular': True},
+            {'code': 'LAS', 'name': 'Harry Reid International', 'city': 'Las Vegas', 'country': 'USA', 'region': 'North America', 'latitude': 36.084, 'longitude': -115.1537, 'is_popular': True},
+            {'code': 'HOU', 'name': 'William P Hobby Airport', 'city': 'Houston', 'country': 'USA', 'region': 'North America', 'latitude': 29.6454, 'longitude': -95.2789, 'is_popular': True},
         ]
         
         for data in airports_data:
@@ -248,6 +248,11 @@ class Command(BaseCommand):
             )
             if created:
                 self.stdout.write(f'Created airport: {data["code"]} - {data["city"]}')
+            elif airport.latitude is None or airport.longitude is None:
+                airport.latitude = data['latitude']
+                airport.longitude = data['longitude']
+                airport.save()
+                self.stdout.write(f'Added coordinates to airport: {data["code"]}')
         
         # Clear old menu items and create new ones linked to pages
         MenuItem.objects.all().delete()
@@ -262,6 +267,18 @@ class Command(BaseCommand):
             MenuItem.objects.create(**data)
             self.stdout.write(f'Created menu item: {data["title"]}')
         
+        fleet_menu = MenuItem.objects.get(page=fleet_page, parent=None)
+        fleet_submenu = [
+            {'title': 'Private Jets', 'description': 'Explore our fleet', 'page': fleet_page, 'order': 1},
+            {'title': 'Light Jets', 'description': 'Up to 7 passengers', 'url': '/fleet/#light', 'order': 2},
+            {'title': 'Midsize Jets', 'description': 'Up to 9 passengers', 'url': '/fleet/#midsize', 'order': 3},
+            {'title': 'Heavy Jets', 'description': 'Up to 16 passengers', 'url': '/fleet/#heavy', 'order': 4},
+        ]
+        
+        for data in fleet_submenu:
+            MenuItem.objects.create(parent=fleet_menu, **data)
+            self.stdout.write(f'Created menu item: Fleet > {data["title"]}')
+        
         # Fix numchild values for proper Wagtail routing
         from wagtail.models import Page
         root = Page.objects.filter(depth=1).first()
@@ -0,0 +1,49 @@
+"""
+Site navigation built from MenuItem snippets.
+
+The whole tree is read in one query, every linked page's URL is resolved
+against a single lookup of the site root paths, and the rendered menus
+are cached until a menu item, page or site changes.
+"""
+from django.template.loader import render_to_string
+from wagtail.models import Site
+
+from .models import MenuItem
+from .snippet_cache import cached
+
+
+# Generations the cached menus are built from
+MENU_MODELS = ('home.MenuItem', 'wagtailcore.Page', 'wagtailcore.Site')
+
+
+def load_menu():
+    """Top-level menu items, each with .href and its .submenu items"""
+    items = list(MenuItem.objects.select_related('page'))
+    root_paths = Site.get_site_root_paths()
+
+    submenus = {item.pk: [] for item in items}
+    menu = []
+    for item in items:
+        if item.page is not None:
+            # Page.url reuses the root paths cached on the page instead of
+            # looking them up again for every item
+            item.page._wagtail_cached_site_root_paths = root_paths
+        item.href = item.link or '#'
+        item.submenu = submenus[item.pk]
+        if item.parent_id is None:
+            menu.append(item)
+        elif item.parent_id in submenus:
+            submenus[item.parent_id].append(item)
+    return menu
+
+
+def menu_tree():
+    return cached('home:menu', MENU_MODELS, load_menu)
+
+
+def render_menu(template):
+    """HTML of the menu rendered with ``template``, which gets ``menu_items``"""
+    return cached(
+        f'home:menu:{template}', MENU_MODELS,
+        lambda: render_to_string(template, {'menu_items': menu_tree()}),
+    )
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-17 21:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0002_contactpage_experiencepage_genericpage'),
+        ('wagtailimages', '0027_image_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImagePlaceholder',
+            fields=[
+                ('image', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='placeholder', serialize=False, to='wagtailimages.image')),
+                ('file_hash', models.CharField(blank=True, max_length=40)),
+                ('color', models.CharField(help_text='Dominant colour as #rrggbb', max_length=7)),
+                ('data_uri', models.TextField(help_text='Blurred preview as a data: URI')),
+            ],
+            options={
+                'verbose_name': 'Image Placeholder',
+                'verbose_name_plural': 'Image Placeholders',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 22:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0003_imageplaceholder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='description',
+            field=models.CharField(blank=True, help_text='Shown under the title in dropdown menus', max_length=100),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 22:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0004_menuitem_description'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='imageplaceholder',
+            name='color',
+            field=models.CharField(blank=True, help_text='Dominant colour as #rrggbb', max_length=7),
+        ),
+        migrations.AlterField(
+            model_name='imageplaceholder',
+            name='data_uri',
+            field=models.TextField(blank=True, help_text='Blurred preview as a data: URI'),
+        ),
+    ]
@@ -313,6 +313,7 @@ class SiteSettings(models.Model):
 class MenuItem(models.Model):
     """Navigation menu item"""
     title = models.CharField(max_length=100)
+    description = models.CharField(max_length=100, blank=True, help_text="Shown under the title in dropdown menus")
     url = models.CharField(max_length=500, blank=True)
     page = models.ForeignKey(
         'wagtailcore.Page',
@@ -330,6 +331,7 @@ class MenuItem(models.Model):
     
     panels = [
         FieldPanel('title'),
+        FieldPanel('description'),
         FieldPanel('url'),
         FieldPanel('page'),
         FieldPanel('order'),
@@ -349,3 +351,25 @@ class MenuItem(models.Model):
         ordering = ['order']
         verbose_name = "Menu Item"
         verbose_name_plural = "Menu Items"
+
+
+class ImagePlaceholder(models.Model):
+    """Dominant colour and a tiny blurred preview of an image, shown while it loads"""
+    image = models.OneToOneField(
+        'wagtailimages.Image',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='placeholder'
+    )
+    # The image's file_hash when computed, so replaced files are recomputed
+    file_hash = models.CharField(max_length=40, blank=True)
+    # Both left blank when the image file could not be read
+    color = models.CharField(max_length=7, blank=True, help_text="Dominant colour as #rrggbb")
+    data_uri = models.TextField(blank=True, help_text="Blurred preview as a data: URI")
+    
+    def __str__(self):
+        return f"Placeholder for {self.image}"
+    
+    class Meta:
+        verbose_name = "Image Placeholder"
+        verbose_name_plural = "Image Placeholders"
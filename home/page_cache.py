@@ -0,0 +1,212 @@
+"""
+Full-page cache for anonymous visitors.
+
+PageCacheMiddleware stores the rendered response of every Wagtail page
+served to an anonymous GET, keyed on host and full path, and answers
+later requests for it without routing or rendering. Each entry is
+stamped with:
+
+- a generation for its path, advanced when that page is published,
+  unpublished or moved (see home.signals);
+- a site-wide generation, advanced when a change can reach every page,
+  such as a page linked from the menus being published;
+- the snippet generations (home.snippet_cache) of PAGE_CACHE_MODELS,
+  which every page renders, and of the page type's own
+  ``page_cache_models`` (e.g. aircraft for the fleet page).
+
+An entry whose stamp has moved on is ignored and replaced by the next
+render. After a publish, or a change to a snippet a page type declares,
+the affected pages are re-rendered by a background thread once the
+transaction commits, so visitors do not pay for the cold render.
+"""
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections, transaction
+from django.test import RequestFactory
+from django.utils.cache import patch_vary_headers
+from wagtail.models import Page, get_page_models
+
+from .snippet_cache import counters, generations, increment
+
+
+logger = logging.getLogger(__name__)
+
+PAGE_TIMEOUT = 24 * 60 * 60
+
+# Snippets rendered on every page (header, footer, images)
+PAGE_CACHE_MODELS = (
+    'home.MenuItem', 'home.SiteSettings', 'wagtailcore.Site', 'wagtailimages.Image', 'home.ImagePlaceholder',
+)
+
+SITE_GENERATION_KEY = 'pages:generation'
+
+
+def _path_generation_key(path):
+    return f'pages:generation:{hashlib.sha1(path.encode()).hexdigest()}'
+
+
+def _response_key(request):
+    return f'pages:response:{hashlib.sha1(f"{request.get_host()}{request.get_full_path()}".encode()).hexdigest()}'
+
+
+def page_cache_models(page):
+    """Labels of the snippet models whose changes can alter ``page``'s HTML"""
+    return PAGE_CACHE_MODELS + tuple(getattr(page, 'page_cache_models', ()))
+
+
+@lru_cache(maxsize=None)
+def dependent_models():
+    """Every model label some page type's cached HTML depends on"""
+    models = set(PAGE_CACHE_MODELS)
+    for page_model in get_page_models():
+        models.update(getattr(page_model, 'page_cache_models', ()))
+    return tuple(sorted(models))
+
+
+def is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Logged-in users (and previews) have a session; messages are per visitor
+    return settings.SESSION_COOKIE_NAME not in request.COOKIES and 'messages' not in request.COOKIES
+
+
+def is_cacheable_response(request, response):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return False
+    if 'private' in response.get('Cache-Control', '') or 'no-cache' in response.get('Cache-Control', ''):
+        return False
+    # Pages that wrote to the visitor's session or used a CSRF token are not
+    # shareable. Reading it is fine: without a session cookie it is empty and
+    # the user anonymous (e.g. {% wagtailuserbar %} renders nothing)
+    if getattr(getattr(request, 'session', None), 'modified', False):
+        return False
+    if request.META.get('CSRF_COOKIE_NEEDS_UPDATE') or request.META.get('CSRF_COOKIE_USED'):
+        return False
+    return True
+
+
+class PageCacheMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_cacheable_request(request):
+            return self.get_response(request)
+
+        key = _response_key(request)
+        path_keys = [SITE_GENERATION_KEY, _path_generation_key(request.path)]
+        entry = cache.get(key)
+        if entry is not None:
+            models, stamp, response = entry
+            if stamp == counters(path_keys) + generations(*models):
+                response['X-Page-Cache'] = 'hit'
+                return response
+
+        # Read before rendering, so a change during the render leaves the
+        # entry stale rather than storing old HTML under a new generation
+        path_stamp = counters(path_keys)
+        current = dict(zip(dependent_models(), generations(*dependent_models())))
+        response = self.get_response(request)
+
+        page = (getattr(response, 'context_data', None) or {}).get('page')
+        if isinstance(page, Page) and is_cacheable_response(request, response):
+            # Shared caches downstream must not give it to logged-in users
+            patch_vary_headers(response, ('Cookie',))
+            models = page_cache_models(page)
+            stamp = path_stamp + tuple(current[model] for model in models)
+            cache.set(key, (models, stamp, response), PAGE_TIMEOUT)
+            response['X-Page-Cache'] = 'miss'
+        return response
+
+
+def _page_path(page):
+    url_parts = page.get_url_parts()
+    if url_parts is None or url_parts[2] is None:
+        return None
+    return url_parts[2]
+
+
+def purge_path(path):
+    increment(_path_generation_key(path))
+
+
+def purge_page(page):
+    """Drop ``page``'s cached responses, now and once the transaction commits"""
+    path = _page_path(page)
+    if path is None:
+        return
+    purge_path(path)
+    transaction.on_commit(lambda: purge_path(path))
+
+
+def purge_all():
+    """Drop every cached page, now and once the transaction commits"""
+    increment(SITE_GENERATION_KEY)
+    transaction.on_commit(lambda: increment(SITE_GENERATION_KEY))
+
+
+# Background warming: URLs to render, drained by a single worker thread
+_warm_lock = threading.Lock()
+_warm_queue = []
+_warmer = None
+
+
+def warm(url):
+    """Render ``url`` as an anonymous visitor, storing it in the page cache"""
+    parts = urlsplit(url)
+    request = RequestFactory().get(parts.path or '/', HTTP_HOST=parts.netloc)
+    response = WSGIHandler().get_response(request)
+    if response.status_code != 200:
+        logger.warning('Warming %s returned %s', url, response.status_code)
+    return response
+
+
+def _drain():
+    global _warmer
+    try:
+        while True:
+            with _warm_lock:
+                if not _warm_queue:
+                    _warmer = None
+                    return
+                url = _warm_queue.pop(0)
+            try:
+                warm(url)
+            except Exception:
+                logger.exception('Could not warm %s', url)
+    finally:
+        connections.close_all()
+
+
+def _enqueue(urls):
+    global _warmer
+    with _warm_lock:
+        _warm_queue.extend(url for url in urls if url not in _warm_queue)
+        if _warmer is None:
+            _warmer = threading.Thread(target=_drain, name='page-cache-warmer', daemon=True)
+            _warmer.start()
+
+
+def schedule_warm(pages):
+    """Re-render ``pages`` in the background once the transaction commits"""
+    urls = [page.full_url for page in pages]
+    urls = [url for url in urls if url]
+    if urls:
+        transaction.on_commit(lambda: _enqueue(urls))
+
+
+def pages_depending_on(model):
+    """Live pages whose type declares ``model`` in page_cache_models"""
+    pages = []
+    for page_model in get_page_models():
+        if model._meta.label in getattr(page_model, 'page_cache_models', ()):
+            pages.extend(page_model.objects.live())
+    return pages
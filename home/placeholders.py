@@ -0,0 +1,121 @@
+"""
+Low-quality image placeholders (LQIP) for Wagtail images.
+
+For each image an ImagePlaceholder row stores its dominant colour and a
+blurred preview a few pixels wide, encoded as a data: URI of a few hundred
+bytes. Templates inline both as the background of the image's container,
+so the layout is painted immediately and the full picture fades in over
+it without extra requests. Placeholders are computed when an image is
+saved, and by the compute_placeholders command for images uploaded
+before that; rendering only reads them. An image whose file cannot be
+read gets a blank placeholder, so it is not retried on every save.
+"""
+import base64
+import io
+import logging
+
+from django.db.models import prefetch_related_objects
+from PIL import Image as PILImage, ImageFilter
+from wagtail.blocks import StreamValue, StructValue
+from wagtail.blocks.list_block import ListValue
+from wagtail.images.models import AbstractImage
+
+from .models import ImagePlaceholder
+
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_SIZE = 16
+PREVIEW_QUALITY = 40
+DOMINANT_SAMPLE_SIZE = 64
+DOMINANT_COLORS = 4
+
+
+def dominant_color(picture):
+    """Most common colour of a small palette-reduced copy, as #rrggbb"""
+    sample = picture.copy()
+    sample.thumbnail((DOMINANT_SAMPLE_SIZE, DOMINANT_SAMPLE_SIZE))
+    quantized = sample.quantize(colors=DOMINANT_COLORS, method=PILImage.Quantize.FASTOCTREE)
+    count, index = max(quantized.getcolors())
+    r, g, b = quantized.getpalette()[index * 3:index * 3 + 3]
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+def preview_data_uri(picture):
+    preview = picture.copy()
+    preview.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+    preview = preview.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    preview.save(buffer, 'WEBP', quality=PREVIEW_QUALITY)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def compute_placeholder(image):
+    """Build (without saving) the ImagePlaceholder for a Wagtail image"""
+    with image.open_file() as f:
+        picture = PILImage.open(f)
+        # JPEG can decode straight to a fraction of its size, which is all we need
+        picture.draft('RGB', (DOMINANT_SAMPLE_SIZE, DOMINANT_SAMPLE_SIZE))
+        picture = picture.convert('RGB')
+    return ImagePlaceholder(
+        image=image,
+        file_hash=image.file_hash,
+        color=dominant_color(picture),
+        data_uri=preview_data_uri(picture),
+    )
+
+
+def update_placeholder(image):
+    """Compute and store the placeholder; it is blank if the file is missing or unreadable"""
+    try:
+        placeholder = compute_placeholder(image)
+    except OSError as e:
+        logger.warning('Could not compute a placeholder for image %s: %s', image.pk, e)
+        placeholder = ImagePlaceholder(image=image, file_hash=image.file_hash)
+    placeholder.save()
+    image.placeholder = placeholder
+    return placeholder
+
+
+def current_placeholder(image):
+    """The image's stored placeholder if it matches the current file, else None"""
+    try:
+        placeholder = image.placeholder
+    except ImagePlaceholder.DoesNotExist:
+        return None
+    if placeholder is None or placeholder.file_hash != image.file_hash:
+        return None
+    return placeholder
+
+
+def ensure_placeholder(image):
+    """Compute the placeholder unless an up-to-date one is stored"""
+    return current_placeholder(image) or update_placeholder(image)
+
+
+def get_placeholder(image):
+    """The placeholder to render for ``image``, or None; never computes one"""
+    placeholder = current_placeholder(image)
+    if placeholder is None or not placeholder.color:
+        return None
+    return placeholder
+
+
+def _images(value):
+    if isinstance(value, AbstractImage):
+        yield value
+    elif isinstance(value, StructValue):
+        for child in value.values():
+            yield from _images(child)
+    elif isinstance(value, StreamValue):
+        for child in value:
+            yield from _images(child.value)
+    elif isinstance(value, (list, ListValue)):
+        for child in value:
+            yield from _images(child)
+
+
+def prefetch_placeholders(values):
+    """Load the placeholders of every image in ``values`` (block values) in one query"""
+    images = [image for value in values for image in _images(value)]
+    prefetch_related_objects(images, 'placeholder')
@@ -0,0 +1,158 @@
+"""
+Discover which image renditions the site's templates will ask for.
+
+Filter specs are read from the compiled {% image %}, {% srcset_image %}
+and {% picture %} tags (brace expansions included) rather than listed by
+hand, so new templates are picked up automatically. Images chosen inside
+StreamField blocks get the specs of the tags in their enclosing block
+templates that render a field of that name; images on models (aircraft,
+the site logo) get the specs of project templates that render the field.
+The result is a {image_id: {spec, ...}} mapping used by the
+pregenerate_renditions command.
+"""
+from collections import defaultdict
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from wagtail import blocks
+from wagtail.fields import StreamField
+from wagtail.images.blocks import ImageChooserBlock
+from wagtail.images.templatetags.wagtailimages_tags import ImageNode, SrcsetImageNode
+from wagtail.models import Page
+
+
+# (model, image field) pairs rendered outside StreamFields
+MODEL_IMAGE_FIELDS = [
+    ('fleet.Aircraft', 'main_image'),
+    ('fleet.Aircraft', 'interior_image'),
+    ('home.SiteSettings', 'logo'),
+]
+
+
+def template_image_tags(template_name):
+    """(image expression, [filter spec, ...]) for each image tag in a template"""
+    try:
+        template = get_template(template_name)
+    except TemplateDoesNotExist:
+        return []
+    tags = []
+    for node in template.template.nodelist.get_nodes_by_type(ImageNode):
+        if isinstance(node, SrcsetImageNode):
+            specs = [f.spec for f in node.get_filters()]
+        else:
+            specs = [node.get_filter().spec]
+        tags.append((node.image_expr.token, specs))
+    return tags
+
+
+def project_templates():
+    """Template names under the project's template directories"""
+    names = []
+    for directory in settings.TEMPLATES[0]['DIRS']:
+        directory = Path(directory)
+        names.extend(
+            path.relative_to(directory).as_posix() for path in sorted(directory.rglob('*.html'))
+        )
+    return names
+
+
+def stream_fields():
+    """(page model, [StreamField, ...]) for every concrete page type with StreamFields"""
+    for model in apps.get_models():
+        if not issubclass(model, Page) or model is Page:
+            continue
+        fields = [f for f in model._meta.get_fields() if isinstance(f, StreamField) and f.model is model]
+        if fields:
+            yield model, fields
+
+
+def block_templates():
+    """Names of all templates used by blocks in page StreamFields"""
+    names = set()
+
+    def walk(block):
+        template = getattr(block.meta, 'template', None)
+        if template:
+            names.add(template)
+        for child in getattr(block, 'child_blocks', {}).values():
+            walk(child)
+        if isinstance(block, blocks.ListBlock):
+            walk(block.child_block)
+
+    for _, fields in stream_fields():
+        for field in fields:
+            walk(field.stream_block)
+    return names
+
+
+def _field_specs(tags, field_name):
+    """Specs of the tags whose image expression ends in ``.field_name``"""
+    return {
+        spec for expression, specs in tags
+        if expression.split('|')[0].rsplit('.', 1)[-1] == field_name
+        for spec in specs
+    }
+
+
+def _collect_block_images(block, name, value, tags, found, tags_for):
+    """Add image ids chosen anywhere in a raw block ``value`` to ``found``"""
+    template = getattr(block.meta, 'template', None)
+    if template:
+        # Parent templates often render nested values inline, so keep their tags too
+        tags = tags + tags_for(template)
+
+    if isinstance(block, ImageChooserBlock):
+        specs = _field_specs(tags, name)
+        if value and specs:
+            found[value].update(specs)
+    elif isinstance(block, blocks.StreamBlock):
+        for child in value or []:
+            child_block = block.child_blocks.get(child.get('type'))
+            if child_block is not None:
+                _collect_block_images(child_block, child['type'], child.get('value'), tags, found, tags_for)
+    elif isinstance(block, blocks.ListBlock):
+        for item in value or []:
+            # List items are stored as {"type": "item", "value": ...} in current versions
+            if isinstance(item, dict) and item.get('type') == 'item' and 'value' in item:
+                item = item['value']
+            _collect_block_images(block.child_block, name, item, tags, found, tags_for)
+    elif isinstance(block, blocks.StructBlock):
+        for child_name, child_block in block.child_blocks.items():
+            _collect_block_images(child_block, child_name, (value or {}).get(child_name), tags, found, tags_for)
+
+
+def collect_image_specs():
+    """{image_id: {filter spec, ...}} for every image the live site renders"""
+    found = defaultdict(set)
+    cache = {}
+
+    def tags_for(template_name):
+        if template_name not in cache:
+            cache[template_name] = template_image_tags(template_name)
+        return cache[template_name]
+
+    for model, fields in stream_fields():
+        names = [field.name for field in fields]
+        for row in model.objects.live().values_list(*names):
+            for field, stream in zip(fields, row):
+                # raw_data reads the stored JSON without loading any images
+                _collect_block_images(field.stream_block, field.name, list(stream.raw_data), [], found, tags_for)
+
+    excluded = block_templates()
+    page_tags = [
+        tag for name in project_templates() if name not in excluded
+        for tag in template_image_tags(name)
+    ]
+    for model_label, field_name in MODEL_IMAGE_FIELDS:
+        specs = _field_specs(page_tags, field_name)
+        if not specs:
+            continue
+        model = apps.get_model(model_label)
+        image_ids = model.objects.filter(**{f'{field_name}__isnull': False}).values_list(f'{field_name}_id', flat=True)
+        for image_id in image_ids:
+            found[image_id].update(specs)
+
+    return dict(found)
@@ -0,0 +1,68 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from wagtail.images import get_image_model
+from wagtail.models import Page
+from wagtail.signals import page_published, page_unpublished, post_page_move
+
+from . import page_cache, snippet_cache
+from .models import MenuItem
+from .placeholders import ensure_placeholder
+
+
+@receiver(post_save, sender=get_image_model())
+def image_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and not {'file', 'file_hash'} & set(update_fields)):
+        return
+    # After commit, so a slow upload does not hold the transaction open
+    transaction.on_commit(lambda: ensure_placeholder(instance))
+
+
+@receiver(page_published, dispatch_uid='page_cache_published')
+def page_published_purge(sender, instance, **kwargs):
+    page_cache.purge_page(instance)
+    if MenuItem.objects.filter(page=instance).exists():
+        # The menus on every page may show its new title or URL
+        page_cache.purge_all()
+    page_cache.schedule_warm([instance])
+
+
+@receiver(page_unpublished, dispatch_uid='page_cache_unpublished')
+@receiver(post_delete, dispatch_uid='page_cache_deleted')
+def page_unpublished_purge(sender, instance, **kwargs):
+    if isinstance(instance, Page):
+        page_cache.purge_page(instance)
+
+
+@receiver(post_page_move, dispatch_uid='page_cache_moved')
+def page_moved_purge(sender, instance, **kwargs):
+    # Every page under the old and new paths, and any menu linking to them
+    page_cache.purge_all()
+    page_cache.schedule_warm([instance])
+
+
+def snippet_changed(sender, **kwargs):
+    snippet_cache.changed(sender)
+    page_cache.schedule_warm(page_cache.pages_depending_on(sender))
+
+
+@receiver(post_save, dispatch_uid='snippet_page_saved')
+@receiver(post_delete, dispatch_uid='snippet_page_deleted')
+@receiver(post_page_move, dispatch_uid='snippet_page_moved')
+def page_changed(sender, instance, **kwargs):
+    # Page signals are sent by the specific page class, so match any sender
+    if isinstance(instance, Page):
+        snippet_cache.changed(Page)
+
+
+for label in snippet_cache.TRACKED_MODELS:
+    if label == 'booking.Airport':
+        # booking.signals bumps it while updating the airport indexes
+        continue
+    if label == 'wagtailcore.Page':
+        # Bumped by page_changed for every page type
+        continue
+    model = apps.get_model(label)
+    post_save.connect(snippet_changed, sender=model, dispatch_uid=f'snippet_saved:{label}')
+    post_delete.connect(snippet_changed, sender=model, dispatch_uid=f'snippet_deleted:{label}')
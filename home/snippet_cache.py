@@ -0,0 +1,212 @@
+"""
+Generation-stamped read-through cache for snippet models.
+
+Each tracked model has a generation counter in the shared Django cache
+(Redis when REDIS_URL is set). Saving or deleting an instance bumps it,
+once immediately and again when the transaction commits, so a reader in
+another process cannot cache pre-commit data under the new generation.
+
+cached(key, models, build) keeps build()'s result in process memory
+together with the generations it was built at, and rebuilds it when any
+of them moves on. In steady state a hot path costs one cache lookup and
+no database queries, and no process serves data older than the last
+committed admin edit.
+
+Airport generations are bumped by booking.signals, which also applies
+committed changes incrementally to the in-memory airport indexes.
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+
+
+TRACKED_MODELS = (
+    'fleet.Aircraft',
+    'fleet.AircraftCategory',
+    'booking.Airport',
+    'booking.FlightRoute',
+    'home.SiteSettings',
+    'home.MenuItem',
+    # Cached snippets carry their images and placeholders. Renditions are
+    # not tracked: the cached images keep the ones created while rendering
+    'wagtailimages.Image',
+    'home.ImagePlaceholder',
+    # Menus link to pages, whose URLs depend on the sites
+    'wagtailcore.Page',
+    'wagtailcore.Site',
+)
+
+
+def _label(model):
+    if isinstance(model, str):
+        return apps.get_model(model)._meta.label_lower
+    return model._meta.label_lower
+
+
+def _generation_key(model):
+    return f'snippets:generation:{_label(model)}'
+
+
+def _changed_key(model):
+    return f'snippets:changed:{_label(model)}'
+
+
+def _initial_generation():
+    # Counters start from the clock, so one lost from the cache restarts
+    # above every value handed out before
+    return int(time.time() * 1000)
+
+
+def counters(keys):
+    """Current value of each generation counter, in one cache round trip"""
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_generation(), None)
+            found[key] = cache.get(key)
+    return tuple(found[key] for key in keys)
+
+
+def increment(key):
+    """Advance a generation counter and return its new value"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_generation(), None)
+        return cache.incr(key)
+
+
+def generations(*models):
+    """Current generation of each model, in one cache round trip"""
+    return counters([_generation_key(model) for model in models])
+
+
+def generation(model):
+    return generations(model)[0]
+
+
+async def ageneration(model):
+    key = _generation_key(model)
+    value = await cache.aget(key)
+    if value is None:
+        await cache.aadd(key, _initial_generation(), None)
+        value = await cache.aget(key)
+    return value
+
+
+def bump(model):
+    """Start a new generation for ``model`` and return it"""
+    cache.set(_changed_key(model), time.time(), None)
+    return increment(_generation_key(model))
+
+
+# Generations handed out by changed() with a callback in this process. The
+# changes behind them are applied here on commit, or were rolled back, so
+# state kept current by the callback need not rebuild for them.
+LOCAL_GENERATIONS_KEPT = 1000
+_local_lock = threading.Lock()
+_local_generations = {}
+
+
+def _record_local(model, generation):
+    with _local_lock:
+        _local_generations.setdefault(_label(model), deque(maxlen=LOCAL_GENERATIONS_KEPT)).append(generation)
+
+
+def local_changes_only(model, since, until):
+    """Whether every generation of ``model`` after ``since`` up to ``until`` came from changed() here"""
+    if since is None or until < since or until - since > LOCAL_GENERATIONS_KEPT:
+        return False
+    with _local_lock:
+        local = set(_local_generations.get(_label(model), ()))
+    return all(generation in local for generation in range(since + 1, until + 1))
+
+
+def changed(model, callback=None):
+    """
+    Bump ``model`` now and again once the transaction commits.
+
+    ``callback(generation)`` runs after the commit bump only, for state that
+    follows the change incrementally instead of being rebuilt. Other
+    processes see the first bump and rebuild; this one skips both bumps
+    (see local_changes_only), so a rollback leaves its state untouched.
+    """
+    first = bump(model)
+    if callback is not None:
+        _record_local(model, first)
+
+    def bump_and_apply():
+        current = bump(model)
+        if callback is not None:
+            _record_local(model, current)
+            callback(current)
+
+    transaction.on_commit(bump_and_apply)
+
+
+def last_changed(model):
+    """When ``model`` last changed, for Last-Modified headers"""
+    stamp = cache.get(_changed_key(model))
+    if stamp is None:
+        stamp = time.time()
+        cache.add(_changed_key(model), stamp, None)
+    return datetime.fromtimestamp(int(stamp), tz=timezone.utc)
+
+
+async def alast_changed(model):
+    stamp = await cache.aget(_changed_key(model))
+    if stamp is None:
+        stamp = time.time()
+        await cache.aadd(_changed_key(model), stamp, None)
+    return datetime.fromtimestamp(int(stamp), tz=timezone.utc)
+
+
+class GenerationCache:
+    """Process-local values, each valid for the generations it was built at"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}
+        self._entries = {}
+
+    def get(self, key, models, build):
+        stamp = generations(*models)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+            # The stamp is read before building, so a change during the
+            # build leaves this entry stale and it is rebuilt next time
+            value = build()
+            self._entries[key] = (stamp, value)
+            return value
+
+    def forget(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+snippet_cache = GenerationCache()
+
+
+def cached(key, models, build):
+    """build(), memoized until any of ``models`` changes"""
+    return snippet_cache.get(key, models, build)
+
+
+def forget(key):
+    """Drop one cached value, e.g. after a bulk write the generations cannot see"""
+    snippet_cache.forget(key)
@@ -0,0 +1,35 @@
+from django import template
+
+from home.block_cache import render_stream
+from home.menus import render_menu
+from home.placeholders import get_placeholder
+
+
+register = template.Library()
+
+
+@register.filter
+def placeholder_style(image):
+    """Inline CSS painting an image's placeholder behind it while it loads"""
+    if not image:
+        return ''
+    placeholder = get_placeholder(image)
+    if placeholder is None:
+        return ''
+    return (
+        f'background-color:{placeholder.color};'
+        f'background-image:url({placeholder.data_uri});'
+        'background-size:cover;background-position:center;'
+    )
+
+
+@register.simple_tag
+def menu(template):
+    """The MenuItem navigation rendered with ``template``"""
+    return render_menu(template)
+
+
+@register.simple_tag(takes_context=True)
+def include_stream(context, stream):
+    """Render every block of a StreamField like {% include_block %}, through the block cache"""
+    return render_stream(stream, context)
@@ -1,3 +1,447 @@
-from django.test import TestCase
+import io
+import os
+import re
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Page, Site
+
+from . import block_cache, page_cache, placeholders, snippet_cache
+from .context_processors import LOGO_IMAGE_SPECS
+from .menus import menu_tree, render_menu
+from .models import GenericPage, HomePage, ImagePlaceholder, MenuItem, SiteSettings
+from .renditions import collect_image_specs
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+# Renders are measured without the full-page cache in front of them
+WITHOUT_PAGE_CACHE = [m for m in settings.MIDDLEWARE if m != 'home.page_cache.PageCacheMiddleware']
+
+
+class MenuTests(TestCase):
+
+    def setUp(self):
+        root = Page.get_first_root_node()
+        home = root.add_child(instance=HomePage(title='Home', slug='menu-test-home'))
+        Site.objects.update_or_create(
+            is_default_site=True,
+            defaults={'hostname': 'localhost', 'root_page': home},
+        )
+        self.pages = [
+            home.add_child(instance=Page(title=f'Page {i}', slug=f'page-{i}'))
+            for i in range(3)
+        ]
+        for i, page in enumerate(self.pages):
+            parent = MenuItem.objects.create(title=f'Menu {i}', page=page, order=i)
+            for j, child_page in enumerate(self.pages):
+                MenuItem.objects.create(title=f'Menu {i}-{j}', page=child_page, parent=parent, order=j)
+        MenuItem.objects.create(title='External', url='https://example.com/', order=9)
+
+    def test_tree_is_built_in_one_query(self):
+        # Wagtail caches the site root paths itself
+        Site.get_site_root_paths()
+        with CaptureQueriesContext(connection) as queries:
+            menu = menu_tree()
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([item.title for item in menu], ['Menu 0', 'Menu 1', 'Menu 2', 'External'])
+        self.assertEqual([child.href for child in menu[1].submenu], ['/page-0/', '/page-1/', '/page-2/'])
+        self.assertEqual(menu[3].href, 'https://example.com/')
+
+    def test_rendered_menu_is_cached(self):
+        render_menu('partials/menu_mobile.html')
+        with self.assertNumQueries(0):
+            html = render_menu('partials/menu_mobile.html')
+
+        self.assertIn('href="/page-1/"', html)
+
+    def test_page_moves_are_visible_on_next_render(self):
+        render_menu('partials/menu_mobile.html')
+
+        page = self.pages[1]
+        page.slug = 'moved'
+        page.save_revision().publish()
+        html = render_menu('partials/menu_mobile.html')
+
+        self.assertIn('href="/moved/"', html)
+        self.assertNotIn('href="/page-1/"', html)
+
+    def test_menu_edits_are_visible_on_next_render(self):
+        render_menu('partials/menu_mobile.html')
+
+        MenuItem.objects.filter(title='External').delete()
+        html = render_menu('partials/menu_mobile.html')
+
+        self.assertNotIn('External', html)
+
+
+class SnippetCacheTests(TestCase):
+
+    def setUp(self):
+        snippet_cache.forget('test:menu')
+        self.build = mock.Mock(side_effect=lambda: self.build.call_count)
+
+    def cached(self):
+        return snippet_cache.cached('test:menu', (MenuItem,), self.build)
+
+    def test_values_are_memoized(self):
+        self.assertEqual(self.cached(), 1)
+        self.assertEqual(self.cached(), 1)
+        self.assertEqual(self.build.call_count, 1)
+
+    def test_a_new_generation_rebuilds(self):
+        self.cached()
+        snippet_cache.bump(MenuItem)
+
+        self.assertEqual(self.cached(), 2)
+        self.assertEqual(self.cached(), 2)
+
+    def test_changes_bump_again_on_commit(self):
+        before = snippet_cache.generation(MenuItem)
+        with self.captureOnCommitCallbacks(execute=True):
+            snippet_cache.changed(MenuItem)
+            self.assertEqual(snippet_cache.generation(MenuItem), before + 1)
+            # Built from pre-commit data, so it must not outlive the commit
+            self.assertEqual(self.cached(), 1)
+
+        self.assertEqual(snippet_cache.generation(MenuItem), before + 2)
+        self.assertEqual(self.cached(), 2)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MIDDLEWARE=WITHOUT_PAGE_CACHE)
+class SiteSettingsTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        root = Page.get_first_root_node()
+        self.home = root.add_child(instance=HomePage(title='Home', slug='settings-test-home'))
+        Site.objects.update_or_create(
+            is_default_site=True,
+            defaults={'hostname': 'localhost', 'root_page': self.home},
+        )
+        logo = get_image_model().objects.create(title='Logo', file=get_test_image_file())
+        self.settings = SiteSettings.objects.create(
+            site_name='Test Air', phone_number='+1 555 0100', email='fly@example.com', logo=logo,
+        )
+
+    def render_queries(self):
+        # The first render builds the cached settings and the logo renditions
+        self.client.get(self.home.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.home.url)
+        return [query['sql'] for query in queries], response
+
+    def test_settings_and_logo_cost_no_queries(self):
+        queries, response = self.render_queries()
+
+        self.assertEqual(
+            [sql for sql in queries if '"home_sitesettings' in sql or '"wagtailimages_' in sql], [],
+        )
+        self.assertContains(response, 'href="tel:+15550100"')
+        self.assertContains(response, 'mailto:fly@example.com')
+        self.assertContains(response, '<picture>')
+
+    def test_edits_are_visible_on_next_render(self):
+        self.render_queries()
+
+        self.settings.phone_number = '+1 555 0199'
+        self.settings.save()
+        response = self.client.get(self.home.url)
+
+        self.assertContains(response, '+1 555 0199')
+        self.assertNotContains(response, '+1 555 0100')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MIDDLEWARE=WITHOUT_PAGE_CACHE)
+class PlaceholderTests(TestCase):
+
+    def setUp(self):
+        self.images = [
+            get_image_model().objects.create(title=f'Image {i}', file=get_test_image_file())
+            for i in range(3)
+        ]
+        for image in self.images:
+            placeholders.ensure_placeholder(image)
+        root = Page.get_first_root_node()
+        self.home = root.add_child(instance=HomePage(title='Home', slug='placeholder-test-home', body=[
+            ('cta', {'title': f'Call {i}', 'button_text': 'Book', 'background_image': image})
+            for i, image in enumerate(self.images)
+        ]))
+        Site.objects.update_or_create(
+            is_default_site=True,
+            defaults={'hostname': 'localhost', 'root_page': self.home},
+        )
+
+    def test_block_placeholders_are_loaded_in_one_query(self):
+        self.client.get(self.home.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.home.url)
+
+        self.assertEqual(len([q for q in queries if '"home_imageplaceholder"' in q['sql']]), 1)
+        for image in self.images:
+            self.assertContains(response, image.placeholder.color)
+
+    def test_rendering_never_computes_placeholders(self):
+        ImagePlaceholder.objects.all().delete()
+
+        with mock.patch.object(placeholders, 'compute_placeholder') as compute:
+            response = self.client.get(self.home.url)
+
+        compute.assert_not_called()
+        self.assertNotContains(response, 'data:image/webp')
+
+    def test_unreadable_files_are_recorded_once(self):
+        ImagePlaceholder.objects.all().delete()
+        image = get_image_model().objects.get(pk=self.images[0].pk)
+        image.file.storage.delete(image.file.name)
+
+        with self.assertLogs('home.placeholders', 'WARNING'):
+            placeholders.ensure_placeholder(image)
+        with mock.patch.object(placeholders, 'compute_placeholder') as compute:
+            placeholders.ensure_placeholder(image)
+
+        compute.assert_not_called()
+        self.assertIsNone(placeholders.get_placeholder(image))
+
+    def test_command_fills_in_missing_placeholders(self):
+        ImagePlaceholder.objects.filter(image=self.images[1]).delete()
+
+        call_command('compute_placeholders', stdout=open(os.devnull, 'w'))
+
+        self.assertEqual(ImagePlaceholder.objects.count(), 3)
+        self.assertTrue(ImagePlaceholder.objects.get(image=self.images[1]).color.startswith('#'))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PregenerateRenditionsTests(TestCase):
+
+    CTA_SPECS = set(Filter.expand_spec('format-{avif,webp,jpeg} fill-{1920x600,1280x400,640x200}'))
+
+    def setUp(self):
+        # Wagtail caches renditions by image id, which the rolled back
+        # images of earlier tests shared
+        cache.clear()
+        self.image, self.draft_image, self.logo = [
+            get_image_model().objects.create(title=title, file=get_test_image_file())
+            for title in ['Banner', 'Draft banner', 'Logo']
+        ]
+        root = Page.get_first_root_node()
+        root.add_child(instance=HomePage(title='Home', slug='renditions-test-home', body=[
+            ('cta', {'title': 'Call', 'button_text': 'Book', 'background_image': self.image}),
+        ]))
+        root.add_child(instance=HomePage(title='Draft', slug='renditions-test-draft', live=False, body=[
+            ('cta', {'title': 'Call', 'button_text': 'Book', 'background_image': self.draft_image}),
+        ]))
+        SiteSettings.objects.create(site_name='Test Air', logo=self.logo)
+
+    def rendition_specs(self, image):
+        return set(image.renditions.values_list('filter_spec', flat=True))
+
+    def test_specs_are_read_from_the_templates(self):
+        specs = collect_image_specs()
+
+        self.assertEqual(specs[self.image.pk], self.CTA_SPECS)
+        self.assertEqual(specs[self.logo.pk], set(LOGO_IMAGE_SPECS))
+        self.assertNotIn(self.draft_image.pk, specs)
+
+    def test_command_creates_only_missing_renditions(self):
+        self.image.get_rendition('format-jpeg|fill-640x200')
+
+        call_command('pregenerate_renditions', '--dry-run', stdout=open(os.devnull, 'w'))
+        self.assertEqual(self.rendition_specs(self.image), {'format-jpeg|fill-640x200'})
+
+        call_command('pregenerate_renditions', '--workers', '1', stdout=open(os.devnull, 'w'))
+
+        self.assertEqual(self.rendition_specs(self.image), self.CTA_SPECS)
+        self.assertEqual(self.rendition_specs(self.logo), set(LOGO_IMAGE_SPECS))
+        self.assertEqual(self.rendition_specs(self.draft_image), set())
+
+    def test_unreadable_images_are_reported(self):
+        self.image.file.storage.delete(self.image.file.name)
+        errors = io.StringIO()
+
+        call_command('pregenerate_renditions', '--workers', '1', stdout=open(os.devnull, 'w'), stderr=errors)
+
+        self.assertIn(f'image {self.image.pk}:', errors.getvalue())
+        self.assertEqual(self.rendition_specs(self.logo), set(LOGO_IMAGE_SPECS))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MIDDLEWARE=WITHOUT_PAGE_CACHE)
+class ResponsivePictureTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        image = get_image_model().objects.create(title='Photo', file=get_test_image_file(size=(2000, 1200)))
+        card = {'image': image, 'title': 'Card', 'description': 'Text', 'link_text': 'View'}
+        root = Page.get_first_root_node()
+        self.home = root.add_child(instance=HomePage(title='Home', slug='pictures-test-home', body=[
+            ('hero', {'background_image': image, 'headline': 'Fly', 'cta_text': 'Book'}),
+            ('memberships', {'section_title': 'Memberships', 'cards': [card, card]}),
+            ('cta', {'title': 'Call', 'button_text': 'Book', 'background_image': image}),
+        ]))
+        Site.objects.update_or_create(
+            is_default_site=True,
+            defaults={'hostname': 'localhost', 'root_page': self.home},
+        )
+
+    def pictures(self):
+        response = self.client.get(self.home.url)
+        self.assertEqual(response.status_code, 200)
+        return re.findall(r'<picture>.*?</picture>', response.content.decode(), re.DOTALL)
+
+    def test_blocks_serve_responsive_pictures(self):
+        # One render, as encoding the AVIF renditions is slow
+        hero, *rest = pictures = self.pictures()
+
+        self.assertEqual(len(pictures), 4)
+        for picture in pictures:
+            self.assertIn('type="image/avif"', picture)
+            self.assertIn('type="image/webp"', picture)
+            self.assertRegex(picture, r'<img[^>]+src="[^"]+\.jpg"[^>]+width="\d+"')
+        cta = pictures[-1]
+        for width in ['640w', '1280w', '1920w']:
+            self.assertIn(width, cta)
+        self.assertIn('sizes="100vw"', cta)
+        # Only the hero loads eagerly
+        self.assertIn('fetchpriority="high"', hero)
+        self.assertNotIn('loading="lazy"', hero)
+        for picture in rest:
+            self.assertIn('loading="lazy"', picture)
+
+
+@override_settings(HOME_BLOCK_CACHE=True, MIDDLEWARE=WITHOUT_PAGE_CACHE)
+class BlockCacheTests(TestCase):
+
+    def setUp(self):
+        root = Page.get_first_root_node()
+        self.home = root.add_child(instance=HomePage(title='Home', slug='blocks-test-home', body=[
+            ('cta', {'title': 'First call', 'button_text': 'Book'}),
+            ('cta', {'title': 'Second call', 'button_text': 'Book'}),
+        ]))
+        Site.objects.update_or_create(
+            is_default_site=True,
+            defaults={'hostname': 'localhost', 'root_page': self.home},
+        )
+
+    def rendered_titles(self):
+        with mock.patch.object(block_cache, 'render_child', wraps=block_cache.render_child) as render:
+            response = self.client.get(self.home.url)
+        return [call.args[0].value['title'] for call in render.call_args_list], response
+
+    def test_unchanged_blocks_are_served_from_cache(self):
+        first, _ = self.rendered_titles()
+        second, response = self.rendered_titles()
+
+        self.assertEqual(first, ['First call', 'Second call'])
+        self.assertEqual(second, [])
+        self.assertContains(response, 'Second call')
+
+    def test_publish_rerenders_only_changed_blocks(self):
+        self.rendered_titles()
+
+        page = self.home.get_latest_revision_as_object()
+        page.body[1].value['title'] = 'Edited call'
+        page.save_revision().publish()
+        rendered, response = self.rendered_titles()
+
+        self.assertEqual(rendered, ['Edited call'])
+        self.assertContains(response, 'First call')
+        self.assertContains(response, 'Edited call')
+
+    def test_moving_a_linked_page_rerenders_the_link(self):
+        about = self.home.add_child(instance=GenericPage(title='About', slug='about'))
+        company = self.home.add_child(instance=GenericPage(title='Company', slug='company'))
+        page = self.home.get_latest_revision_as_object()
+        page.body.append(('image_text', {
+            'title': 'Linked', 'content': f'<p><a linktype="page" id="{about.pk}">About us</a></p>',
+        }))
+        page.save_revision().publish()
+        self.rendered_titles()
+
+        about.move(company, pos='last-child')
+        rendered, response = self.rendered_titles()
+
+        self.assertEqual(rendered, ['Linked'])
+        self.assertContains(response, 'href="/company/about/"')
+
+
+class PageCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        root = Page.get_first_root_node()
+        self.home = root.add_child(instance=HomePage(title='Home', slug='page-cache-home'))
+        Site.objects.update_or_create(
+            is_default_site=True,
+            defaults={'hostname': 'localhost', 'root_page': self.home},
+        )
+        self.about = self.home.add_child(instance=GenericPage(title='About', slug='about'))
+
+    def get(self, page):
+        # Requested on the site's hostname, like warm() does
+        response = self.client.get(page.url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_anonymous_gets_are_served_from_cache(self):
+        self.assertEqual(self.get(self.about)['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = self.get(self.about)
+
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'About')
+
+    def test_logged_in_users_bypass_cache(self):
+        self.get(self.about)
+        self.client.force_login(get_user_model().objects.create_user('editor'))
+
+        self.assertNotIn('X-Page-Cache', self.get(self.about))
+
+    def test_publish_purges_only_that_page(self):
+        self.get(self.home)
+        self.get(self.about)
+
+        self.about.title = 'About us'
+        with mock.patch.object(page_cache, '_enqueue'):
+            self.about.save_revision().publish()
+
+        self.assertEqual(self.get(self.home)['X-Page-Cache'], 'hit')
+        response = self.get(self.about)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'About us')
+
+    def test_publish_rewarms_page_after_commit(self):
+        self.get(self.about)
+
+        with mock.patch.object(page_cache, '_enqueue') as enqueue:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.about.save_revision().publish()
+        self.assertEqual(enqueue.call_args.args[0], [self.about.full_url])
+
+        page_cache.warm(self.about.full_url)
+        self.assertEqual(self.get(self.about)['X-Page-Cache'], 'hit')
+
+    def test_menu_changes_purge_every_page(self):
+        self.get(self.home)
+
+        MenuItem.objects.create(title='About', page=self.about)
+
+        response = self.get(self.home)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'href="/about/"')